@@ -0,0 +1,97 @@
+import sys
+import time
+from metrics import metrics
+
+# Ước lượng phần bộ nhớ cố định của mỗi dòng (dict/tuple bao ngoài) khi tính kích thước lô
+ROW_OVERHEAD_BYTES = 120
+
+def estimate_row_bytes(row):
+    """Ước lượng số byte một dòng (dict hoặc tuple) chiếm trong bộ nhớ"""
+    values = row.values() if isinstance(row, dict) else row
+    return ROW_OVERHEAD_BYTES + sum(sys.getsizeof(value) for value in values)
+
+class AdaptiveBatcher:
+    """
+    Tự điều chỉnh kích thước lô theo số dòng/giây đo được. Sau mỗi lô đủ kích thước,
+    kích thước được nhân (hoặc chia) cho step: tiếp tục theo hướng cũ khi số dòng/giây
+    không giảm quá tolerance, đổi hướng khi giảm. Kích thước luôn nằm trong
+    [min_size, max_size] và không vượt quá memory_budget byte ước lượng cho một lô.
+    Các quyết định được ghi vào metrics với tiền tố name.
+    """
+    
+    def __init__(self, initial=1000, min_size=100, max_size=50000, memory_budget=64 * 2 ** 20,
+                 step=1.5, tolerance=0.05, name='db.insert'):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.memory_budget = memory_budget
+        self.step = step
+        self.tolerance = tolerance
+        self.name = name
+        self.size = max(min_size, min(initial, max_size))
+        self.row_bytes = None
+        self._direction = 1
+        self._last_rate = None
+    
+    def _memory_cap(self):
+        if not self.row_bytes:
+            return self.max_size
+        return max(self.min_size, int(self.memory_budget // self.row_bytes))
+    
+    def observe_row(self, row):
+        """Cập nhật ước lượng byte mỗi dòng (trung bình trượt) từ một dòng mẫu"""
+        row_bytes = estimate_row_bytes(row)
+        self.row_bytes = row_bytes if self.row_bytes is None else 0.8 * self.row_bytes + 0.2 * row_bytes
+        cap = self._memory_cap()
+        if self.size > cap:
+            self.size = cap
+            metrics.incr(f"{self.name}.batch_capped_by_memory")
+    
+    def record(self, rows, seconds):
+        """Ghi nhận một lô đã xử lý và chọn kích thước cho lô tiếp theo"""
+        metrics.observe(f"{self.name}.batch_size", rows)
+        # Lô cuối (thiếu dòng) hoặc quá nhanh để đo thì không dùng để điều chỉnh
+        if rows < self.size or seconds <= 0:
+            return self.size
+        
+        rate = rows / seconds
+        metrics.observe(f"{self.name}.rows_per_second", rate)
+        if self._last_rate is not None and rate < self._last_rate * (1 - self.tolerance):
+            self._direction = -self._direction
+            metrics.incr(f"{self.name}.batch_direction_changes")
+        self._last_rate = rate
+        
+        size = int(self.size * self.step) if self._direction > 0 else int(self.size / self.step)
+        size = max(self.min_size, min(size, self.max_size, self._memory_cap()))
+        if size != self.size:
+            metrics.incr(f"{self.name}.batch_resizes")
+        elif size in (self.min_size, self.max_size, self._memory_cap()):
+            # Chạm giới hạn thì quay lại thăm dò theo hướng ngược lại
+            self._direction = -self._direction
+        self.size = size
+        return size
+    
+    def batches(self, items):
+        """Cắt list items thành các lô theo kích thước hiện tại (kích thước có thể đổi giữa các lô)"""
+        i = 0
+        while i < len(items):
+            self.observe_row(items[i])
+            batch = items[i:i + self.size]
+            i += len(batch)
+            # Thời gian của lô là thời gian người gọi xử lý nó (chuẩn bị, chèn và commit)
+            start = time.perf_counter()
+            yield batch
+            self.record(len(batch), time.perf_counter() - start)
+    
+    def fetch(self, cursor):
+        """
+        Đọc kết quả của cursor bằng fetchmany theo kích thước hiện tại. Thời gian của mỗi
+        lô tính cả phần người gọi xử lý lô đó (ví dụ ghi ra file) trước khi đọc lô sau.
+        """
+        while True:
+            start = time.perf_counter()
+            rows = cursor.fetchmany(self.size)
+            if not rows:
+                return
+            self.observe_row(rows[0])
+            yield rows
+            self.record(len(rows), time.perf_counter() - start)
@@ -0,0 +1,96 @@
+"""
+Compare fixed insert/export batch sizes with the adaptive batcher.
+
+    python -m benchmarks.bench_batching [--size 200000] [--fixed 100 1000 10000] [--example-bytes 0 2000]
+
+Every mode inserts the same synthetic EN-VI entries (as one list, like the GitHub
+collector) into a fresh database and exports it. --example-bytes pads the example
+column to simulate wide rows, where the memory budget caps the adaptive size;
+--memory-budget lowers that budget. For the adaptive mode the batch sizes it chose
+are reported from the metrics histograms.
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+import database
+from database import DictionaryDatabase
+from metrics import metrics
+from benchmarks import synthetic
+
+def make_entries(size, example_bytes=0, seed=0):
+    padding = 'x' * example_bytes
+    return [{
+        'english_word': english,
+        'vietnamese_meaning': vietnamese,
+        'word_type': word_type,
+        'pronunciation': f"/{english}/",
+        'example': f"The {english} is here. {padding}"
+    } for english, vietnamese, word_type in synthetic.make_pairs(size, seed)]
+
+def _batch_sizes(name):
+    histogram = metrics.report()['histograms'].get(f"{name}.batch_size", {'count': 0})
+    if not histogram['count']:
+        return None
+    return {key: histogram[key] for key in ('count', 'min', 'p50', 'max') if key in histogram}
+
+def run_mode(entries, batch_size, work_dir):
+    """Insert and export entries with a fixed batch size (None = adaptive)"""
+    metrics.reset()
+    db = DictionaryDatabase(os.path.join(work_dir, f"{batch_size or 'adaptive'}.db"), batch_size=batch_size)
+    try:
+        start = time.perf_counter()
+        rows = db.batch_insert_en_vi(entries)
+        insert_seconds = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        db.export_to_sql_file(os.path.join(work_dir, 'export.sql'))
+        export_seconds = time.perf_counter() - start
+    finally:
+        db.close()
+    
+    counters = metrics.report()['counters']
+    return {
+        'insert_rows_per_second': rows / insert_seconds,
+        'export_rows_per_second': rows / export_seconds,
+        'insert_batches': _batch_sizes('db.insert'),
+        'export_batches': _batch_sizes('db.export'),
+        'decisions': {name: value for name, value in counters.items() if name.startswith(('db.insert.', 'db.export.'))}
+    }
+
+def run(size=200000, fixed=(100, 1000, 10000), example_bytes=(0, 2000), memory_budget=None, seed=0):
+    if memory_budget:
+        database.DB_BATCH_MEMORY_BUDGET = memory_budget
+    results = {}
+    for width in example_bytes:
+        entries = make_entries(size, width, seed)
+        for batch_size in list(fixed) + [None]:
+            with tempfile.TemporaryDirectory() as work_dir:
+                results[f"example={width}/{batch_size or 'adaptive'}"] = run_mode(entries, batch_size, work_dir)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fixed and adaptive database batch sizes")
+    parser.add_argument('--size', type=int, default=200000)
+    parser.add_argument('--fixed', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--example-bytes', type=int, nargs='+', default=[0, 2000])
+    parser.add_argument('--memory-budget', type=int, help="adaptive per-batch memory budget in bytes")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="write results to this JSON file")
+    args = parser.parse_args()
+    
+    results = run(args.size, args.fixed, args.example_bytes, args.memory_budget, args.seed)
+    for mode, stats in results.items():
+        print(f"{mode:24} insert {stats['insert_rows_per_second']:10.0f} rows/s"
+              f"  export {stats['export_rows_per_second']:10.0f} rows/s")
+        if stats['insert_batches']:
+            print(f"{'':24} insert batches {stats['insert_batches']}  export batches {stats['export_batches']}")
+            print(f"{'':24} {stats['decisions']}")
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
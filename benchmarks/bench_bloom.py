@@ -0,0 +1,93 @@
+"""
+Headword existence checks through the Bloom filter against SQLite.
+
+    python -m benchmarks.bench_bloom [--size 300000] [--wordlist 74000] [--error-rate 0.01]
+
+A database of synthetic VI-EN entries and a Viet74K-sized wordlist (half covered,
+half missing) are generated. The benchmark reports single-word checks per second with
+has_headword() against an indexed SQLite query, the time of CoverageIndex.diff() with
+the filter and with the exact table scan, the cost of building and loading the filter,
+its size on disk and the false-positive rate measured on words known to be missing.
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+import database
+from database import DictionaryDatabase
+from coverage_index import CoverageIndex
+from benchmarks import synthetic
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def run(size=300000, wordlist=74000, error_rate=0.01, seed=0):
+    database.BLOOM_ERROR_RATE = error_rate
+    results = {}
+    pairs = synthetic.make_pairs(size, seed)
+    present = sorted({vietnamese for _, vietnamese, _ in pairs})
+    missing = [f"{word} thiếu" for word in present[:wordlist // 2]]
+    words = present[:wordlist - len(missing)] + missing
+    
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = os.path.join(work_dir, 'bloom.db')
+        db = DictionaryDatabase(db_path)
+        db.batch_insert_vi_en([{'vietnamese_word': vietnamese, 'english_meaning': english}
+                               for english, vietnamese, _ in pairs])
+        
+        _, seconds = _timed(db.headword_filter, 'vietnamese_english')
+        results['build_seconds'] = seconds
+        db.close()
+        results['filter_bytes'] = os.path.getsize(f"{db_path}.vietnamese_english.bloom")
+        
+        db = DictionaryDatabase(db_path, read_only=True)
+        bloom, seconds = _timed(db.headword_filter, 'vietnamese_english')
+        results['load_seconds'] = seconds
+        results['headwords'] = len(present)
+        
+        _, seconds = _timed(lambda: [db.has_headword(word) for word in words])
+        results['bloom_checks_per_second'] = len(words) / seconds
+        
+        def sqlite_check(word):
+            db.cursor.execute("SELECT 1 FROM vietnamese_english WHERE vietnamese_word = ? LIMIT 1", (word,))
+            return db.cursor.fetchone() is not None
+        _, seconds = _timed(lambda: [sqlite_check(word) for word in words])
+        results['sqlite_checks_per_second'] = len(words) / seconds
+        
+        false_positives = sum(1 for word in missing if word in bloom)
+        results['false_positive_rate'] = false_positives / len(missing)
+        results['false_negatives'] = sum(1 for word in present if word not in bloom)
+        
+        coverage = CoverageIndex(words)
+        approximate, results['diff_bloom_seconds'] = _timed(coverage.diff, db)
+        exact, results['diff_exact_seconds'] = _timed(coverage.diff, db, True)
+        results['diff_missed'] = len(exact - approximate)
+        db.close()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Bloom-filter headword checks against SQLite")
+    parser.add_argument('--size', type=int, default=300000)
+    parser.add_argument('--wordlist', type=int, default=74000)
+    parser.add_argument('--error-rate', type=float, default=0.01)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="write results to this JSON file")
+    args = parser.parse_args()
+    
+    results = run(args.size, args.wordlist, args.error_rate, args.seed)
+    print(f"headwords {results['headwords']:,}  filter {results['filter_bytes']:,} bytes  "
+          f"build {results['build_seconds']:.3f}s  load {results['load_seconds'] * 1000:.1f} ms")
+    print(f"checks/s  bloom {results['bloom_checks_per_second']:,.0f}  sqlite {results['sqlite_checks_per_second']:,.0f}")
+    print(f"diff      bloom {results['diff_bloom_seconds']:.3f}s  exact {results['diff_exact_seconds']:.3f}s  "
+          f"missing words hidden by false positives {results['diff_missed']}")
+    print(f"false positive rate {results['false_positive_rate']:.4f}  false negatives {results['false_negatives']}")
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
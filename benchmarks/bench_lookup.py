@@ -0,0 +1,112 @@
+"""
+Compare lookups served from SQLite with the compiled memory-mapped artifact.
+
+    python -m benchmarks.bench_lookup [--size 200000] [--queries 50000]
+
+A database of synthetic EN-VI entries is built and compiled once. The benchmark then
+reports the time to open each store, exact lookups per second (half hits, half misses),
+prefix searches per second and the Python heap needed to load get_translations(),
+the in-process dict the compiled file replaces. The first 5,000 exact lookups are
+checked against DictionaryDatabase.lookup_english().
+"""
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+from database import DictionaryDatabase
+from compiled_dictionary import CompiledDictionary, compile_direction
+from benchmarks import synthetic
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def _queries(words, count, seed):
+    rng = random.Random(seed)
+    return [rng.choice(words) if i % 2 else rng.choice(words) + 'zq' for i in range(count)]
+
+def run(size=200000, queries=50000, seed=0):
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = os.path.join(work_dir, 'lookup.db')
+        db = DictionaryDatabase(db_path)
+        db.batch_insert_en_vi([{
+            'english_word': english,
+            'vietnamese_meaning': vietnamese,
+            'word_type': word_type,
+            'pronunciation': f"/{english}/",
+            'example': f"The {english} is here."
+        } for english, vietnamese, word_type in synthetic.make_pairs(size, seed)])
+        db.conn.execute("CREATE INDEX IF NOT EXISTS idx_bench_english ON english_vietnamese(english_word)")
+        db.conn.commit()
+        
+        dict_path = os.path.join(work_dir, 'en_vi.dict')
+        keys, seconds = _timed(compile_direction, db, 'en_vi', dict_path)
+        results['compile'] = {'seconds': seconds, 'keys': keys, 'bytes': os.path.getsize(dict_path),
+                              'db_bytes': os.path.getsize(db_path)}
+        db.close()
+        
+        db, open_sqlite = _timed(DictionaryDatabase, db_path, False, True)
+        compiled, open_compiled = _timed(CompiledDictionary, dict_path)
+        results['open_seconds'] = {'sqlite': open_sqlite, 'compiled': open_compiled}
+        
+        words = compiled.prefix('', None)
+        batch = _queries(words, queries, seed)
+        for name, lookup in (('sqlite', db.lookup_english), ('compiled', compiled.lookup)):
+            _, seconds = _timed(lambda: [lookup(word) for word in batch])
+            results[f"exact_{name}"] = {'seconds': seconds, 'lookups_per_second': queries / seconds}
+        mismatches = sum(1 for word in batch[:5000] if db.lookup_english(word) != compiled.lookup(word))
+        results['mismatches'] = mismatches
+        
+        prefixes = [word[:2] for word in batch[1::2]]
+        _, seconds = _timed(lambda: [compiled.prefix(prefix, 20) for prefix in prefixes])
+        results['prefix_compiled'] = {'seconds': seconds, 'lookups_per_second': len(prefixes) / seconds}
+        
+        def sqlite_prefix(prefix):
+            upper = prefix + '\U0010ffff'
+            db.cursor.execute("""
+                SELECT DISTINCT english_word FROM english_vietnamese
+                WHERE english_word >= ? AND english_word < ? ORDER BY english_word LIMIT 20
+            """, (prefix, upper))
+            return [row[0] for row in db.cursor.fetchall()]
+        _, seconds = _timed(lambda: [sqlite_prefix(prefix) for prefix in prefixes])
+        results['prefix_sqlite'] = {'seconds': seconds, 'lookups_per_second': len(prefixes) / seconds}
+        
+        tracemalloc.start()
+        translations = db.get_translations(limit=size)
+        results['get_translations_bytes'] = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del translations
+        
+        compiled.close()
+        db.close()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SQLite lookups against the compiled dictionary")
+    parser.add_argument('--size', type=int, default=200000)
+    parser.add_argument('--queries', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="write results to this JSON file")
+    args = parser.parse_args()
+    
+    results = run(args.size, args.queries, args.seed)
+    compiled = results['compile']
+    print(f"compile          {compiled['seconds']:8.3f}s  {compiled['keys']} keys  "
+          f"{compiled['bytes']:,} bytes (database {compiled['db_bytes']:,})")
+    print(f"open             sqlite {results['open_seconds']['sqlite'] * 1000:.2f} ms  "
+          f"compiled {results['open_seconds']['compiled'] * 1000:.2f} ms")
+    for mode in ('exact_sqlite', 'exact_compiled', 'prefix_sqlite', 'prefix_compiled'):
+        print(f"{mode:16} {results[mode]['seconds']:8.3f}s  {results[mode]['lookups_per_second']:10.0f} lookups/s")
+    print(f"get_translations heap {results['get_translations_bytes']:,} bytes; mismatches {results['mismatches']}")
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
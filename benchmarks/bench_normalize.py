@@ -0,0 +1,114 @@
+"""
+Throughput of the insert-time normalization stage on synthetic rows.
+
+    python -m benchmarks.bench_normalize [--size 500000] [--batch 5000] [--vocabulary-ratio 0.2]
+
+The rows mimic collector output: Vietnamese text in NFC or NFD, stray whitespace,
+punctuation-only junk and over-long meanings. "per_row" cleans every field with
+clean_text() and no cache; "batched_cold" uses a fresh TextNormalizer and
+"batched_warm" runs the same rows through it again (repeated strings hit the cache).
+"""
+import json
+import time
+import random
+import argparse
+import unicodedata
+from processors.normalize import TextNormalizer, clean_text, reject_reason
+from config import MAX_WORD_LENGTH, MAX_MEANING_LENGTH
+from benchmarks import synthetic
+
+JUNK = ['!', '! ?', '...', '♪', '- -', '"']
+
+def make_rows(size, seed=0, vocabulary_ratio=0.2):
+    """
+    (english, vietnamese, word_type, pronunciation, example, frequency) tuples with noise,
+    drawn with a skewed distribution from size * vocabulary_ratio pairs so that common
+    pairs repeat, as in OPUS or dictionaries listing several meanings per word
+    """
+    rng = random.Random(seed)
+    pairs = synthetic.make_pairs(max(1, int(size * vocabulary_ratio)), seed)
+    rows = []
+    for _ in range(size):
+        english, vietnamese, word_type = pairs[int(len(pairs) * rng.random() ** 3)]
+        roll = rng.random()
+        if roll < 0.3:
+            vietnamese = unicodedata.normalize('NFD', vietnamese)
+        elif roll < 0.4:
+            english = f"  {english}\t"
+            vietnamese = vietnamese.replace(' ', '  ')
+        elif roll < 0.42:
+            vietnamese = rng.choice(JUNK)
+        elif roll < 0.43:
+            vietnamese = vietnamese * 400
+        rows.append((english, vietnamese, word_type, f"/{english.strip()}/", f"The {english.strip()} is here.", 1))
+    return rows
+
+def per_row(rows):
+    """Baseline: clean every field of every row without a cache"""
+    kept = []
+    for row in rows:
+        word = clean_text(row[0])
+        meaning = clean_text(row[1])
+        if reject_reason(word, MAX_WORD_LENGTH) or reject_reason(meaning, MAX_MEANING_LENGTH):
+            continue
+        kept.append((word, meaning) + tuple(clean_text(text) for text in row[2:5]) + row[5:])
+    return kept
+
+def batched(normalizer, rows, batch):
+    kept = []
+    rejected = {}
+    for i in range(0, len(rows), batch):
+        batch_kept, batch_rejected = normalizer.normalize_rows(rows[i:i + batch], 5)
+        kept.extend(batch_kept)
+        for reason, count in batch_rejected.items():
+            rejected[reason] = rejected.get(reason, 0) + count
+    return kept, rejected
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def run(size=500000, batch=5000, seed=0, vocabulary_ratio=0.2):
+    rows = make_rows(size, seed, vocabulary_ratio)
+    results = {}
+    
+    kept, seconds = _timed(per_row, rows)
+    results['per_row'] = {'seconds': seconds, 'rows_per_second': size / seconds, 'kept': len(kept)}
+    
+    normalizer = TextNormalizer()
+    for mode in ('batched_cold', 'batched_warm'):
+        (kept, rejected), seconds = _timed(batched, normalizer, rows, batch)
+        results[mode] = {'seconds': seconds, 'rows_per_second': size / seconds, 'kept': len(kept),
+                         'rejected': rejected}
+    
+    results['distinct_pairs'] = {
+        'raw': len({row[:2] for row in rows}),
+        'normalized': len({row[:2] for row in kept})
+    }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the insert-time text normalization stage")
+    parser.add_argument('--size', type=int, default=500000)
+    parser.add_argument('--batch', type=int, default=5000)
+    parser.add_argument('--vocabulary-ratio', type=float, default=0.2,
+                        help="distinct pairs per row (1.0 = almost no repeated strings)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="write results to this JSON file")
+    args = parser.parse_args()
+    
+    results = run(args.size, args.batch, args.seed, args.vocabulary_ratio)
+    for mode, stats in results.items():
+        if 'rows_per_second' in stats:
+            print(f"{mode:14} {stats['seconds']:8.3f}s  {stats['rows_per_second']:10.0f} rows/s  kept {stats['kept']}"
+                  f"  {stats.get('rejected', '')}")
+    pairs = results['distinct_pairs']
+    print(f"distinct (word, meaning) pairs: {pairs['raw']} raw -> {pairs['normalized']} normalized")
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Offline benchmark of the build pipeline (parse, insert, OPUS ingestion, dedup, enrich,
+export) on deterministic synthetic corpora at several sizes.
+
+    python -m benchmarks.bench_pipeline --sizes 1000 10000 100000 --json results.json
+    python -m benchmarks.bench_pipeline --compare baseline.json results.json
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+from database import DictionaryDatabase
+from enrichment import enrich_data
+from processors.text import process_en_vi_txt, process_vi_en_txt
+from collectors.opus import _ingest_parallel_corpus
+from collectors.wiktionary import parse_wiktionary_entries
+from benchmarks import synthetic
+
+def _timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def _stage(seconds, rows):
+    return {
+        'seconds': seconds,
+        'rows': rows,
+        'rows_per_second': rows / seconds if seconds else 0.0
+    }
+
+def _parse_csv(path):
+    try:
+        from processors.csv import process_en_vi_csv
+    except ImportError:
+        return None
+    return process_en_vi_csv(path)
+
+def _align_opus(en_file, vi_file):
+    try:
+        from processors.alignment import extract_alignment_candidates
+    except ImportError:
+        return None
+    return extract_alignment_candidates(en_file, vi_file)
+
+def _parse_wiktionary(directory, words):
+    en_vi, vi_en = [], []
+    for word in words:
+        with open(os.path.join(directory, f"{word.replace(' ', '_')}.json"), 'r', encoding='utf-8') as f:
+            word_en_vi, word_vi_en = parse_wiktionary_entries(word, json.load(f))
+        en_vi.extend(word_en_vi)
+        vi_en.extend(word_vi_en)
+    return {'en_vi': en_vi, 'vi_en': vi_en}
+
+def run_size(size, seed=0):
+    """Generate inputs of one size in a temp directory and time every stage"""
+    results = {}
+    
+    with tempfile.TemporaryDirectory() as work_dir:
+        # Inputs
+        en_vi_tsv = synthetic.write_tsv(os.path.join(work_dir, 'en_vi.txt'), size, 'en-vi', seed)
+        vi_en_tsv = synthetic.write_tsv(os.path.join(work_dir, 'vi_en.txt'), size, 'vi-en', seed + 1)
+        en_vi_csv = synthetic.write_csv(os.path.join(work_dir, 'en_vi.csv'), size, 'en-vi', seed + 2)
+        en_file, vi_file = synthetic.write_opus_corpus(work_dir, size, seed + 3)
+        wiktionary_dir = os.path.join(work_dir, 'wiktionary')
+        wiktionary_words = synthetic.write_wiktionary_cache(wiktionary_dir, max(1, size // 10), seed + 4)
+        
+        # Parse
+        en_vi, seconds = _timed(process_en_vi_txt, en_vi_tsv)
+        results['parse.tsv_en_vi'] = _stage(seconds, len(en_vi))
+        
+        vi_en, seconds = _timed(process_vi_en_txt, vi_en_tsv)
+        results['parse.tsv_vi_en'] = _stage(seconds, len(vi_en))
+        
+        csv_entries, seconds = _timed(_parse_csv, en_vi_csv)
+        if csv_entries is not None:
+            results['parse.csv_en_vi'] = _stage(seconds, len(csv_entries))
+            en_vi.extend(csv_entries)
+        
+        aligned, seconds = _timed(_align_opus, en_file, vi_file)
+        if aligned is not None:
+            results['parse.opus_alignment'] = _stage(seconds, len(aligned))
+        
+        wiktionary, seconds = _timed(_parse_wiktionary, wiktionary_dir, wiktionary_words)
+        results['parse.wiktionary'] = _stage(seconds, len(wiktionary['en_vi']) + len(wiktionary['vi_en']))
+        en_vi.extend(wiktionary['en_vi'])
+        vi_en.extend(wiktionary['vi_en'])
+        
+        # Insert, dedup, enrich, export
+        db = DictionaryDatabase(os.path.join(work_dir, 'bench.db'))
+        try:
+            start = time.perf_counter()
+            rows = db.batch_insert_en_vi(en_vi) + db.batch_insert_vi_en(vi_en)
+            results['insert'] = _stage(time.perf_counter() - start, rows)
+            
+            # OPUS goes through the pipeline's windowed count-and-insert path
+            (opus_en_vi, opus_vi_en), seconds = _timed(_ingest_parallel_corpus, db, en_file, vi_file, 'en-vi')
+            results['ingest.opus'] = _stage(seconds, opus_en_vi + opus_vi_en)
+            rows += opus_en_vi + opus_vi_en
+            
+            _, seconds = _timed(db.remove_duplicates)
+            counts = db.get_counts()
+            results['dedup'] = _stage(seconds, rows)
+            
+            _, seconds = _timed(enrich_data, db)
+            results['enrich'] = _stage(seconds, counts['en_vi'])
+            
+            _, seconds = _timed(db.export_to_sql_file, os.path.join(work_dir, 'export.sql'))
+            results['export'] = _stage(seconds, counts['en_vi'] + counts['vi_en'])
+        finally:
+            db.close()
+    
+    return results
+
+def run(sizes, seed=0):
+    return {
+        'environment': {
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'seed': seed
+        },
+        'sizes': {str(size): run_size(size, seed) for size in sizes}
+    }
+
+def compare(baseline, current):
+    """Print per-stage speedups of `current` over `baseline` (> 1 means faster)"""
+    for size, stages in current['sizes'].items():
+        base_stages = baseline['sizes'].get(size, {})
+        for stage, stats in stages.items():
+            base = base_stages.get(stage)
+            if not base or not stats['seconds']:
+                continue
+            print(f"{size:>8} {stage:20} {base['seconds']:9.3f}s -> {stats['seconds']:9.3f}s  x{base['seconds'] / stats['seconds']:.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dictionary build pipeline on synthetic data")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="write results to this JSON file")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'), help="compare two result files")
+    args = parser.parse_args()
+    
+    if args.compare:
+        with open(args.compare[0], 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        with open(args.compare[1], 'r', encoding='utf-8') as f:
+            current = json.load(f)
+        compare(baseline, current)
+        return
+    
+    results = run(args.sizes, args.seed)
+    for size, stages in results['sizes'].items():
+        for stage, stats in stages.items():
+            print(f"{size:>8} {stage:20} {stats['seconds']:9.3f}s  {stats['rows']:9} rows  {stats['rows_per_second']:12.0f} rows/s")
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark HTML extraction on the saved fixtures in benchmarks/fixtures.
+
+    python -m benchmarks.bench_scraper [--iterations 200] [--json results.json]
+"""
+import os
+import json
+import time
+import argparse
+from collectors.scraper import tflat_extractor, tracau_extractor
+from collectors.scraper_engine import available_backends
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+FIXTURES = {
+    'tflat': ('tflat_page.html', tflat_extractor),
+    'tracau': ('tracau_page.html', tracau_extractor)
+}
+
+def _legacy_tflat(html):
+    """The previous BeautifulSoup html.parser extraction, kept as a baseline"""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    results = []
+    for entry in soup.find_all('div', class_='word-entry'):
+        results.append({
+            "english_word": entry.find('div', class_='word').text.strip(),
+            "vietnamese_meaning": entry.find('div', class_='meaning').text.strip(),
+            "word_type": entry.find('div', class_='type').text.strip() if entry.find('div', class_='type') else "",
+            "pronunciation": entry.find('div', class_='pronunciation').text.strip() if entry.find('div', class_='pronunciation') else "",
+            "example": entry.find('div', class_='example').text.strip() if entry.find('div', class_='example') else ""
+        })
+    return results
+
+def _time_pages(extract, html, iterations):
+    records = extract(html)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        extract(html)
+    elapsed = time.perf_counter() - start
+    return {
+        'records_per_page': len(records),
+        'pages_per_second': iterations / elapsed if elapsed else 0.0,
+        'ms_per_page': elapsed * 1000 / iterations
+    }
+
+def run(iterations=200):
+    results = {}
+    backends = available_backends()
+    
+    for fixture, (filename, make_extractor) in FIXTURES.items():
+        with open(os.path.join(FIXTURES_DIR, filename), 'rb') as f:
+            html = f.read()
+        
+        for backend in backends:
+            extractor = make_extractor(backend)
+            results[f"{fixture}/{backend}"] = _time_pages(extractor.extract, html, iterations)
+        
+        if fixture == 'tflat' and 'bs4' in backends:
+            results[f"{fixture}/legacy-bs4-find"] = _time_pages(_legacy_tflat, html, iterations)
+    
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML scraper parsing backends")
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--json', help="write results to this JSON file")
+    args = parser.parse_args()
+    
+    results = run(args.iterations)
+    for name, stats in results.items():
+        print(f"{name:32} {stats['pages_per_second']:10.1f} pages/s  {stats['ms_per_page']:8.3f} ms/page  ({stats['records_per_page']} records)")
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Vietnamese segmentation and batched phrase lookup throughput in sentences per second.
+
+    python -m benchmarks.bench_segment [--size 200000] [--sentences 20000] [--corpus FILE]
+
+A database of synthetic VI-EN entries is generated and compiled. Sentences come from
+--corpus (one Vietnamese sentence per line, e.g. the Vietnamese side of an OPUS corpus)
+or are generated from the same vocabulary with unknown syllables and punctuation mixed
+in. The benchmark reports the time to build the syllable trie, segmentation alone, and
+segmentation plus translation of every segment through one batched database query per
+--batch sentences, through the compiled vi_en.dict, and through one lookup_vietnamese()
+call per segment. It also checks that headwords differing only in case ("Anh" England,
+"anh" older brother) each keep their meanings.
+"""
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+from database import DictionaryDatabase
+from compiled_dictionary import CompiledDictionary, compile_direction
+from segmenter import Segmenter
+from benchmarks import synthetic
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def make_sentences(words, count, seed=0):
+    rng = random.Random(seed)
+    sentences = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(3, 8)):
+            parts.append(rng.choice(words) if rng.random() < 0.8 else rng.choice(['xyz', 'abc', '2024']))
+        sentences.append(' '.join(parts) + rng.choice(['.', '?', '!', ', vâng.']))
+    return sentences
+
+def _read_corpus(path, count):
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        return [line.strip() for line, _ in zip(f, range(count)) if line.strip()]
+
+def _batched(segmenter, sentences, source, batch):
+    for i in range(0, len(sentences), batch):
+        segmenter.translate_many(sentences[i:i + batch], source)
+
+def _one_by_one(segmenter, sentences, db):
+    for sentence in sentences:
+        for _, headword in segmenter.segment(sentence):
+            if headword:
+                db.lookup_vietnamese(headword, 3)
+
+# Headwords that share a trie key: (text, expected headword, expected first meaning)
+CASING_CASES = [
+    ('anh yêu em', 'anh', 'older brother'),
+    ('Anh là một nước', 'Anh', 'England'),
+    ('ANH', 'anh', 'older brother')
+]
+
+def _casing_check(segmenter, source):
+    """Whether the first segment of each CASING_CASES text gets the expected headword and meaning"""
+    results = segmenter.translate_many([text for text, _, _ in CASING_CASES], source)
+    return all(
+        rows[0]['headword'] == headword and rows[0]['translations']
+        and rows[0]['translations'][0]['english_meaning'] == meaning
+        for rows, (_, headword, meaning) in zip(results, CASING_CASES)
+    )
+
+def run(size=200000, sentences=20000, corpus=None, batch=1000, seed=0):
+    results = {}
+    pairs = synthetic.make_pairs(size, seed)
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = os.path.join(work_dir, 'segment.db')
+        db = DictionaryDatabase(db_path)
+        db.batch_insert_vi_en([{'vietnamese_word': vietnamese, 'english_meaning': english}
+                               for english, vietnamese, _ in pairs])
+        db.batch_insert_vi_en([{'vietnamese_word': 'Anh', 'english_meaning': 'England', 'frequency': 5},
+                               {'vietnamese_word': 'anh', 'english_meaning': 'older brother', 'frequency': 5}])
+        dict_path = os.path.join(work_dir, 'vi_en.dict')
+        compile_direction(db, 'vi_en', dict_path)
+        compiled = CompiledDictionary(dict_path)
+        
+        segmenter, results['trie_seconds'] = _timed(Segmenter.from_database, db, os.path.join(work_dir, 'none.txt'))
+        results['trie_words'] = len(segmenter.trie)
+        results['casing_db'] = _casing_check(segmenter, db)
+        results['casing_compiled'] = _casing_check(segmenter, compiled)
+        if corpus:
+            texts = _read_corpus(corpus, sentences)
+        else:
+            texts = make_sentences(sorted({vietnamese for _, vietnamese, _ in pairs}), sentences, seed)
+        results['sentences'] = len(texts)
+        
+        segmented, seconds = _timed(lambda: [segmenter.segment(text) for text in texts])
+        results['segment_sentences_per_second'] = len(texts) / seconds
+        segments = sum(len(segments) for segments in segmented)
+        results['segments_per_sentence'] = segments / len(texts)
+        results['known_segments'] = sum(1 for s in segmented for _, headword in s if headword) / segments
+        
+        _, seconds = _timed(_batched, segmenter, texts, db, batch)
+        results['batched_db_sentences_per_second'] = len(texts) / seconds
+        _, seconds = _timed(_batched, segmenter, texts, compiled, batch)
+        results['batched_compiled_sentences_per_second'] = len(texts) / seconds
+        _, seconds = _timed(_one_by_one, segmenter, texts, db)
+        results['per_segment_db_sentences_per_second'] = len(texts) / seconds
+        
+        compiled.close()
+        db.close()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Vietnamese segmentation and batched phrase lookup")
+    parser.add_argument('--size', type=int, default=200000)
+    parser.add_argument('--sentences', type=int, default=20000)
+    parser.add_argument('--corpus', help="text file with one Vietnamese sentence per line")
+    parser.add_argument('--batch', type=int, default=1000, help="sentences per batched lookup")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="write results to this JSON file")
+    args = parser.parse_args()
+    
+    results = run(args.size, args.sentences, args.corpus, args.batch, args.seed)
+    print(f"trie {results['trie_words']:,} words in {results['trie_seconds']:.2f}s; "
+          f"{results['sentences']:,} sentences, {results['segments_per_sentence']:.1f} segments/sentence "
+          f"({results['known_segments']:.1%} in the dictionary)")
+    print(f"casing collisions resolved: database {results['casing_db']}, compiled {results['casing_compiled']}")
+    for mode in ('segment', 'batched_db', 'batched_compiled', 'per_segment_db'):
+        print(f"{mode:17} {results[f'{mode}_sentences_per_second']:10,.0f} sentences/s")
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Sharded ingestion across processes against a single writer.
+
+    python -m benchmarks.bench_shards [--sources 8] [--size 50000] [--shards 4]
+
+--sources synthetic EN-VI TSV dictionaries of --size lines each are generated. The
+serial build parses and inserts them one after another into one database and removes
+duplicates. The sharded build gives each source to a pool of --shards processes, each
+writing its own shard database, then merges the shards with merge_shards() (ATTACH,
+INSERT ... SELECT, dedup, indexes built once). The benchmark reports both wall times,
+the merge time and whether the two databases hold the same entries and frequencies.
+Speedup needs as many free cores as shards.
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+from database import DictionaryDatabase
+from processors.text import process_en_vi_txt
+from sharding import build_shards
+from benchmarks import synthetic
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def ingest_tsv(stage, db, args):
+    """run_stage() for the benchmark: args.sources holds the TSV file of the unit"""
+    count = 0
+    for path in args.sources:
+        count += db.batch_insert_en_vi(process_en_vi_txt(path))
+    return count
+
+def _contents(db):
+    db.cursor.execute("""
+        SELECT english_word, vietnamese_meaning, SUM(frequency) FROM english_vietnamese
+        GROUP BY english_word, vietnamese_meaning ORDER BY english_word, vietnamese_meaning
+    """)
+    return db.cursor.fetchall()
+
+def _serial(work_dir, paths):
+    db = DictionaryDatabase(os.path.join(work_dir, 'serial.db'))
+    ingest_tsv('tsv', db, argparse.Namespace(sources=paths))
+    db.remove_duplicates()
+    return db
+
+def _sharded(work_dir, paths, shards, results):
+    units = [('tsv', path) for path in paths]
+    args = argparse.Namespace(sources=None, workers=None, batch_size=None)
+    _, results['shard_build_seconds'] = _timed(build_shards, os.path.join(work_dir, 'shards'), units,
+                                               ingest_tsv, args, None, shards)
+    db = DictionaryDatabase(os.path.join(work_dir, 'sharded.db'))
+    shard_paths = sorted(os.path.join(work_dir, 'shards', name)
+                         for name in os.listdir(os.path.join(work_dir, 'shards')) if name.endswith('.db'))
+    _, results['merge_seconds'] = _timed(db.merge_shards, shard_paths)
+    return db
+
+def run(sources=8, size=50000, shards=4, seed=0):
+    results = {'cpus': os.cpu_count(), 'shards': shards}
+    with tempfile.TemporaryDirectory() as work_dir:
+        paths = [synthetic.write_tsv(os.path.join(work_dir, f"source{i}.txt"), size, seed=seed + i)
+                 for i in range(sources)]
+        results['rows'] = sources * size
+        
+        serial, results['serial_seconds'] = _timed(_serial, work_dir, paths)
+        sharded, results['sharded_seconds'] = _timed(_sharded, work_dir, paths, shards, results)
+        results['speedup'] = results['serial_seconds'] / results['sharded_seconds']
+        results['identical'] = _contents(serial) == _contents(sharded)
+        serial.close()
+        sharded.close()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sharded ingestion against a single writer")
+    parser.add_argument('--sources', type=int, default=8)
+    parser.add_argument('--size', type=int, default=50000)
+    parser.add_argument('--shards', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="write results to this JSON file")
+    args = parser.parse_args()
+    
+    results = run(args.sources, args.size, args.shards, args.seed)
+    print(f"{results['rows']:,} rows, {results['shards']} shards, {results['cpus']} CPUs")
+    print(f"serial  {results['serial_seconds']:8.2f}s")
+    print(f"sharded {results['sharded_seconds']:8.2f}s  (shards {results['shard_build_seconds']:.2f}s, "
+          f"merge {results['merge_seconds']:.2f}s)  speedup {results['speedup']:.2f}x")
+    print(f"identical entries and frequencies: {results['identical']}")
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
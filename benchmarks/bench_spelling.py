@@ -0,0 +1,119 @@
+"""
+"Did you mean" suggestions from the SymSpell index against a linear edit-distance scan.
+
+    python -m benchmarks.bench_spelling [--size 300000] [--queries 2000] [--scan-queries 100]
+
+A database of synthetic EN-VI/VI-EN entries is generated and the spelling index of each
+table is built, saved and reloaded. Queries are headwords with one or two random edits
+(English) or with their tone marks stripped plus one edit (Vietnamese). The benchmark
+reports build/load time, the index size on disk, microseconds per suggestion and, on the
+first --scan-queries queries, the speed of scanning every headword with edit_distance()
+and whether the index found the same best distance.
+"""
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+from database import DictionaryDatabase
+from spelling import SpellingIndex, edit_distance, fold_tones
+from benchmarks import synthetic
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def _typo(rng, word, edits):
+    letters = 'abcdeghiklmnopqrstuvxy'
+    for _ in range(edits):
+        i = rng.randrange(len(word))
+        operation = rng.randrange(3)
+        if operation == 0 and len(word) > 1:
+            word = word[:i] + word[i + 1:]
+        elif operation == 1:
+            word = word[:i] + rng.choice(letters) + word[i + 1:]
+        else:
+            word = word[:i] + rng.choice(letters) + word[i:]
+    return word
+
+def _queries(rng, words, count, vietnamese):
+    queries = []
+    for _ in range(count):
+        word = rng.choice(words)
+        if vietnamese:
+            queries.append(_typo(rng, fold_tones(word), 1))
+        else:
+            queries.append(_typo(rng, word, rng.randint(1, 2)))
+    return queries
+
+def _scan(index, query):
+    key = fold_tones(query)
+    return min(edit_distance(key, folded, index.max_distance) for folded in index.folded)
+
+def run(size=300000, queries=2000, scan_queries=100, seed=0):
+    results = {}
+    rng = random.Random(seed)
+    pairs = synthetic.make_pairs(size, seed)
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = os.path.join(work_dir, 'spelling.db')
+        db = DictionaryDatabase(db_path)
+        db.batch_insert_en_vi([{'english_word': english, 'vietnamese_meaning': vietnamese}
+                               for english, vietnamese, _ in pairs])
+        db.batch_insert_vi_en([{'vietnamese_word': vietnamese, 'english_meaning': english}
+                               for english, vietnamese, _ in pairs])
+        
+        for table, vietnamese in (('english_vietnamese', False), ('vietnamese_english', True)):
+            result = results[table] = {}
+            index, result['build_seconds'] = _timed(db.spelling_index, table)
+            result['headwords'] = len(index)
+            db.save_spelling_indexes()
+            path = f"{db_path}.{table}.spell"
+            result['index_bytes'] = os.path.getsize(path)
+            (index, _), result['load_seconds'] = _timed(SpellingIndex.load, path)
+            
+            batch = _queries(rng, index.words, queries, vietnamese)
+            suggestions, seconds = _timed(lambda: [index.suggest(query, 1) for query in batch])
+            result['microseconds_per_suggestion'] = seconds / len(batch) * 1e6
+            result['found'] = sum(1 for found in suggestions if found) / len(batch)
+            
+            sample = batch[:scan_queries]
+            best, seconds = _timed(lambda: [_scan(index, query) for query in sample])
+            result['scan_microseconds_per_query'] = seconds / len(sample) * 1e6
+            result['mismatches'] = sum(
+                1 for query, distance, found in zip(sample, best, suggestions)
+                if distance <= index.max_distance and (not found or found[0]['distance'] != distance)
+            )
+            
+            new_words = [f"{word}zq" for word in index.words[:1000]]
+            _, seconds = _timed(lambda: [index.add(word) for word in new_words])
+            result['incremental_adds_per_second'] = len(new_words) / seconds
+            result['incremental_found'] = sum(1 for word in new_words if index.suggest(word, 1)[0]['word'] == word)
+        db.close()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SymSpell suggestions against a linear scan")
+    parser.add_argument('--size', type=int, default=300000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--scan-queries', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="write results to this JSON file")
+    args = parser.parse_args()
+    
+    results = run(args.size, args.queries, args.scan_queries, args.seed)
+    for table, result in results.items():
+        print(f"{table}: {result['headwords']:,} headwords  index {result['index_bytes']:,} bytes  "
+              f"build {result['build_seconds']:.2f}s  load {result['load_seconds']:.2f}s")
+        print(f"  suggest {result['microseconds_per_suggestion']:,.0f} us/query (found {result['found']:.1%})  "
+              f"scan {result['scan_microseconds_per_query']:,.0f} us/query  mismatches {result['mismatches']}")
+        print(f"  incremental adds {result['incremental_adds_per_second']:,.0f}/s  "
+              f"found after add {result['incremental_found']}")
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
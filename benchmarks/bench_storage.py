@@ -0,0 +1,102 @@
+"""
+Compare database size and peak RSS of the flat schema against the normalized
+(terms table + id pairs) schema on the same synthetic corpus.
+
+    python -m benchmarks.bench_storage [--size 100000] [--json storage.json]
+
+Each layout is built in a fresh subprocess so peak RSS is measured in isolation.
+The "independent" corpus uses unrelated EN-VI and VI-EN dictionaries; the
+"mirrored" one builds both from the same vocabulary, as overlapping real
+sources do, which is where shared terms pay off.
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+from database import DictionaryDatabase
+from processors.text import process_en_vi_txt, process_vi_en_txt
+from collectors.opus import _ingest_parallel_corpus
+from benchmarks import synthetic
+
+LAYOUTS = ('flat', 'normalized')
+CORPORA = ('independent', 'mirrored')
+
+def _peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def build(layout, corpus, size, seed, work_dir):
+    """Build one database in this process and return its size statistics"""
+    en_vi_tsv = synthetic.write_tsv(os.path.join(work_dir, 'en_vi.txt'), size, 'en-vi', seed)
+    vi_en_seed = seed if corpus == 'mirrored' else seed + 1
+    vi_en_tsv = synthetic.write_tsv(os.path.join(work_dir, 'vi_en.txt'), size, 'vi-en', vi_en_seed)
+    en_file, vi_file = synthetic.write_opus_corpus(work_dir, size, seed + 2)
+    
+    db_path = os.path.join(work_dir, f"{layout}.db")
+    db = DictionaryDatabase(db_path, normalized=layout == 'normalized')
+    try:
+        db.batch_insert_en_vi(process_en_vi_txt(en_vi_tsv))
+        db.batch_insert_vi_en(process_vi_en_txt(vi_en_tsv))
+        _ingest_parallel_corpus(db, en_file, vi_file, 'en-vi', workers=1)
+        db.remove_duplicates()
+        counts = db.get_counts()
+        db.cursor.execute("VACUUM")
+    finally:
+        db.close()
+    
+    return {
+        'rows': counts['en_vi'] + counts['vi_en'],
+        'db_bytes': os.path.getsize(db_path),
+        'peak_rss_bytes': _peak_rss_bytes()
+    }
+
+def run(size=100000, seed=0):
+    results = {}
+    for corpus in CORPORA:
+        results[corpus] = {}
+        for layout in LAYOUTS:
+            with tempfile.TemporaryDirectory() as work_dir:
+                output = subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.bench_storage', '--child', layout, '--corpus', corpus,
+                     '--size', str(size), '--seed', str(seed), '--work-dir', work_dir],
+                    check=True, capture_output=True, text=True
+                ).stdout
+                results[corpus][layout] = json.loads(output.strip().splitlines()[-1])
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare flat and normalized database storage")
+    parser.add_argument('--size', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="write results to this JSON file")
+    parser.add_argument('--child', choices=LAYOUTS, help=argparse.SUPPRESS)
+    parser.add_argument('--corpus', choices=CORPORA, default='independent', help=argparse.SUPPRESS)
+    parser.add_argument('--work-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.child:
+        print(json.dumps(build(args.child, args.corpus, args.size, args.seed, args.work_dir)))
+        return
+    
+    results = run(args.size, args.seed)
+    for corpus, layouts in results.items():
+        flat = layouts['flat']
+        for layout, stats in layouts.items():
+            rss = stats['peak_rss_bytes']
+            print(f"{corpus:12} {layout:12} {stats['rows']:9} rows  db {stats['db_bytes'] / 2 ** 20:8.2f} MiB"
+                  f" (x{stats['db_bytes'] / flat['db_bytes']:.2f})"
+                  f"  peak RSS {rss / 2 ** 20 if rss else float('nan'):8.1f} MiB")
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
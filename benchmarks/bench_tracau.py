@@ -0,0 +1,60 @@
+"""
+Benchmark the TracauVN crawler against the local fixture server.
+
+    python -m benchmarks.bench_tracau [--pages 3] [--latency 0.05] [--workers 1 8]
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+from database import DictionaryDatabase
+from collectors.scraper import scrape_tracau_dictionary
+from benchmarks.fixture_server import FixtureServer
+
+def _crawl(server, workers, cache_dir, min_interval):
+    with tempfile.TemporaryDirectory() as db_dir:
+        db = DictionaryDatabase(os.path.join(db_dir, 'bench.db'))
+        try:
+            requests_before = server.requests
+            start = time.perf_counter()
+            count = scrape_tracau_dictionary(db, limit=10 ** 9, max_workers=workers, base_url=server.tracau_url,
+                                             cache_dir=cache_dir, min_interval=min_interval, jitter=0)
+            elapsed = time.perf_counter() - start
+            return {
+                'entries': count,
+                'requests': server.requests - requests_before,
+                'seconds': elapsed
+            }
+        finally:
+            db.close()
+
+def run(pages=3, latency=0.05, workers=(1, 8), min_interval=0.0):
+    results = {}
+    with FixtureServer(pages_per_letter=pages, latency=latency) as server:
+        for count in workers:
+            with tempfile.TemporaryDirectory() as cache_dir:
+                results[f"network/workers={count}"] = _crawl(server, count, cache_dir, min_interval)
+                # Second pass is served entirely from the page cache
+                results[f"cached/workers={count}"] = _crawl(server, count, cache_dir, min_interval)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the TracauVN crawler on a local fixture server")
+    parser.add_argument('--pages', type=int, default=3, help="pages with entries per letter")
+    parser.add_argument('--latency', type=float, default=0.05, help="simulated server latency in seconds")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--min-interval', type=float, default=0.0, help="per-host rate limit interval")
+    parser.add_argument('--json', help="write results to this JSON file")
+    args = parser.parse_args()
+    
+    results = run(args.pages, args.latency, args.workers, args.min_interval)
+    for name, stats in results.items():
+        print(f"{name:20} {stats['entries']:8} entries  {stats['requests']:5} requests  {stats['seconds']:8.2f} s")
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
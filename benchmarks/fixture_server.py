@@ -0,0 +1,67 @@
+"""
+Local HTTP server that serves the saved HTML fixtures, so scrapers can be
+exercised and benchmarked offline.
+
+    with FixtureServer(pages_per_letter=3, latency=0.05) as server:
+        scrape_tracau_dictionary(db, base_url=server.tracau_url, ...)
+"""
+import os
+import time
+import threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+EMPTY_PAGE = b'<!DOCTYPE html><html><body><div class="results"></div></body></html>'
+
+class FixtureServer:
+    """Serve TracauVN-style letter pages: pages 1..pages_per_letter have entries, later pages are empty"""
+    
+    def __init__(self, pages_per_letter=3, latency=0.0, fixture='tracau_page.html'):
+        with open(os.path.join(FIXTURES_DIR, fixture), 'rb') as f:
+            page_html = f.read()
+        
+        self.requests = 0
+        lock = threading.Lock()
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with lock:
+                    server.requests += 1
+                if latency:
+                    time.sleep(latency)
+                
+                url = urlsplit(self.path)
+                page = int(parse_qs(url.query).get('page', ['1'])[0])
+                body = page_html if page <= pages_per_letter else EMPTY_PAGE
+                
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+    
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address
+        return f"http://{host}:{port}"
+    
+    @property
+    def tracau_url(self):
+        return self.base_url + "/dictionaries/vietnamese-english/{}"
+    
+    def __enter__(self):
+        self._thread.start()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self._httpd.shutdown()
+        self._httpd.server_close()
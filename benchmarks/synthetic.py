@@ -0,0 +1,117 @@
+"""
+Deterministic synthetic inputs for the benchmarks. The same (size, seed) always
+produces byte-identical files, so timings are comparable between builds.
+"""
+import os
+import csv
+import json
+import random
+
+EN_ONSETS = ['b', 'c', 'd', 'f', 'g', 'h', 'l', 'm', 'n', 'p', 'r', 's', 't', 'w', 'br', 'ch', 'st', 'tr', 'sh']
+EN_VOWELS = ['a', 'e', 'i', 'o', 'u', 'ea', 'oo', 'ai']
+EN_CODAS = ['', 'n', 't', 'r', 'l', 'ck', 'st', 'nd', 'ng']
+
+VI_ONSETS = ['b', 'c', 'ch', 'd', 'đ', 'g', 'gi', 'h', 'k', 'kh', 'l', 'm', 'n', 'ng', 'nh', 'ph', 'qu', 's', 't', 'th', 'tr', 'v', 'x']
+VI_VOWELS = ['a', 'á', 'à', 'ả', 'ã', 'ạ', 'ă', 'â', 'ấ', 'e', 'é', 'ê', 'ề', 'i', 'í', 'o', 'ó', 'ô', 'ồ', 'ơ', 'ở', 'u', 'ú', 'ư', 'ữ', 'y']
+VI_CODAS = ['', 'c', 'ch', 'm', 'n', 'ng', 'nh', 'p', 't']
+
+WORD_TYPES = ['noun', 'verb', 'adjective', 'adverb', '']
+
+# Short subtitle-style lines that repeat many times in real OPUS corpora
+COMMON_PAIRS = [("Yes.", "Vâng."), ("No.", "Không."), ("Thank you.", "Cảm ơn."), ("What?", "Cái gì?"),
+                ("Come on.", "Thôi nào."), ("Okay.", "Được rồi."), ("Hello.", "Xin chào.")]
+
+def _english_word(rng):
+    return ''.join(rng.choice(EN_ONSETS) + rng.choice(EN_VOWELS) + rng.choice(EN_CODAS)
+                   for _ in range(rng.randint(1, 3)))
+
+def _vietnamese_word(rng):
+    return ' '.join(rng.choice(VI_ONSETS) + rng.choice(VI_VOWELS) + rng.choice(VI_CODAS)
+                    for _ in range(rng.randint(1, 3)))
+
+def make_vocabulary(size, seed=0):
+    """Return parallel lists of English and Vietnamese headwords"""
+    rng = random.Random(seed)
+    return [_english_word(rng) for _ in range(size)], [_vietnamese_word(rng) for _ in range(size)]
+
+def make_pairs(size, seed=0, duplicate_ratio=0.2):
+    """Return `size` (english, vietnamese, word_type) tuples with some exact duplicates"""
+    rng = random.Random(seed)
+    english, vietnamese = make_vocabulary(max(1, int(size * (1 - duplicate_ratio))), seed)
+    pairs = []
+    for i in range(size):
+        j = i if i < len(english) else rng.randrange(len(english))
+        pairs.append((english[j], vietnamese[j], WORD_TYPES[j % len(WORD_TYPES)]))
+    rng.shuffle(pairs)
+    return pairs
+
+def write_tsv(path, size, direction='en-vi', seed=0):
+    """Write a TSV dictionary in the layout read by processors/text.py"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("# synthetic dictionary\n")
+        for english, vietnamese, word_type in make_pairs(size, seed):
+            if direction == 'en-vi':
+                f.write(f"{english}\t{vietnamese}\t{word_type}\t/{english}/\tThe {english} is here.\n")
+            else:
+                f.write(f"{vietnamese}\t{english}\t{word_type}\t{vietnamese} ở đây.\n")
+    return path
+
+def write_csv(path, size, direction='en-vi', seed=0):
+    """Write a CSV dictionary in the layout read by processors/csv.py"""
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        if direction == 'en-vi':
+            writer.writerow(['english', 'vietnamese', 'type', 'pronunciation', 'example'])
+            for english, vietnamese, word_type in make_pairs(size, seed):
+                writer.writerow([english, vietnamese, word_type, f"/{english}/", f"The {english}, here."])
+        else:
+            writer.writerow(['vietnamese', 'english', 'type', 'example'])
+            for english, vietnamese, word_type in make_pairs(size, seed):
+                writer.writerow([vietnamese, english, word_type, f"{vietnamese}, ở đây."])
+    return path
+
+def write_opus_corpus(directory, size, seed=0, short_ratio=0.3, common_ratio=0.2):
+    """Write aligned OPUS-style .en/.vi files with one sentence per line"""
+    rng = random.Random(seed)
+    english, vietnamese = make_vocabulary(max(10, size // 10), seed)
+    en_path = os.path.join(directory, 'corpus.en-vi.en')
+    vi_path = os.path.join(directory, 'corpus.en-vi.vi')
+    
+    with open(en_path, 'w', encoding='utf-8') as en_f, open(vi_path, 'w', encoding='utf-8') as vi_f:
+        for _ in range(size):
+            roll = rng.random()
+            if roll < common_ratio:
+                en_line, vi_line = rng.choice(COMMON_PAIRS)
+            else:
+                length = rng.randint(1, 3) if roll < common_ratio + short_ratio else rng.randint(4, 14)
+                words = [rng.randrange(len(english)) for _ in range(length)]
+                en_line = ' '.join(english[w] for w in words).capitalize() + '.'
+                vi_line = ' '.join(vietnamese[w] for w in words).capitalize() + '.'
+            en_f.write(en_line + '\n')
+            vi_f.write(vi_line + '\n')
+    
+    return en_path, vi_path
+
+def write_wiktionary_cache(directory, size, seed=0):
+    """Write Wiktionary REST definition responses as the collector caches them"""
+    rng = random.Random(seed)
+    english, vietnamese = make_vocabulary(size, seed)
+    os.makedirs(directory, exist_ok=True)
+    words = []
+    
+    for en_word, vi_word in zip(english, vietnamese):
+        definitions = []
+        for sense in range(rng.randint(1, 3)):
+            definitions.append({
+                "definition": f"<span>{en_word} (sense {sense + 1})</span>",
+                "translations": [{"language": "en", "word": en_word if sense == 0 else f"{en_word} {sense}"}]
+            })
+        data = {"vi": [{"partOfSpeech": rng.choice(WORD_TYPES[:4]).capitalize(), "language": "Vietnamese",
+                        "definitions": definitions}]}
+        
+        word_for_url = vi_word.replace(' ', '_')
+        with open(os.path.join(directory, f"{word_for_url}.json"), 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        words.append(vi_word)
+    
+    return words
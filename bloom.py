@@ -0,0 +1,137 @@
+import os
+import json
+import math
+import struct
+import hashlib
+
+# File bộ lọc: MAGIC, độ dài metadata (uint64), metadata JSON rồi mảng bit
+MAGIC = b'DICTBLM1'
+HEADER = struct.Struct('<8sQ')
+MASK64 = (1 << 64) - 1
+
+def _numpy():
+    """numpy nếu đã cài (thao tác theo lô nhanh hơn nhiều), nếu không thì None"""
+    try:
+        import numpy
+        return numpy
+    except ImportError:
+        return None
+
+def _digest(key):
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+
+class BloomFilter:
+    """
+    Bộ lọc Bloom trên bytearray: trả lời "chắc chắn chưa có" hoặc "có thể đã có" với tỉ lệ
+    dương tính giả khoảng error_rate khi chứa không quá capacity phần tử. Vị trí bit được
+    tính bằng double hashing trên blake2b nên giống nhau giữa các process và các lần chạy
+    (khác với hash() của Python). update() và contains_many() xử lý cả lô bằng numpy nếu có.
+    """
+    
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = max(1, int(capacity))
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        # Số phần tử mới đã thêm (phần tử đã có bit bật đủ thì không tính)
+        self.count = 0
+    
+    def _positions(self, key):
+        # Cộng theo modulo 2**64 để khớp với phép tính uint64 của numpy trong _batch_positions
+        digest = _digest(key)
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        size = self.size
+        return [((h1 + i * h2) & MASK64) % size for i in range(self.hashes)]
+    
+    def _batch_positions(self, np, keys):
+        """Ma trận vị trí bit (số khóa x số hàm băm) của cả lô và giá trị băm đầu của mỗi khóa"""
+        hashes = np.frombuffer(b''.join([_digest(key) for key in keys]), dtype='<u8').reshape(-1, 2)
+        h1 = hashes[:, :1]
+        h2 = hashes[:, 1:] | np.uint64(1)
+        steps = np.arange(self.hashes, dtype=np.uint64)[None, :]
+        return (h1 + steps * h2) % np.uint64(self.size), h1[:, 0]
+    
+    def _batch_present(self, np, bits, positions):
+        return np.all(bits[positions >> np.uint64(3)] & (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8)), axis=1)
+    
+    def add(self, key):
+        """Thêm key; trả về True nếu key chắc chắn chưa có trước đó"""
+        bits = self.bits
+        added = False
+        for position in self._positions(key):
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                bits[position >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+    
+    def update(self, keys):
+        """Thêm nhiều khóa; với numpy cả lô được băm và bật bit cùng lúc"""
+        np = _numpy()
+        if np is None:
+            for key in keys:
+                self.add(key)
+            return
+        keys = list(keys)
+        if not keys:
+            return
+        positions, h1 = self._batch_positions(np, keys)
+        bits = np.frombuffer(self.bits, dtype=np.uint8)
+        new = ~self._batch_present(np, bits, positions)
+        # Khóa lặp lại trong cùng lô chỉ được tính một lần
+        self.count += len(np.unique(h1[new]))
+        np.bitwise_or.at(bits, positions >> np.uint64(3), np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8))
+    
+    def contains_many(self, keys):
+        """Danh sách bool: mỗi khóa có thể đã có hay chắc chắn chưa có"""
+        np = _numpy()
+        keys = list(keys)
+        if np is None or not keys:
+            return [key in self for key in keys]
+        positions, _ = self._batch_positions(np, keys)
+        return self._batch_present(np, np.frombuffer(self.bits, dtype=np.uint8), positions).tolist()
+    
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+    
+    def __len__(self):
+        return self.count
+    
+    def is_full(self):
+        """Đã chứa nhiều hơn capacity phần tử (tỉ lệ dương tính giả vượt error_rate)"""
+        return self.count > self.capacity
+    
+    def save(self, path, **meta):
+        """Ghi bộ lọc cùng metadata của người gọi ra path (thay thế nguyên tử)"""
+        header = json.dumps(dict(meta, capacity=self.capacity, error_rate=self.error_rate,
+                                 size=self.size, hashes=self.hashes, count=self.count)).encode('utf-8')
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(header)))
+            f.write(header)
+            f.write(self.bits)
+        os.replace(temp_path, path)
+    
+    @classmethod
+    def load(cls, path):
+        """Đọc bộ lọc đã lưu; trả về (bộ lọc, metadata) hoặc None nếu file không hợp lệ"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < HEADER.size:
+            return None
+        magic, header_length = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            return None
+        meta = json.loads(data[HEADER.size:HEADER.size + header_length])
+        bloom = cls(meta['capacity'], meta['error_rate'])
+        bits = data[HEADER.size + header_length:]
+        if bloom.size != meta['size'] or bloom.hashes != meta['hashes'] or len(bits) != len(bloom.bits):
+            return None
+        bloom.bits = bytearray(bits)
+        bloom.count = meta['count']
+        return bloom, meta
@@ -1,66 +1,110 @@
 import os
 import logging
-import urllib.request
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from config import CACHE_DIR, GITHUB_SOURCES
 from processors.text import process_en_vi_txt, process_vi_en_txt
-from processors.csv import process_en_vi_csv, process_vi_en_csv
+from metrics import metrics
+from utils import download_file_simple, select_sources
+
+# Giá trị checkpoint của một nguồn đã được chèn hết; chạy lại sẽ bỏ qua nguồn đó
+# thay vì chèn thêm một bản nữa (remove_duplicates() sẽ cộng dồn tần suất của các bản trùng)
+DONE = 'done'
+
+def _cache_file(source):
+    return f"{CACHE_DIR}/{source['name']}.{source['format']}"
+
+def _checkpoint(source):
+    return f"github/{source['name']}"
 
 def download_and_process_source(source, db):
-    """Tải và xử lý một nguồn từ GitHub"""
-    cache_file = f"{CACHE_DIR}/{source['name']}.{source['format']}"
+    """Tải, xử lý và chèn một nguồn từ GitHub trên luồng hiện tại"""
+    return insert_source_entries(db, source, download_and_parse_source(source))
+
+def download_and_parse_source(source):
+    """Tải và phân tích một nguồn từ GitHub; không dùng database nên chạy được trên luồng phụ"""
+    with metrics.source(source['name']):
+        return _download_and_parse_source(source)
+
+def _download_and_parse_source(source):
+    cache_file = _cache_file(source)
     
     try:
         # Tải nếu chưa lưu cache
         if not os.path.exists(cache_file):
             print(f"Downloading {source['name']}...")
-            urllib.request.urlretrieve(source['url'], cache_file)
+            if not download_file_simple(source['url'], cache_file):
+                return []
+        
+        # pandas chỉ được nạp khi có nguồn CSV
+        if source['format'] == 'csv':
+            from processors.csv import process_en_vi_csv, process_vi_en_csv
+        else:
+            process_en_vi_csv = process_vi_en_csv = None
         
         # Xử lý dựa trên loại và định dạng
-        if source['format'] == 'txt':
-            if source['type'] == 'en-vi':
-                entries = process_en_vi_txt(cache_file)
-                if entries:
-                    count = db.batch_insert_en_vi(entries)
-                    return count
-            elif source['type'] == 'vi-en':
-                entries = process_vi_en_txt(cache_file)
-                if entries:
-                    count = db.batch_insert_vi_en(entries)
-                    return count
-        elif source['format'] == 'csv':
-            if source['type'] == 'en-vi':
-                entries = process_en_vi_csv(cache_file)
-                if entries:
-                    count = db.batch_insert_en_vi(entries)
-                    return count
-            elif source['type'] == 'vi-en':
-                entries = process_vi_en_csv(cache_file)
-                if entries:
-                    count = db.batch_insert_vi_en(entries)
-                    return count
+        processors = {
+            ('txt', 'en-vi'): process_en_vi_txt,
+            ('txt', 'vi-en'): process_vi_en_txt,
+            ('csv', 'en-vi'): process_en_vi_csv,
+            ('csv', 'vi-en'): process_vi_en_csv
+        }
+        process = processors.get((source['format'], source['type']))
+        if not process:
+            return []
         
-        return 0
+        with metrics.phase('parse'):
+            entries = process(cache_file)
+        metrics.incr_source('rows_parsed', len(entries))
+        return entries
     except Exception as e:
         logging.error(f"Error processing {source['name']}: {e}")
+        return []
+
+def insert_source_entries(db, source, entries):
+    """
+    Chèn các mục đã phân tích của một nguồn vào bảng theo chiều của nguồn, cùng
+    checkpoint đánh dấu nguồn đã xong trong một giao dịch
+    """
+    if not entries:
+        return 0
+    
+    insert = db.batch_insert_en_vi if source['type'] == 'en-vi' else db.batch_insert_vi_en
+    try:
+        with metrics.source(source['name']), db.transaction():
+            count = insert(entries)
+            db.set_checkpoint(_checkpoint(source), DONE)
+        return count
+    except Exception as e:
+        logging.error(f"Error inserting {source['name']}: {e}")
         return 0
 
-def download_github_dictionaries(db):
-    """Tải từ điển từ các kho GitHub"""
+def download_github_dictionaries(db, sources=None, max_workers=5):
+    """
+    Tải từ điển từ các kho GitHub.
+    Các luồng phụ chỉ tải và phân tích; việc chèn diễn ra trên luồng gọi hàm vì
+    kết nối sqlite3 chỉ dùng được trên luồng đã tạo ra nó.
+    """
     print("Downloading dictionaries from GitHub repositories...")
     
     total_entries = 0
     
-    with ThreadPoolExecutor(max_workers=5) as executor:
+    pending = []
+    for source in select_sources(GITHUB_SOURCES, sources):
+        if db.get_checkpoint(_checkpoint(source)) == DONE:
+            print(f"{source['name']} was already imported, skipping")
+        else:
+            pending.append(source)
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
         future_to_source = {
-            executor.submit(download_and_process_source, source, db): source 
-            for source in GITHUB_SOURCES
+            executor.submit(download_and_parse_source, source): source
+            for source in pending
         }
         
         for future in as_completed(future_to_source):
             source = future_to_source[future]
             try:
-                result = future.result()
+                result = insert_source_entries(db, source, future.result())
                 if result:
                     total_entries += result
                     print(f"Downloaded and processed {source['name']}: {result} entries")
@@ -69,4 +113,19 @@ def download_github_dictionaries(db):
             except Exception as e:
                 print(f"Error processing {source['name']}: {e}")
     
-    return total_entries
\ No newline at end of file
+    return total_entries
+
+def estimate_github_rows(sources=None):
+    """Ước lượng số dòng của từng nguồn từ file cache (None nếu chưa tải)"""
+    from processors.frequency import count_lines
+    
+    estimates = []
+    for source in select_sources(GITHUB_SOURCES, sources):
+        cache_file = _cache_file(source)
+        if os.path.exists(cache_file):
+            # Bỏ dòng tiêu đề của CSV
+            rows = count_lines(cache_file) - (1 if source['format'] == 'csv' else 0)
+            estimates.append((source['name'], max(rows, 0)))
+        else:
+            estimates.append((source['name'], None))
+    return estimates
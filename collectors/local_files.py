@@ -1,25 +1,43 @@
 import pandas as pd
 import logging
 from processors.csv import process_en_vi_csv, process_vi_en_csv
+from metrics import metrics
+
+# Checkpoint value of a CSV file that was fully imported
+DONE = 'done'
 
 def import_from_csv(db, csv_path, table_name):
-    """Import words from a CSV file into the database"""
+    """
+    Import words from a CSV file into the database.
+    The rows and a local/<csv_path> checkpoint are committed together, so later runs skip
+    the file instead of inserting it again; clear the checkpoint to import an edited file.
+    """
+    checkpoint = f"local/{csv_path}"
+    if db.get_checkpoint(checkpoint) == DONE:
+        print(f"{csv_path} was already imported, skipping")
+        return 0
     print(f"Importing from CSV: {csv_path}")
     
     try:
-        if table_name == 'english_vietnamese':
-            entries = process_en_vi_csv(csv_path)
-            count = db.batch_insert_en_vi(entries)
-        elif table_name == 'vietnamese_english':
-            entries = process_vi_en_csv(csv_path)
-            count = db.batch_insert_vi_en(entries)
-        else:
-            print(f"Unknown table: {table_name}")
-            return 0
+        with metrics.source(checkpoint), db.transaction():
+            if table_name == 'english_vietnamese':
+                with metrics.phase('parse'):
+                    entries = process_en_vi_csv(csv_path)
+                metrics.incr_source('rows_parsed', len(entries))
+                count = db.batch_insert_en_vi(entries)
+            elif table_name == 'vietnamese_english':
+                with metrics.phase('parse'):
+                    entries = process_vi_en_csv(csv_path)
+                metrics.incr_source('rows_parsed', len(entries))
+                count = db.batch_insert_vi_en(entries)
+            else:
+                print(f"Unknown table: {table_name}")
+                return 0
+            db.set_checkpoint(checkpoint, DONE)
         
         print(f"Imported {count} entries from {csv_path}")
         return count
-        
+    
     except Exception as e:
         logging.error(f"Error importing from CSV {csv_path}: {e}")
         print(f"Error importing from CSV {csv_path}: {e}")
@@ -2,150 +2,285 @@ import os
 import zipfile
 import tempfile
 import logging
-import urllib.request
-import time
 from tqdm import tqdm
-from config import CACHE_DIR, OPUS_SOURCES
+from config import (CACHE_DIR, OPUS_SOURCES, OPUS_WORKERS, OPUS_ALIGNMENT, OPUS_ALIGNMENT_METHOD, OPUS_ALIGNMENT_TOP_K,
+                    OPUS_CHECKPOINT_LINES, OPUS_QUALITY_FILTER, DERIVE_REVERSE)
+from metrics import metrics
+from utils import download_file_simple, select_sources
+from processors.dedup import ExternalDeduplicator
+from processors.frequency import iter_window_counts
+from processors.quality import QualityFilter
 
-def download_opus_data(db):
-    """Download and process OPUS parallel corpus data"""
+# Checkpoint value of a corpus (or its alignment pass) that was fully ingested
+DONE = 'done'
+
+def download_opus_data(db, sources=None, workers=OPUS_WORKERS, batch_size=5000):
+    """Download and process OPUS parallel corpus data (optionally only the named corpora)"""
     print("Downloading OPUS parallel corpus data...")
     
     total_entries = 0
     
-    for source in OPUS_SOURCES:
-        try:
-            print(f"Processing {source['name']}...")
-            
-            cache_file = f"{CACHE_DIR}/{source['name']}.zip"
+    for source in select_sources(OPUS_SOURCES, sources):
+        with metrics.source(f"OPUS/{source['name']}"):
+            total_entries += _download_opus_source(db, source, workers, batch_size)
+    
+    return total_entries
+
+def estimate_opus_rows(sources=None):
+    """
+    Upper bound of the rows each cached corpus can produce (two per sentence pair),
+    counted by streaming the .en member of the archive; None if not downloaded.
+    """
+    estimates = []
+    for source in select_sources(OPUS_SOURCES, sources):
+        cache_file = f"{CACHE_DIR}/{source['name']}.zip"
+        if not os.path.exists(cache_file):
+            estimates.append((source['name'], None))
+            continue
+        
+        pairs = 0
+        with zipfile.ZipFile(cache_file, 'r') as zip_ref:
+            for name in zip_ref.namelist():
+                if name.endswith('.en'):
+                    with zip_ref.open(name) as f:
+                        for block in iter(lambda: f.read(1 << 20), b''):
+                            pairs += block.count(b'\n')
+                    break
+        estimates.append((source['name'], pairs * 2))
+    return estimates
+
+def _download_opus_source(db, source, workers=OPUS_WORKERS, batch_size=5000):
+    """Download and process a single OPUS corpus, resuming from its checkpoints"""
+    total_entries = 0
+    
+    try:
+        print(f"Processing {source['name']}...")
+        
+        checkpoint = f"opus/{source['name']}"
+        if db.get_checkpoint(checkpoint) == DONE and (
+                not OPUS_ALIGNMENT or db.get_checkpoint(f"{checkpoint}/alignment") == DONE):
+            print(f"{source['name']} was already ingested, skipping")
+            return 0
+        
+        cache_file = f"{CACHE_DIR}/{source['name']}.zip"
+        
+        # Download if not cached
+        if not os.path.exists(cache_file):
+            print(f"Downloading {source['name']}...")
+            if not download_file_simple(source['url'], cache_file):
+                return 0
+        
+        # Extract and process files
+        with zipfile.ZipFile(cache_file, 'r') as zip_ref:
+            # Find the correct files in the archive
+            en_file = None
+            vi_file = None
             
-            # Download if not cached
-            if not os.path.exists(cache_file):
-                print(f"Downloading {source['name']}...")
-                urllib.request.urlretrieve(source['url'], cache_file)
+            for file in zip_ref.namelist():
+                if file.endswith('.en'):
+                    en_file = file
+                elif file.endswith('.vi'):
+                    vi_file = file
             
-            # Extract and process files
-            with zipfile.ZipFile(cache_file, 'r') as zip_ref:
-                # Find the correct files in the archive
-                en_file = None
-                vi_file = None
+            if en_file and vi_file:
+                # Extract both files to temporary directory
+                temp_dir = tempfile.mkdtemp()
+                zip_ref.extract(en_file, temp_dir)
+                zip_ref.extract(vi_file, temp_dir)
                 
-                for file in zip_ref.namelist():
-                    if file.endswith('.en'):
-                        en_file = file
-                    elif file.endswith('.vi'):
-                        vi_file = file
-                
-                if en_file and vi_file:
-                    # Extract both files to temporary directory
-                    temp_dir = tempfile.mkdtemp()
-                    zip_ref.extract(en_file, temp_dir)
-                    zip_ref.extract(vi_file, temp_dir)
-                    
-                    # Process the files
-                    entries = _process_parallel_corpus(
+                # Stream the files through the deduplicator into the database.
+                # With DERIVE_REVERSE only EN-VI rows are inserted and VI-EN is derived per window.
+                reverse = not DERIVE_REVERSE
+                try:
+                    count_en_vi, count_vi_en = _ingest_parallel_corpus(
+                        db,
                         os.path.join(temp_dir, en_file),
                         os.path.join(temp_dir, vi_file),
-                        source['alignment']
+                        source['alignment'],
+                        batch_size=batch_size,
+                        workers=workers,
+                        reverse=reverse,
+                        checkpoint=checkpoint
                     )
-                    
+                    if OPUS_ALIGNMENT:
+                        aligned_en_vi, aligned_vi_en = _ingest_alignment_candidates(
+                            db,
+                            os.path.join(temp_dir, en_file),
+                            os.path.join(temp_dir, vi_file),
+                            batch_size=batch_size,
+                            workers=workers,
+                            reverse=reverse,
+                            checkpoint=f"{checkpoint}/alignment"
+                        )
+                        count_en_vi += aligned_en_vi
+                        count_vi_en += aligned_vi_en
+                finally:
                     # Clean up
                     import shutil
                     shutil.rmtree(temp_dir)
-                    
-                    # Add entries to database
-                    if entries['en_vi']:
-                        count_en_vi = db.batch_insert_en_vi(entries['en_vi'])
-                    else:
-                        count_en_vi = 0
-                        
-                    if entries['vi_en']:
-                        count_vi_en = db.batch_insert_vi_en(entries['vi_en'])
-                    else:
-                        count_vi_en = 0
-                    
-                    total_entries += count_en_vi + count_vi_en
-                    print(f"Processed {count_en_vi} EN-VI and {count_vi_en} VI-EN entries from {source['name']}")
-                else:
-                    print(f"Could not find required files in {source['name']} archive")
-        
-        except Exception as e:
-            logging.error(f"Error processing {source['name']}: {e}")
+                
+                total_entries += count_en_vi + count_vi_en
+                print(f"Processed {count_en_vi} EN-VI and {count_vi_en} VI-EN entries from {source['name']}")
+            else:
+                print(f"Could not find required files in {source['name']} archive")
+    
+    except Exception as e:
+        logging.error(f"Error processing {source['name']}: {e}")
     
     return total_entries
 
-def _process_parallel_corpus(source_file, target_file, alignment):
-    """Process parallel corpus files to extract dictionary entries"""
+def _quality_filter(alignment):
+    """The subtitle-noise filter for a corpus, or None when OPUS_QUALITY_FILTER is off"""
+    if not OPUS_QUALITY_FILTER:
+        return None
+    return QualityFilter(source_lang='en' if alignment == 'en-vi' else 'vi')
+
+def _record_rejected(rejected):
+    """Count rejected line pairs per quality rule for the current source"""
+    for rule, count in rejected.items():
+        metrics.incr_source(f"pairs_rejected.{rule}", count)
+
+def _pair_entries(src, tgt, alignment, frequency, reverse=True):
+    """Build the EN-VI and VI-EN entries for one aligned pair (VI-EN is None when reverse is False)"""
+    if alignment == 'en-vi':
+        en, vi = src, tgt
+    else:  # vi-en
+        vi, en = src, tgt
+    
+    en_vi_entry = {
+        "english_word": en,
+        "vietnamese_meaning": vi,
+        "word_type": "",
+        "pronunciation": "",
+        "example": "",
+        "frequency": frequency
+    }
+    if not reverse:
+        return en_vi_entry, None
+    
+    vi_en_entry = {
+        "vietnamese_word": vi,
+        "english_meaning": en,
+        "word_type": "",
+        "example": "",
+        "frequency": frequency
+    }
+    return en_vi_entry, vi_en_entry
+
+def _insert_pair_entries(db, pairs, alignment, batch_size, reverse):
+    """Insert (src, tgt, frequency) pairs in batches; with reverse=False VI-EN is derived afterwards"""
+    count_en_vi = 0
+    count_vi_en = 0
+    derive_since = db.max_id('english_vietnamese')
+    
     en_vi_entries = []
     vi_en_entries = []
+    for src, tgt, frequency in pairs:
+        en_vi_entry, vi_en_entry = _pair_entries(src, tgt, alignment, frequency, reverse)
+        en_vi_entries.append(en_vi_entry)
+        if reverse:
+            vi_en_entries.append(vi_en_entry)
+        
+        if len(en_vi_entries) >= batch_size:
+            count_en_vi += db.batch_insert_en_vi(en_vi_entries)
+            count_vi_en += db.batch_insert_vi_en(vi_en_entries)
+            en_vi_entries = []
+            vi_en_entries = []
+    
+    count_en_vi += db.batch_insert_en_vi(en_vi_entries)
+    count_vi_en += db.batch_insert_vi_en(vi_en_entries)
+    if not reverse:
+        count_vi_en = db.derive_vi_en(derive_since)
+    return count_en_vi, count_vi_en
+
+def _ingest_parallel_corpus(db, source_file, target_file, alignment, batch_size=5000, workers=OPUS_WORKERS,
+                            reverse=True, checkpoint=None, window_lines=OPUS_CHECKPOINT_LINES):
+    """
+    Deduplicate a parallel corpus and stream its entries into the database in batches.
+    With reverse=False only the EN-VI entries are inserted and VI-EN is derived from them.
+    
+    The corpus is processed in windows of window_lines line pairs. With a checkpoint name,
+    each window's rows and the byte offsets where the next window starts are committed in
+    one transaction, so an interrupted run resumes at the first unfinished window without
+    re-reading or re-inserting earlier lines. Pairs repeated across windows become separate
+    rows whose frequencies are summed by remove_duplicates().
+    
+    Line pairs go through the subtitle-noise QualityFilter (OPUS_QUALITY_FILTER) in the
+    worker processes; rejections are recorded per rule as pairs_rejected.<rule> metrics.
+    """
+    count_en_vi = 0
+    count_vi_en = 0
+    
+    start = (0, 0)
+    position = db.get_checkpoint(checkpoint) if checkpoint else None
+    if position == DONE:
+        return 0, 0
+    if position:
+        start = tuple(int(offset) for offset in position.split())
+        print(f"Resuming corpus at byte offsets {start[0]:,} / {start[1]:,}")
+        metrics.incr_source('resumed_bytes', start[0] + start[1])
     
     try:
-        with open(source_file, 'r', encoding='utf-8', errors='ignore') as src_f, \
-             open(target_file, 'r', encoding='utf-8', errors='ignore') as tgt_f:
-            
-            src_lines = src_f.readlines()
-            tgt_lines = tgt_f.readlines()
-            
-            # Keep only lines with 1-3 words (likely single terms)
-            dictionary_pairs = []
-            
-            for i in tqdm(range(min(len(src_lines), len(tgt_lines))), desc="Processing corpus pairs"):
-                src_line = src_lines[i].strip()
-                tgt_line = tgt_lines[i].strip()
+        windows = iter_window_counts(source_file, target_file, max(1, workers), window_lines, start,
+                                     quality=_quality_filter(alignment))
+        for end, shard_counts in tqdm(windows, desc="Processing corpus windows"):
+            with ExternalDeduplicator() as dedup:
+                with metrics.phase('parse'):
+                    for counts, rejected in shard_counts:
+                        for (src_line, tgt_line), count in counts.items():
+                            dedup.add(src_line, tgt_line, count)
+                        _record_rejected(rejected)
+                metrics.incr_source('rows_parsed', dedup.seen * 2)
                 
-                src_word_count = len(src_line.split())
-                tgt_word_count = len(tgt_line.split())
+                with db.transaction():
+                    window_en_vi, window_vi_en = _insert_pair_entries(
+                        db, dedup.items(), alignment, batch_size, reverse
+                    )
+                    if checkpoint:
+                        db.set_checkpoint(checkpoint, f"{end[0]} {end[1]}")
                 
-                # Only consider short phrases that are likely to be dictionary entries
-                if 1 <= src_word_count <= 3 and 1 <= tgt_word_count <= 3:
-                    dictionary_pairs.append((src_line, tgt_line))
-            
-            # Process pairs based on alignment direction
-            if alignment == 'en-vi':
-                for en, vi in dictionary_pairs:
-                    # Add to English-Vietnamese
-                    en_vi_entries.append({
-                        "english_word": en,
-                        "vietnamese_meaning": vi,
-                        "word_type": "",
-                        "pronunciation": "",
-                        "example": ""
-                    })
-                    
-                    # Add to Vietnamese-English
-                    vi_en_entries.append({
-                        "vietnamese_word": vi,
-                        "english_meaning": en,
-                        "word_type": "",
-                        "example": ""
-                    })
-            else:  # vi-en
-                for vi, en in dictionary_pairs:
-                    # Add to Vietnamese-English
-                    vi_en_entries.append({
-                        "vietnamese_word": vi,
-                        "english_meaning": en,
-                        "word_type": "",
-                        "example": ""
-                    })
-                    
-                    # Add to English-Vietnamese
-                    en_vi_entries.append({
-                        "english_word": en,
-                        "vietnamese_meaning": vi,
-                        "word_type": "",
-                        "pronunciation": "",
-                        "example": ""
-                    })
+                count_en_vi += window_en_vi
+                count_vi_en += window_vi_en
+                metrics.incr_source('duplicate_pairs', dedup.seen - dedup.unique)
         
-        return {
-            "en_vi": en_vi_entries,
-            "vi_en": vi_en_entries
-        }
+        if checkpoint:
+            db.set_checkpoint(checkpoint, DONE)
     
     except Exception as e:
         logging.error(f"Error processing parallel corpus: {e}")
-        return {
-            "en_vi": [],
-            "vi_en": []
-        }
\ No newline at end of file
+    
+    return count_en_vi, count_vi_en
+
+def _ingest_alignment_candidates(db, en_file, vi_file, batch_size=5000, workers=OPUS_WORKERS, reverse=True,
+                                 checkpoint=None):
+    """
+    Insert word-level translation candidates aligned from full sentence pairs.
+    The scores need corpus-wide statistics, so the candidates are committed as one unit.
+    """
+    if checkpoint and db.get_checkpoint(checkpoint) == DONE:
+        return 0, 0
+    
+    try:
+        from processors.alignment import extract_alignment_candidates
+    except ImportError as e:
+        logging.error(f"Word alignment needs numpy: {e}")
+        return 0, 0
+    
+    with metrics.phase('parse'):
+        candidates = extract_alignment_candidates(
+            en_file, vi_file,
+            workers=workers,
+            method=OPUS_ALIGNMENT_METHOD,
+            top_k=OPUS_ALIGNMENT_TOP_K
+        )
+    metrics.incr_source('alignment_candidates', len(candidates))
+    
+    with db.transaction():
+        count_en_vi, count_vi_en = _insert_pair_entries(
+            db, ((en, vi, frequency) for en, vi, score, frequency in candidates), 'en-vi', batch_size, reverse
+        )
+        if checkpoint:
+            db.set_checkpoint(checkpoint, DONE)
+    
+    print(f"Aligned {count_en_vi} word-level candidates from full sentences")
+    return count_en_vi, count_vi_en
@@ -1,20 +1,54 @@
 import os
 import json
-import requests
-import random
-import time
 import logging
-from bs4 import BeautifulSoup
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import wait, FIRST_COMPLETED
 from tqdm import tqdm
-from config import CACHE_DIR, USER_AGENTS
+from config import CACHE_DIR
+from coverage_index import CoverageIndex
+from metrics import metrics
+from collectors.scraper_engine import ScraperEngine, HtmlExtractor
 
-def scrape_tflat_dictionary_parallel(db, start_page=1, end_page=100, max_workers=5):
+# Vietnamese alphabet used to page through TracauVN
+VIETNAMESE_LETTERS = ["a", "ă", "â", "b", "c", "d", "đ", "e", "ê", "g", "h", "i", "k", 
+                      "l", "m", "n", "o", "ô", "ơ", "p", "q", "r", "s", "t", "u", "ư", "v", "x", "y"]
+
+# CSS selectors for the fields of each dictionary entry
+TFLAT_ENTRY_SELECTOR = 'div.word-entry'
+TFLAT_FIELDS = {
+    "english_word": 'div.word',
+    "vietnamese_meaning": 'div.meaning',
+    "word_type": 'div.type',
+    "pronunciation": 'div.pronunciation',
+    "example": 'div.example'
+}
+
+TRACAU_URL = "https://tracau.vn/dictionaries/vietnamese-english/{}"
+TRACAU_ENTRY_SELECTOR = 'div.word-item'  # Adjust selector as needed
+TRACAU_FIELDS = {
+    "vietnamese_word": 'div.vietnamese',
+    "english_meaning": 'div.english',
+    "word_type": 'div.type',
+    "example": 'div.example'
+}
+
+def tflat_extractor(backend=None):
+    return HtmlExtractor(TFLAT_ENTRY_SELECTOR, TFLAT_FIELDS,
+                         required=("english_word", "vietnamese_meaning"), backend=backend)
+
+def tracau_extractor(backend=None):
+    return HtmlExtractor(TRACAU_ENTRY_SELECTOR, TRACAU_FIELDS,
+                         required=("vietnamese_word", "english_meaning"), backend=backend)
+
+def scrape_tflat_dictionary_parallel(db, start_page=1, end_page=100, max_workers=5, engine=None):
     """Scrape TFlat dictionary with parallel processing"""
     print(f"Scraping TFlat dictionary (pages {start_page}-{end_page})...")
     base_url = "https://tflat.vn/tu-dien/tu-vung?page={}"
     
     total_entries = 0
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    extractor = tflat_extractor()
+    owns_engine = engine is None
+    engine = engine or ScraperEngine(max_workers=max_workers, source="TFlat")
     
     # Function to scrape a single page
     def scrape_page(page):
@@ -28,155 +62,172 @@ def scrape_tflat_dictionary_parallel(db, start_page=1, end_page=100, max_workers
             except Exception as e:
                 logging.error(f"Error loading cache for page {page}: {e}")
         
-        try:
-            headers = {'User-Agent': random.choice(USER_AGENTS)}
-            response = requests.get(base_url.format(page), headers=headers)
-            
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                word_entries = soup.find_all('div', class_='word-entry')
-                
-                if not word_entries:
-                    return []
-                
-                page_results = []
-                for entry in word_entries:
-                    try:
-                        english_word = entry.find('div', class_='word').text.strip()
-                        pronunciation = entry.find('div', class_='pronunciation').text.strip() if entry.find('div', class_='pronunciation') else ""
-                        word_type = entry.find('div', class_='type').text.strip() if entry.find('div', class_='type') else ""
-                        vietnamese_meaning = entry.find('div', class_='meaning').text.strip()
-                        example = entry.find('div', class_='example').text.strip() if entry.find('div', class_='example') else ""
-                        
-                        page_results.append({
-                            "english_word": english_word,
-                            "vietnamese_meaning": vietnamese_meaning,
-                            "word_type": word_type,
-                            "pronunciation": pronunciation,
-                            "example": example
-                        })
-                    except Exception as e:
-                        logging.error(f"Error processing entry on page {page}: {e}")
-                
-                # Cache the results
-                with open(cache_file, 'w', encoding='utf-8') as f:
-                    json.dump(page_results, f, ensure_ascii=False)
-                
-                time.sleep(random.uniform(0.5, 1))
-                return page_results
-            else:
-                logging.warning(f"Failed to get page {page}, status: {response.status_code}")
-                return []
-        except Exception as e:
-            logging.error(f"Error scraping page {page}: {e}")
-            return []
+        # The engine's per-host rate limiter replaces the fixed sleep between pages
+        html = engine.fetch(base_url.format(page))
+        if html is None:
+            return None
+        
+        page_results = extractor.extract(html)
+        if page_results:
+            # Cache the results
+            with open(cache_file, 'w', encoding='utf-8') as f:
+                json.dump(page_results, f, ensure_ascii=False)
+        
+        return page_results
+    
+    # Resume after the last page whose batch was committed by a previous run
+    last_page = db.get_checkpoint("tflat")
+    if last_page and int(last_page) >= start_page:
+        print(f"Resuming TFlat after page {last_page}")
+        start_page = int(last_page) + 1
     
-    # Process pages in batches to manage memory
+    # Process pages in batches to manage memory, reusing the engine's pool
     batch_size = 20
     
-    for batch_start in range(start_page, end_page + 1, batch_size):
-        batch_end = min(batch_start + batch_size - 1, end_page)
-        print(f"Processing batch: pages {batch_start}-{batch_end}")
-        
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_page = {executor.submit(scrape_page, page): page for page in range(batch_start, batch_end + 1)}
+    try:
+        for batch_start in range(start_page, end_page + 1, batch_size):
+            batch_end = min(batch_start + batch_size - 1, end_page)
+            print(f"Processing batch: pages {batch_start}-{batch_end}")
             
+            pages = range(batch_start, batch_end + 1)
+            results = dict(tqdm(engine.map_unordered(scrape_page, pages), total=len(pages), desc="Scraping pages"))
+            
+            # Only the leading run of successful pages (in page order) is inserted and checkpointed,
+            # so a failed page and everything after it are fetched again by the next run
             all_entries = []
-            for future in tqdm(as_completed(future_to_page), total=len(future_to_page), desc="Scraping pages"):
-                page_entries = future.result()
-                all_entries.extend(page_entries)
-        
-        # Insert batch into database
-        if all_entries:
-            count = db.batch_insert_en_vi(all_entries)
-            total_entries += count
-            print(f"Collected {count} entries from batch {batch_start}-{batch_end}")
+            last_page = None
+            for page in pages:
+                if results.get(page) is None:
+                    break
+                all_entries.extend(results[page])
+                last_page = page
+            metrics.incr_source('rows_parsed', len(all_entries), source="TFlat")
+            
+            # Insert the pages together with their checkpoint
+            if last_page is not None:
+                with metrics.source("TFlat"), db.transaction():
+                    count = db.batch_insert_en_vi(all_entries)
+                    db.set_checkpoint("tflat", last_page)
+                if count:
+                    total_entries += count
+                    print(f"Collected {count} entries from pages {batch_start}-{last_page}")
+            
+            if last_page != batch_end:
+                print(f"Page {batch_start if last_page is None else last_page + 1} failed, stopping TFlat crawl")
+                break
+    finally:
+        if owns_engine:
+            engine.close()
     
     return total_entries
 
-def scrape_tracau_dictionary(db, limit=10000):
-    """Scrape TracauVN for Vietnamese-English words"""
+def coverage_gap_letters(db, coverage=None):
+    """Vietnamese letters ordered by how many wordlist headwords are still missing"""
+    coverage = coverage or CoverageIndex.from_wordlist()
+    gaps = coverage.missing_by_letter(db)
+    return [letter for letter, missing in gaps.items() if missing and letter in VIETNAMESE_LETTERS]
+
+def scrape_tracau_dictionary(db, limit=10000, letters=None, max_workers=8, base_url=TRACAU_URL,
+                             cache_dir=CACHE_DIR, min_interval=1, jitter=1):
+    """
+    Scrape TracauVN for Vietnamese-English words.
+    `letters` overrides the letter order, e.g. with coverage_gap_letters(db) so the
+    request budget goes to letters where the database has the most missing headwords.
+    
+    All letters are crawled concurrently: every completed page queues the next page of
+    its letter, while the engine's per-host rate limiter keeps the global request rate
+    at one request per `min_interval`-`min_interval + jitter` seconds. Cached pages are
+    loaded on the pool without waiting for the rate limiter.
+    """
     print(f"Scraping TracauVN dictionary (limit: {limit} words)...")
-    base_url = "https://tracau.vn/dictionaries/vietnamese-english/{}"
     
     # List of Vietnamese letters to search
-    vietnamese_letters = ["a", "ă", "â", "b", "c", "d", "đ", "e", "ê", "g", "h", "i", "k", 
-                          "l", "m", "n", "o", "ô", "ơ", "p", "q", "r", "s", "t", "u", "ư", "v", "x", "y"]
+    vietnamese_letters = letters or VIETNAMESE_LETTERS
     
     total_entries = 0
+    os.makedirs(cache_dir, exist_ok=True)
+    extractor = tracau_extractor()
+    engine = ScraperEngine(max_workers=max_workers, min_interval=min_interval, jitter=jitter, source="TracauVN")
     
-    for letter in vietnamese_letters:
-        if total_entries >= limit:
-            break
-            
-        print(f"Processing words starting with '{letter}'...")
-        page = 1
-        letter_entries = []
+    def fetch_page(letter, page):
+        cache_file = f"{cache_dir}/tracau_{letter}_page_{page}.json"
         
-        while total_entries < limit:
-            cache_file = f"{CACHE_DIR}/tracau_{letter}_page_{page}.json"
-            
-            # Check cache
-            if os.path.exists(cache_file):
-                try:
-                    with open(cache_file, 'r', encoding='utf-8') as f:
-                        page_entries = json.load(f)
-                        if not page_entries:
-                            break
-                        letter_entries.extend(page_entries)
-                        page += 1
-                        continue
-                except Exception as e:
-                    logging.error(f"Error loading cache for {letter} page {page}: {e}")
-            
+        # Check cache
+        if os.path.exists(cache_file):
             try:
-                headers = {'User-Agent': random.choice(USER_AGENTS)}
-                response = requests.get(f"{base_url.format(letter)}?page={page}", headers=headers)
-                
-                if response.status_code == 200:
-                    soup = BeautifulSoup(response.content, 'html.parser')
-                    word_entries = soup.find_all('div', class_='word-item')  # Adjust selector as needed
-                    
-                    if not word_entries:
-                        print(f"No more words found for letter {letter}")
-                        break
-                    
-                    page_entries = []
-                    for entry in word_entries:
-                        try:
-                            vietnamese_word = entry.find('div', class_='vietnamese').text.strip()
-                            english_meaning = entry.find('div', class_='english').text.strip()
-                            word_type = entry.find('div', class_='type').text.strip() if entry.find('div', class_='type') else ""
-                            example = entry.find('div', class_='example').text.strip() if entry.find('div', class_='example') else ""
-                            
-                            page_entries.append({
-                                "vietnamese_word": vietnamese_word,
-                                "english_meaning": english_meaning,
-                                "word_type": word_type,
-                                "example": example
-                            })
-                        except Exception as e:
-                            logging.error(f"Error processing word entry for letter {letter}, page {page}: {e}")
-                    
-                    # Cache the results
-                    with open(cache_file, 'w', encoding='utf-8') as f:
-                        json.dump(page_entries, f, ensure_ascii=False)
-                    
-                    letter_entries.extend(page_entries)
-                    page += 1
-                    time.sleep(random.uniform(1, 2))
-                else:
-                    print(f"Failed to get page {page} for letter {letter}, status: {response.status_code}")
-                    break
-                    
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
             except Exception as e:
-                logging.error(f"Error scraping letter {letter}, page {page}: {e}")
-                break
+                logging.error(f"Error loading cache for {letter} page {page}: {e}")
+        
+        html = engine.fetch(f"{base_url.format(letter)}?page={page}")
+        if html is None:
+            print(f"Failed to get page {page} for letter {letter}")
+            return None
+        
+        page_entries = extractor.extract(html)
+        if page_entries:
+            # Cache the results
+            with open(cache_file, 'w', encoding='utf-8') as f:
+                json.dump(page_entries, f, ensure_ascii=False)
         
-        # Insert batch into database
-        if letter_entries:
-            count = db.batch_insert_vi_en(letter_entries)
-            total_entries += count
-            print(f"Collected {count} Vietnamese-English entries for letter '{letter}'")
+        return page_entries
+    
+    # Work queue of in-flight pages: every letter starts after its last committed page, or inside
+    # a page the limit cut short ("page:offset" = the page's first offset entries were inserted)
+    pending = {}
+    for letter in vietnamese_letters:
+        last_page = db.get_checkpoint(f"tracau/{letter}")
+        if last_page == "done":
+            continue
+        if last_page and ':' in last_page:
+            page, offset = (int(part) for part in last_page.split(':'))
+        else:
+            page, offset = (int(last_page) + 1 if last_page else 1), 0
+        pending[engine.submit(fetch_page, letter, page)] = (letter, page, offset)
+    letter_counts = {}
+    
+    try:
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                letter, page, offset = pending.pop(future)
+                try:
+                    page_entries = future.result()
+                except Exception as e:
+                    logging.error(f"Error scraping letter {letter}, page {page}: {e}")
+                    continue
+                
+                if not page_entries:
+                    if page_entries is not None:
+                        # An empty page ends the letter
+                        db.set_checkpoint(f"tracau/{letter}", "done")
+                    if letter in letter_counts:
+                        print(f"Collected {letter_counts[letter]} Vietnamese-English entries for letter '{letter}'")
+                    continue
+                
+                # Insert each page as soon as it completes, with its checkpoint: the page number when
+                # it fit within the limit, otherwise "page:offset" so the next run continues inside it
+                # (offsets count parsed entries, before the normalizer rejects any)
+                page_entries = page_entries[offset:]
+                metrics.incr_source('rows_parsed', len(page_entries), source="TracauVN")
+                remaining = limit - total_entries
+                if remaining > 0:
+                    taken = page_entries[:remaining]
+                    with metrics.source("TracauVN"), db.transaction():
+                        count = db.batch_insert_vi_en(taken)
+                        if len(taken) == len(page_entries):
+                            db.set_checkpoint(f"tracau/{letter}", page)
+                        else:
+                            db.set_checkpoint(f"tracau/{letter}", f"{page}:{offset + len(taken)}")
+                    total_entries += count
+                    letter_counts[letter] = letter_counts.get(letter, 0) + count
+                
+                if total_entries < limit:
+                    pending[engine.submit(fetch_page, letter, page + 1)] = (letter, page + 1, 0)
+    finally:
+        for future in pending:
+            future.cancel()
+        engine.close()
     
     return total_entries
\ No newline at end of file
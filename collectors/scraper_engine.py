@@ -0,0 +1,230 @@
+import time
+import random
+import logging
+import threading
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from requests.adapters import HTTPAdapter
+from config import USER_AGENTS
+from metrics import metrics
+
+# Parser backends in order of preference; the first importable one is used
+PARSER_BACKENDS = ['selectolax', 'lxml', 'bs4']
+
+class _SelectolaxBackend:
+    name = 'selectolax'
+    
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+        self._parse = LexborHTMLParser
+    
+    def parse(self, html):
+        return self._parse(html)
+    
+    def compile(self, selector):
+        return selector
+    
+    def select(self, node, selector):
+        return node.css(selector)
+    
+    def select_first(self, node, selector):
+        return node.css_first(selector)
+    
+    def text(self, node):
+        return node.text().strip()
+
+class _LxmlBackend:
+    name = 'lxml'
+    
+    def __init__(self):
+        import lxml.html
+        from lxml.cssselect import CSSSelector
+        self._parse = lxml.html.fromstring
+        self._selector = CSSSelector
+    
+    def parse(self, html):
+        return self._parse(html)
+    
+    def compile(self, selector):
+        return self._selector(selector)
+    
+    def select(self, node, selector):
+        return selector(node)
+    
+    def select_first(self, node, selector):
+        matches = selector(node)
+        return matches[0] if matches else None
+    
+    def text(self, node):
+        return node.text_content().strip()
+
+class _SoupBackend:
+    name = 'bs4'
+    
+    def __init__(self):
+        from bs4 import BeautifulSoup
+        self._soup = BeautifulSoup
+    
+    def parse(self, html):
+        return self._soup(html, 'html.parser')
+    
+    def compile(self, selector):
+        return selector
+    
+    def select(self, node, selector):
+        return node.select(selector)
+    
+    def select_first(self, node, selector):
+        return node.select_one(selector)
+    
+    def text(self, node):
+        return node.get_text().strip()
+
+_BACKEND_CLASSES = {
+    'selectolax': _SelectolaxBackend,
+    'lxml': _LxmlBackend,
+    'bs4': _SoupBackend
+}
+
+def available_backends():
+    """Names of the parser backends that can be imported in this environment"""
+    names = []
+    for name in PARSER_BACKENDS:
+        try:
+            _BACKEND_CLASSES[name]()
+            names.append(name)
+        except ImportError:
+            continue
+    return names
+
+def get_parser_backend(name=None):
+    """Return the requested parser backend, or the fastest one that is installed"""
+    if name:
+        return _BACKEND_CLASSES[name]()
+    
+    for candidate in PARSER_BACKENDS:
+        try:
+            return _BACKEND_CLASSES[candidate]()
+        except ImportError:
+            continue
+    raise ImportError("No HTML parser backend available (install selectolax, lxml or beautifulsoup4)")
+
+class HtmlExtractor:
+    """
+    Extract records from HTML with CSS selectors.
+    Selectors are compiled once and each field is looked up once per record.
+    """
+    
+    def __init__(self, record_selector, fields, required=(), backend=None):
+        self.backend = backend if hasattr(backend, 'parse') else get_parser_backend(backend)
+        self.record_selector = self.backend.compile(record_selector)
+        self.fields = [(name, self.backend.compile(selector)) for name, selector in fields.items()]
+        self.required = set(required)
+    
+    def extract(self, html):
+        """Return one dict per record; records missing a required field are skipped"""
+        with metrics.phase('parse'):
+            return self._extract(html)
+    
+    def _extract(self, html):
+        backend = self.backend
+        records = []
+        for node in backend.select(backend.parse(html), self.record_selector):
+            record = {}
+            for name, selector in self.fields:
+                match = backend.select_first(node, selector)
+                record[name] = backend.text(match) if match is not None else ""
+            if all(record[name] for name in self.required):
+                records.append(record)
+        return records
+
+class HostRateLimiter:
+    """Enforce a minimum (jittered) interval between requests to the same host"""
+    
+    def __init__(self, min_interval=0.5, jitter=0.5):
+        self.min_interval = min_interval
+        self.jitter = jitter
+        self._next_slot = {}
+        self._lock = threading.Lock()
+    
+    def wait(self, host):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval + random.uniform(0, self.jitter)
+        # Sleep outside the lock so other hosts are not blocked
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+class ScraperEngine:
+    """
+    Reusable scraping engine: one long-lived thread pool, a pooled
+    requests.Session per host and a per-host rate limiter.
+    """
+    
+    def __init__(self, max_workers=5, min_interval=0.5, jitter=0.5, timeout=30, source=None):
+        self.max_workers = max_workers
+        # Metrics source name; pool threads do not inherit the caller's metrics.source()
+        self.source = source
+        self.timeout = timeout
+        self.rate_limiter = HostRateLimiter(min_interval=min_interval, jitter=jitter)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._sessions = {}
+        self._lock = threading.Lock()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def session_for(self, host):
+        """Return the shared session for a host, creating it on first use"""
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers['User-Agent'] = random.choice(USER_AGENTS)
+                self._sessions[host] = session
+            return session
+    
+    def fetch(self, url):
+        """Fetch a URL politely; returns the response body or None on failure"""
+        host = urlsplit(url).netloc
+        self.rate_limiter.wait(host)
+        try:
+            with metrics.phase('network'):
+                response = self.session_for(host).get(url, timeout=self.timeout)
+            metrics.add_bytes(len(response.content), source=self.source)
+            if response.status_code == 200:
+                return response.content
+            logging.warning(f"Failed to get {url}, status: {response.status_code}")
+        except Exception as e:
+            logging.error(f"Error fetching {url}: {e}")
+        return None
+    
+    def submit(self, func, *args, **kwargs):
+        return self._executor.submit(func, *args, **kwargs)
+    
+    def map_unordered(self, func, items):
+        """Run func over items on the shared pool, yielding (item, result) as they complete"""
+        future_to_item = {self._executor.submit(func, item): item for item in items}
+        for future in as_completed(future_to_item):
+            item = future_to_item[future]
+            try:
+                yield item, future.result()
+            except Exception as e:
+                logging.error(f"Error processing {item}: {e}")
+                yield item, None
+    
+    def close(self):
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
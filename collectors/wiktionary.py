@@ -5,10 +5,62 @@ import time
 import random
 import logging
 from tqdm import tqdm
-from config import CACHE_DIR, USER_AGENTS
+from config import CACHE_DIR, USER_AGENTS, DERIVE_REVERSE
+from coverage_index import CoverageIndex
+from metrics import metrics
 
-def download_wiktionary_data(db):
-    """Download and process Wiktionary data"""
+# Checkpoint holding the last headword of the leading run of successfully fetched words;
+# it is cleared once the missing list is used up so failed words are retried from the start
+CHECKPOINT = 'wiktionary'
+
+def parse_wiktionary_entries(vi_word, data, reverse=True):
+    """
+    Extract EN-VI and VI-EN entries from a Wiktionary REST definition response.
+    With reverse=False only the native VI-EN entries are built.
+    """
+    entries_en_vi = []
+    entries_vi_en = []
+    
+    for definition in data.get('vi', []):
+        if 'definitions' in definition:
+            for def_item in definition['definitions']:
+                # Extract English translation if available
+                en_translation = ""
+                if 'translations' in def_item:
+                    for trans in def_item['translations']:
+                        if trans.get('language') == 'en' and 'word' in trans:
+                            en_translation = trans['word']
+                            break
+                
+                if en_translation:
+                    # Add to Vietnamese-English
+                    entries_vi_en.append({
+                        "vietnamese_word": vi_word,
+                        "english_meaning": en_translation,
+                        "word_type": definition.get('partOfSpeech', ''),
+                        "example": ""
+                    })
+                    
+                    if not reverse:
+                        continue
+                    
+                    # Add to English-Vietnamese
+                    entries_en_vi.append({
+                        "english_word": en_translation,
+                        "vietnamese_meaning": vi_word,
+                        "word_type": definition.get('partOfSpeech', ''),
+                        "pronunciation": "",
+                        "example": ""
+                    })
+    
+    return entries_en_vi, entries_vi_en
+
+def download_wiktionary_data(db, limit=1000):
+    """Download and process Wiktionary data for headwords missing from the database"""
+    with metrics.source("Wiktionary"):
+        return _download_wiktionary_data(db, limit)
+
+def _download_wiktionary_data(db, limit):
     print("Downloading Wiktionary data...")
     
     # Create directory for Wiktionary data
@@ -16,28 +68,41 @@ def download_wiktionary_data(db):
     os.makedirs(wiktionary_dir, exist_ok=True)
     
     try:
-        # Get Vietnamese words from database
-        vietnamese_words = db.get_vietnamese_words(limit=1000)
+        # Only fetch headwords from the Viet74K wordlist that the database is still missing
+        # Resume after the last headword a previous run fetched before its first failure
+        last_word = db.get_checkpoint(CHECKPOINT)
+        coverage = CoverageIndex.from_wordlist()
+        vietnamese_words = coverage.missing_headwords(db, limit=limit, after=last_word)
+        if last_word and vietnamese_words:
+            print(f"Resuming Wiktionary after '{last_word}'")
+        elif last_word:
+            # Every word after the checkpoint was processed: start over to retry the failed ones
+            db.clear_checkpoints(CHECKPOINT)
+            vietnamese_words = coverage.missing_headwords(db, limit=limit)
+        # Whether this run reaches the end of the missing list
+        exhausted = not limit or len(vietnamese_words) < limit
+        # The checkpoint only moves over words fetched without error, and never over the backup list
+        checkpointing = True
         
         if not vietnamese_words:
-            print("No Vietnamese words found in database, using backup list")
-            vi_words_file = f"{CACHE_DIR}/vietnamese-wordlist.txt"
+            if len(coverage):
+                print("All wordlist headwords are already covered or processed, nothing to fetch")
+                return 0
             
-            # Try to download a list of Vietnamese words if we don't have any
-            if not os.path.exists(vi_words_file):
-                try:
-                    url = "https://raw.githubusercontent.com/duyetdev/vietnamese-wordlist/master/Viet74K.txt"
-                    urllib.request.urlretrieve(url, vi_words_file)
-                    
-                    with open(vi_words_file, 'r', encoding='utf-8') as f:
-                        vietnamese_words = [line.strip() for line in f if line.strip()][:1000]
-                except:
-                    # Fallback to a minimal list
-                    vietnamese_words = ["anh", "em", "học", "làm", "người", "thời gian", "công việc", 
-                                       "tình yêu", "gia đình", "bạn bè", "trường học", "thành phố"]
+            print("Vietnamese wordlist unavailable, using backup list")
+            # Fallback to a minimal list
+            vietnamese_words = ["anh", "em", "học", "làm", "người", "thời gian", "công việc", 
+                               "tình yêu", "gia đình", "bạn bè", "trường học", "thành phố"]
+            # Skip headwords the database already has without querying it
+            vietnamese_words = [word for word in vietnamese_words if not db.has_headword(word)]
+            checkpointing = False
+            exhausted = False
         
         print(f"Processing {len(vietnamese_words)} Vietnamese words from Wiktionary")
         
+        # With DERIVE_REVERSE only VI-EN rows are inserted and EN-VI is derived per batch
+        reverse = not DERIVE_REVERSE
+        
         # Process in smaller batches to avoid overwhelming the API
         batch_size = 20
         entries_en_vi = []
@@ -45,6 +110,8 @@ def download_wiktionary_data(db):
         
         for i in range(0, len(vietnamese_words), batch_size):
             batch = vietnamese_words[i:i+batch_size]
+            # Last word of the batch before the first failure (of this run)
+            last_fetched = None
             print(f"Processing batch {i//batch_size + 1}/{(len(vietnamese_words) + batch_size - 1)//batch_size}")
             
             for vi_word in tqdm(batch, desc="Fetching Wiktionary entries"):
@@ -54,65 +121,71 @@ def download_wiktionary_data(db):
                     api_url = f"https://en.wiktionary.org/api/rest_v1/page/definition/{word_for_url}"
                     cache_file = f"{wiktionary_dir}/{word_for_url.replace('/', '_')}.json"
                     
-                    if os.path.exists(cache_file):
+                    cached = os.path.exists(cache_file)
+                    fetched = True
+                    if cached:
                         with open(cache_file, 'r', encoding='utf-8') as f:
                             data = json.load(f)
                     else:
                         headers = {'User-Agent': random.choice(USER_AGENTS)}
-                        response = requests.get(api_url, headers=headers)
+                        with metrics.phase('network'):
+                            response = requests.get(api_url, headers=headers)
+                        metrics.add_bytes(len(response.content))
                         
                         if response.status_code == 200:
-                            data = response.json()
+                            with metrics.phase('parse'):
+                                data = response.json()
+                        elif response.status_code == 404:
+                            # Wiktionary has no entry: cache the empty answer instead of asking again
+                            data = {}
+                        else:
+                            data = None
+                            fetched = False
+                        
+                        if fetched:
                             # Cache the result
                             with open(cache_file, 'w', encoding='utf-8') as f:
                                 json.dump(data, f, ensure_ascii=False)
-                        else:
-                            data = None
-                    
-                    if data and 'vi' in data:
-                        for definition in data['vi']:
-                            if 'definitions' in definition:
-                                for def_item in definition['definitions']:
-                                    # Extract English translation if available
-                                    en_translation = ""
-                                    if 'translations' in def_item:
-                                        for trans in def_item['translations']:
-                                            if trans.get('language') == 'en' and 'word' in trans:
-                                                en_translation = trans['word']
-                                                break
-                                    
-                                    if en_translation:
-                                        # Add to Vietnamese-English
-                                        entries_vi_en.append({
-                                            "vietnamese_word": vi_word,
-                                            "english_meaning": en_translation,
-                                            "word_type": definition.get('partOfSpeech', ''),
-                                            "example": ""
-                                        })
-                                        
-                                        # Add to English-Vietnamese
-                                        entries_en_vi.append({
-                                            "english_word": en_translation,
-                                            "vietnamese_meaning": vi_word,
-                                            "word_type": definition.get('partOfSpeech', ''),
-                                            "pronunciation": "",
-                                            "example": ""
-                                        })
                     
-                    # Be nice to the API
-                    time.sleep(0.5)
+                    if data:
+                        with metrics.phase('parse'):
+                            word_en_vi, word_vi_en = parse_wiktionary_entries(vi_word, data, reverse)
+                        metrics.incr_source('rows_parsed', len(word_en_vi) + len(word_vi_en))
+                        entries_en_vi.extend(word_en_vi)
+                        entries_vi_en.extend(word_vi_en)
                     
+                    # Be nice to the API (cached words never hit it)
+                    if not cached:
+                        time.sleep(0.5)
+                    if not fetched:
+                        # A failed word stops the checkpoint so a later run retries it
+                        checkpointing = False
+                    elif checkpointing:
+                        last_fetched = vi_word
+                
                 except Exception as e:
                     logging.error(f"Error processing Wiktionary data for {vi_word}: {e}")
+                    checkpointing = False
             
-            # Insert batch into database
-            if entries_en_vi:
-                db.batch_insert_en_vi(entries_en_vi)
-                entries_en_vi = []
+            # Insert the batch and its checkpoint (the last word fetched before any failure) in one transaction
+            with db.transaction():
+                derive_since = db.max_id('vietnamese_english')
+                if entries_en_vi:
+                    db.batch_insert_en_vi(entries_en_vi)
+                    entries_en_vi = []
                 
-            if entries_vi_en:
-                db.batch_insert_vi_en(entries_vi_en)
-                entries_vi_en = []
+                if entries_vi_en:
+                    db.batch_insert_vi_en(entries_vi_en)
+                    entries_vi_en = []
+                
+                if not reverse:
+                    db.derive_en_vi(derive_since)
+                if last_fetched:
+                    db.set_checkpoint(CHECKPOINT, last_fetched)
+        
+        if exhausted:
+            # The missing list is used up: the next run starts over and retries the failed words
+            db.clear_checkpoints(CHECKPOINT)
         
         # Get count of entries
         counts = db.get_counts()
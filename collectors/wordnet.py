@@ -1,12 +1,44 @@
 import os
 import tarfile
 import logging
-import urllib.request
 from tqdm import tqdm
-from config import CACHE_DIR
+from config import CACHE_DIR, WORDNET_URL, DERIVE_REVERSE
+from metrics import metrics
+from utils import download_file_simple
+from processors.wordnet import SynsetIndex, DATA_FILES, INDEX_FILES, POS_NAMES, parse_synset_id
 
-def download_wordnet_data(db):
+# Checkpoint marking the synset mapping as imported, so later runs do not insert it again
+CHECKPOINT = 'wordnet/synsets'
+DONE = 'done'
+
+def _ensure_wordnet_files(wordnet_dir):
+    """Download Princeton WordNet and extract its data/index files if they are not cached"""
+    wanted = DATA_FILES + INDEX_FILES
+    if any(os.path.exists(os.path.join(wordnet_dir, name)) for name in wanted):
+        return
+    
+    archive = f"{CACHE_DIR}/WordNet-3.0.tar.gz"
+    if not os.path.exists(archive):
+        print("Downloading Princeton WordNet...")
+        if not download_file_simple(WORDNET_URL, archive):
+            return
+    
+    with tarfile.open(archive, 'r:gz') as tar:
+        for member in tar.getmembers():
+            name = os.path.basename(member.name)
+            if member.isfile() and name in wanted:
+                with tar.extractfile(member) as src, open(os.path.join(wordnet_dir, name), 'wb') as dst:
+                    dst.write(src.read())
+
+def download_wordnet_data(db, batch_size=5000):
     """Download and process WordNet data with Vietnamese translations"""
+    with metrics.source("WordNet"):
+        return _download_wordnet_data(db, batch_size)
+
+def _download_wordnet_data(db, batch_size):
+    if db.get_checkpoint(CHECKPOINT) == DONE:
+        print("WordNet was already imported, skipping")
+        return 0
     print("Downloading WordNet data...")
     
     # Create directory for WordNet data
@@ -20,60 +52,93 @@ def download_wordnet_data(db):
         
         if not os.path.exists(vi_wordnet_file):
             print("Downloading Vietnamese WordNet mapping...")
-            urllib.request.urlretrieve(vi_wordnet_url, vi_wordnet_file)
+            if not download_file_simple(vi_wordnet_url, vi_wordnet_file):
+                return 0
         
-        # Create entries from the wordnet file
-        entries_en_vi = []
-        entries_vi_en = []
+        # Load the synset -> English lemma index used to resolve synset IDs
+        _ensure_wordnet_files(wordnet_dir)
+        with metrics.phase('parse'):
+            synsets = SynsetIndex.from_directory(wordnet_dir)
+        if not len(synsets):
+            print("No WordNet data files available, skipping WordNet import")
+            return 0
         
-        with open(vi_wordnet_file, 'r', encoding='utf-8', errors='ignore') as f:
-            for line in tqdm(f, desc="Processing WordNet entries"):
-                try:
-                    parts = line.strip().split('\t')
-                    if len(parts) >= 2:
-                        synset_id = parts[0].strip()
-                        vietnamese_words = parts[1].strip().split(',')
+        print(f"Loaded {len(synsets)} WordNet synsets")
+        
+        # With DERIVE_REVERSE only EN-VI rows are inserted and VI-EN is derived once at the end
+        reverse = not DERIVE_REVERSE
+        
+        # Every row and the checkpoint are committed together: an interrupted import leaves
+        # nothing behind, so the next run can import the whole mapping again
+        with db.transaction():
+            derive_since = db.max_id('english_vietnamese')
+            
+            # Stream entries into the database in batches instead of building full lists
+            entries_en_vi = []
+            entries_vi_en = []
+            count_en_vi = 0
+            count_vi_en = 0
+            unresolved = 0
+            
+            with open(vi_wordnet_file, 'r', encoding='utf-8', errors='ignore') as f:
+                for line in tqdm(f, desc="Processing WordNet entries"):
+                    try:
+                        parts = line.strip().split('\t')
+                        if len(parts) < 2:
+                            continue
                         
-                        # Extract part of speech from synset ID
-                        pos = ""
-                        if synset_id.startswith('n'):
-                            pos = "noun"
-                        elif synset_id.startswith('v'):
-                            pos = "verb"
-                        elif synset_id.startswith('a') or synset_id.startswith('s'):
-                            pos = "adjective"
-                        elif synset_id.startswith('r'):
-                            pos = "adverb"
+                        synset_id = parts[0].strip()
+                        parsed = parse_synset_id(synset_id)
+                        english_words = synsets.lookup(*parsed) if parsed else []
+                        if not english_words:
+                            unresolved += 1
+                            continue
                         
-                        # Use synset ID for English word (simplified approach)
-                        # In a more complex implementation, we'd map synset IDs to actual English words
-                        english_word = f"wordnet-{synset_id}"
+                        pos = POS_NAMES[parsed[0]]
+                        example = f"WordNet synset: {synset_id}"
+                        vietnamese_words = [w.strip() for w in parts[1].split(',') if w.strip()]
                         
-                        for vi_word in vietnamese_words:
-                            vi_word = vi_word.strip()
-                            if vi_word:
+                        for english_word in english_words:
+                            for vi_word in vietnamese_words:
                                 # Add to English-Vietnamese
                                 entries_en_vi.append({
                                     "english_word": english_word,
                                     "vietnamese_meaning": vi_word,
                                     "word_type": pos,
                                     "pronunciation": "",
-                                    "example": f"WordNet synset: {synset_id}"
+                                    "example": example
                                 })
                                 
+                                if not reverse:
+                                    continue
+                                
                                 # Add to Vietnamese-English
                                 entries_vi_en.append({
                                     "vietnamese_word": vi_word,
                                     "english_meaning": english_word,
                                     "word_type": pos,
-                                    "example": f"WordNet synset: {synset_id}"
+                                    "example": example
                                 })
-                except Exception as e:
-                    logging.error(f"Error processing WordNet line: {e}")
+                        
+                        metrics.incr_source('rows_parsed', len(english_words) * len(vietnamese_words) * (2 if reverse else 1))
+                        
+                        if len(entries_en_vi) >= batch_size:
+                            count_en_vi += db.batch_insert_en_vi(entries_en_vi)
+                            count_vi_en += db.batch_insert_vi_en(entries_vi_en)
+                            entries_en_vi = []
+                            entries_vi_en = []
+                    except Exception as e:
+                        logging.error(f"Error processing WordNet line: {e}")
+            
+            # Insert remaining entries into database
+            count_en_vi += db.batch_insert_en_vi(entries_en_vi)
+            count_vi_en += db.batch_insert_vi_en(entries_vi_en)
+            if not reverse:
+                count_vi_en = db.derive_vi_en(derive_since)
+            db.set_checkpoint(CHECKPOINT, DONE)
         
-        # Insert entries into database
-        count_en_vi = db.batch_insert_en_vi(entries_en_vi)
-        count_vi_en = db.batch_insert_vi_en(entries_vi_en)
+        if unresolved:
+            logging.warning(f"Skipped {unresolved} WordNet lines with unknown synset IDs")
         
         total_entries = count_en_vi + count_vi_en
         print(f"Processed {count_en_vi} EN-VI and {count_vi_en} VI-EN entries from WordNet")
@@ -82,4 +147,4 @@ def download_wordnet_data(db):
     
     except Exception as e:
         logging.error(f"Error downloading WordNet data: {e}")
-        return 0
\ No newline at end of file
+        return 0
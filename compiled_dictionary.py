@@ -0,0 +1,254 @@
+import os
+import json
+import mmap
+import shutil
+import struct
+import logging
+import tempfile
+from array import array
+
+# File đã biên dịch: MAGIC, độ dài metadata (uint64), metadata JSON, rồi các khối căn 8 byte:
+# bảng offset khóa và bảng offset giá trị (uint64, key_count + 1 phần tử), bảng nhóm theo
+# 2 byte đầu (uint64, BUCKETS + 1 phần tử), khối khóa (UTF-8, sắp theo byte) và khối giá trị
+# (các bản ghi của mỗi khóa, xếp theo tần suất giảm dần)
+MAGIC = b'DICTCMP1'
+HEADER = struct.Struct('<8sQ')
+# buckets[b] = chỉ số khóa đầu tiên có 2 byte đầu >= b, thu hẹp tìm kiếm nhị phân trước khi đọc khóa
+BUCKETS = 1 << 16
+FIELD_SEP = '\x1f'
+RECORD_SEP = '\x1e'
+
+# Bảng nguồn, cột khóa và các cột giá trị của mỗi chiều
+DIRECTIONS = {
+    'en_vi': ('english_vietnamese', 'english_word',
+              ['vietnamese_meaning', 'word_type', 'pronunciation', 'example', 'frequency']),
+    'vi_en': ('vietnamese_english', 'vietnamese_word',
+              ['english_meaning', 'word_type', 'example', 'frequency'])
+}
+
+def compiled_path(output_dir, direction):
+    return os.path.join(output_dir, f"{direction}.dict")
+
+def _bucket(key):
+    """Nhóm của một khóa khác rỗng: 2 byte đầu (byte thứ hai là 0 nếu khóa chỉ có 1 byte)"""
+    return key[0] << 8 | (key[1] if len(key) > 1 else 0)
+
+def _pad(f):
+    """Ghi thêm byte 0 để vị trí hiện tại chia hết cho 8"""
+    position = f.tell()
+    if position % 8:
+        f.write(b'\0' * (8 - position % 8))
+
+def _encode_record(row):
+    # Dấu phân cách không được xuất hiện trong dữ liệu
+    return FIELD_SEP.join(
+        str(value if value is not None else '').replace(FIELD_SEP, ' ').replace(RECORD_SEP, ' ')
+        for value in row
+    )
+
+def compile_direction(db, direction, output_file):
+    """
+    Biên dịch một chiều của database thành file chỉ đọc output_file. Dữ liệu được đọc
+    theo thứ tự khóa và ghi dần ra file tạm, chỉ giữ hai bảng offset trong bộ nhớ;
+    file cũ được thay thế nguyên tử nên các process đang mmap nó vẫn đọc được.
+    Trả về số khóa.
+    """
+    table, key_column, value_columns = DIRECTIONS[direction]
+    key_offsets = array('Q', [0])
+    value_offsets = array('Q', [0])
+    buckets = array('Q', bytes(8 * (BUCKETS + 1)))
+    next_bucket = 0
+    output_dir = os.path.dirname(output_file) or '.'
+    os.makedirs(output_dir, exist_ok=True)
+    
+    cursor = db.conn.cursor()
+    with tempfile.TemporaryFile(dir=output_dir) as keys_f, tempfile.TemporaryFile(dir=output_dir) as values_f:
+        # Collation BINARY của SQLite so sánh UTF-8 theo byte, đúng thứ tự tìm kiếm nhị phân
+        cursor.execute(f"""
+            SELECT {key_column}, {', '.join(value_columns)}
+            FROM {table}
+            WHERE {key_column} IS NOT NULL AND {key_column} != ''
+            ORDER BY {key_column}, frequency DESC, id
+        """)
+        current = None
+        records = []
+        
+        def flush():
+            nonlocal next_bucket
+            key = current.encode('utf-8')
+            bucket = _bucket(key)
+            while next_bucket <= bucket:
+                buckets[next_bucket] = len(key_offsets) - 1
+                next_bucket += 1
+            key_offsets.append(key_offsets[-1] + keys_f.write(key))
+            value_offsets.append(value_offsets[-1] + values_f.write(RECORD_SEP.join(records).encode('utf-8')))
+        
+        while True:
+            rows = cursor.fetchmany(10000)
+            if not rows:
+                break
+            for row in rows:
+                if row[0] != current:
+                    if current is not None:
+                        flush()
+                    current = row[0]
+                    records = []
+                records.append(_encode_record(row[1:]))
+        if current is not None:
+            flush()
+        cursor.close()
+        
+        key_count = len(key_offsets) - 1
+        for bucket in range(next_bucket, BUCKETS + 1):
+            buckets[bucket] = key_count
+        meta = json.dumps({
+            'direction': direction,
+            'fields': value_columns,
+            'key_count': key_count
+        }).encode('utf-8')
+        
+        temp_file = f"{output_file}.tmp"
+        with open(temp_file, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(meta)))
+            f.write(meta)
+            _pad(f)
+            f.write(key_offsets.tobytes())
+            f.write(value_offsets.tobytes())
+            f.write(buckets.tobytes())
+            for block in (keys_f, values_f):
+                block.seek(0)
+                shutil.copyfileobj(block, f, 1 << 20)
+        os.replace(temp_file, output_file)
+    return key_count
+
+def compile_dictionary(db, output_dir='exports'):
+    """Biên dịch cả hai chiều sau khi export; trả về {chiều: số khóa}"""
+    counts = {}
+    for direction in DIRECTIONS:
+        output_file = compiled_path(output_dir, direction)
+        try:
+            counts[direction] = compile_direction(db, direction, output_file)
+            print(f"Compiled {counts[direction]:,} {direction} headwords to {output_file}")
+        except Exception as e:
+            logging.error(f"Error compiling {direction} dictionary: {e}")
+            print(f"Error compiling {direction} dictionary: {e}")
+    return counts
+
+class CompiledDictionary:
+    """
+    Tra cứu trên file đã biên dịch bằng mmap: các process cùng dùng một bản trong page
+    cache, mở file gần như tức thì và tra chính xác/theo tiền tố bằng tìm kiếm nhị phân.
+    lookup() trả về cùng dạng kết quả với DictionaryDatabase.lookup_english/lookup_vietnamese.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, meta_length = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path} is not a compiled dictionary")
+        meta = json.loads(self._mm[HEADER.size:HEADER.size + meta_length])
+        self.direction = meta['direction']
+        self.fields = meta['fields']
+        self.key_count = meta['key_count']
+        
+        offsets_start = -(-(HEADER.size + meta_length) // 8) * 8
+        table_bytes = (self.key_count + 1) * 8
+        view = memoryview(self._mm)
+        self._key_offsets = view[offsets_start:offsets_start + table_bytes].cast('Q')
+        self._value_offsets = view[offsets_start + table_bytes:offsets_start + 2 * table_bytes].cast('Q')
+        buckets_start = offsets_start + 2 * table_bytes
+        self._buckets = view[buckets_start:buckets_start + (BUCKETS + 1) * 8].cast('Q')
+        view.release()
+        self._keys_start = buckets_start + (BUCKETS + 1) * 8
+        self._values_start = self._keys_start + self._key_offsets[self.key_count]
+    
+    def __len__(self):
+        return self.key_count
+    
+    def __contains__(self, word):
+        return self._find(word) is not None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def _key(self, index):
+        start = self._keys_start
+        return self._mm[start + self._key_offsets[index]:start + self._key_offsets[index + 1]]
+    
+    def _bisect(self, key, lo=0):
+        """Vị trí đầu tiên (từ lo) có khóa >= key, chỉ tìm trong nhóm 2 byte đầu của key"""
+        if not key:
+            return lo
+        bucket = _bucket(key)
+        # Khóa thuộc nhóm nhỏ hơn luôn nhỏ hơn key, khóa thuộc nhóm lớn hơn luôn lớn hơn
+        lo = max(lo, self._buckets[bucket])
+        hi = self._buckets[bucket + 1]
+        mm = self._mm
+        offsets = self._key_offsets
+        start = self._keys_start
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if mm[start + offsets[mid]:start + offsets[mid + 1]] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+    
+    def _find(self, word):
+        key = word.encode('utf-8')
+        index = self._bisect(key)
+        if index < self.key_count and self._key(index) == key:
+            return index
+        return None
+    
+    def lookup(self, word, limit=None):
+        """Các nghĩa của word, xếp theo tần suất giảm dần kèm điểm (tần suất / tổng tần suất)"""
+        index = self._find(word)
+        if index is None:
+            return []
+        start = self._values_start
+        data = self._mm[start + self._value_offsets[index]:start + self._value_offsets[index + 1]].decode('utf-8')
+        
+        rows = []
+        for record in data.split(RECORD_SEP):
+            row = dict(zip(self.fields, record.split(FIELD_SEP)))
+            row['frequency'] = int(row['frequency'] or 1)
+            rows.append(row)
+        total = sum(row['frequency'] for row in rows) or 1
+        for row in rows:
+            row['score'] = row['frequency'] / total
+        return rows[:limit]
+    
+    def lookup_many(self, words, limit=None):
+        """{từ: lookup(từ)} cho các từ có trong file"""
+        results = {}
+        for word in words:
+            rows = self.lookup(word, limit)
+            if rows:
+                results[word] = rows
+        return results
+    
+    def prefix(self, prefix, limit=20):
+        """Các khóa bắt đầu bằng prefix theo thứ tự khóa (tối đa limit khóa, None = tất cả)"""
+        key = prefix.encode('utf-8')
+        start = self._bisect(key)
+        # Byte 0xff không xuất hiện trong UTF-8 nên mọi khóa có tiền tố key đều nhỏ hơn key + 0xff
+        end = self._bisect(key + b'\xff', start)
+        if limit is not None:
+            end = min(end, start + limit)
+        return [self._key(index).decode('utf-8') for index in range(start, end)]
+    
+    def close(self):
+        """Đóng mmap (các memoryview phải được giải phóng trước)"""
+        if self._mm is not None:
+            self._key_offsets.release()
+            self._value_offsets.release()
+            self._buckets.release()
+            self._mm.close()
+            self._mm = None
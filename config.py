@@ -3,13 +3,79 @@ import os
 # Cấu hình cơ sở dữ liệu
 DB_PATH = 'dictionary.db'
 
+# Lưu chuỗi một lần trong bảng terms, hai bảng dịch chỉ giữ cặp id (chỉ áp dụng cho database mới)
+DB_NORMALIZED = False
+
+# Kích thước lô khi chèn và xuất: None = tự điều chỉnh trong [DB_BATCH_MIN, DB_BATCH_MAX]
+# theo số dòng/giây đo được, không vượt quá DB_BATCH_MEMORY_BUDGET byte cho một lô
+DB_BATCH_SIZE = None
+DB_BATCH_MIN = 100
+DB_BATCH_MAX = 50000
+DB_BATCH_MEMORY_BUDGET = 64 * 2 ** 20
+
+# Chuẩn hóa mọi mục trước khi chèn (NFC, gộp khoảng trắng) và loại từ/nghĩa rỗng,
+# chỉ gồm dấu câu hoặc dài quá giới hạn
+NORMALIZE_ENTRIES = True
+MAX_WORD_LENGTH = 255
+MAX_MEANING_LENGTH = 2000
+
+# Bộ lọc Bloom các từ gốc của mỗi bảng, lưu cạnh database (<db>.<bảng>.bloom) và cập nhật
+# khi chèn; collector dùng để bỏ qua từ đã có mà không truy vấn SQLite. Sức chứa tự tăng
+# gấp đôi (dựng lại từ database) khi số từ vượt quá nên tỉ lệ dương tính giả giữ quanh BLOOM_ERROR_RATE
+BLOOM_FILTERS = True
+BLOOM_ERROR_RATE = 0.01
+BLOOM_MIN_CAPACITY = 100000
+
+# Chỉ mục gợi ý chính tả (SymSpell) các từ gốc của mỗi bảng, lưu cạnh database (<db>.<bảng>.spell)
+# và cập nhật khi chèn. Gợi ý các từ cách tối đa SPELLING_MAX_DISTANCE lỗi (không tính dấu);
+# chỉ SPELLING_PREFIX_LENGTH ký tự đầu được tính trước để chỉ mục nhỏ lại
+SPELLING_INDEX = True
+SPELLING_MAX_DISTANCE = 2
+SPELLING_PREFIX_LENGTH = 7
+
 # Cấu hình thư mục
 CACHE_DIR = 'cache'
 TEMP_DIR = 'temp'
 
-# Đảm bảo thư mục tồn tại
-os.makedirs(CACHE_DIR, exist_ok=True)
-os.makedirs(TEMP_DIR, exist_ok=True)
+def ensure_directories():
+    """Tạo các thư mục làm việc; gọi khi pipeline bắt đầu chạy thay vì lúc import"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    os.makedirs(TEMP_DIR, exist_ok=True)
+
+# Danh sách từ tiếng Việt (Viet74K) dùng cho chỉ mục độ phủ
+VI_WORDLIST_URL = "https://raw.githubusercontent.com/duyetdev/vietnamese-wordlist/master/Viet74K.txt"
+VI_WORDLIST_PATH = f"{CACHE_DIR}/vietnamese-wordlist.txt"
+
+# Số cặp (từ, nghĩa) tối đa giữ trong bộ nhớ khi khử trùng lặp trước khi ghi run ra đĩa
+DEDUP_MAX_ITEMS = 1000000
+
+# Số process đếm tần suất cặp song song trên các đoạn của corpus OPUS (1 = đếm tuần tự)
+OPUS_WORKERS = min(4, os.cpu_count() or 1)
+
+# Số cặp dòng của mỗi cửa sổ OPUS; dữ liệu và checkpoint được commit sau mỗi cửa sổ
+OPUS_CHECKPOINT_LINES = 1000000
+
+# Lọc nhiễu phụ đề OPUS (dòng chỉ có số, nhãn người nói, ký hiệu nhạc, thẻ định dạng,
+# sai bảng chữ, tỉ lệ độ dài lệch) trước khi đếm cặp; False = chỉ lọc theo số từ
+OPUS_QUALITY_FILTER = True
+
+# Trích cặp dịch từ toàn bộ câu OPUS bằng thống kê đồng xuất hiện (cần numpy)
+OPUS_ALIGNMENT = False
+OPUS_ALIGNMENT_METHOD = 'dice'  # 'dice' hoặc 'pmi'
+OPUS_ALIGNMENT_TOP_K = 3
+
+# OPUS, Wiktionary và WordNet chỉ chèn chiều gốc của nguồn; chiều ngược được sinh
+# bằng một câu INSERT ... SELECT sau khi nạp xong
+DERIVE_REVERSE = False
+
+# Princeton WordNet (file data.* / index.*) để ánh xạ synset sang lemma tiếng Anh
+WORDNET_URL = "https://wordnetcode.princeton.edu/3.0/WordNet-3.0.tar.gz"
+
+# Báo cáo số liệu của mỗi lần chạy và chế độ profile cho từng giai đoạn
+# (DICT_PROFILE=cprofile hoặc DICT_PROFILE=tracemalloc)
+METRICS_REPORT_PATH = 'exports/metrics_report.json'
+PROFILE_MODE = os.environ.get('DICT_PROFILE') or None
+PROFILE_DIR = 'profiles'
 
 # User agents để tránh bị chặn
 USER_AGENTS = [
@@ -0,0 +1,122 @@
+import os
+import logging
+import unicodedata
+from collections import Counter
+from config import VI_WORDLIST_PATH, VI_WORDLIST_URL
+from utils import download_file_simple
+
+# Dấu thanh tiếng Việt (huyền, sắc, hỏi, ngã, nặng) - bỏ đi khi xác định chữ cái đầu
+TONE_MARKS = {'\u0300', '\u0301', '\u0303', '\u0309', '\u0323'}
+
+def normalize_headword(word):
+    """Chuẩn hóa từ tiếng Việt để so sánh (NFC, chữ thường, gộp khoảng trắng)"""
+    if not word:
+        return ""
+    return ' '.join(unicodedata.normalize('NFC', word).lower().split())
+
+def first_letter(word):
+    """Lấy chữ cái đầu của từ (giữ ă, â, đ, ê, ô, ơ, ư nhưng bỏ dấu thanh)"""
+    if not word:
+        return ""
+    decomposed = unicodedata.normalize('NFD', word[0].lower())
+    return unicodedata.normalize('NFC', ''.join(c for c in decomposed if c not in TONE_MARKS))
+
+def load_wordlist(path=VI_WORDLIST_PATH, download=True):
+    """Đọc danh sách từ Viet74K vào một frozenset đã chuẩn hóa"""
+    if not os.path.exists(path):
+        if not download or not download_file_simple(VI_WORDLIST_URL, path):
+            return frozenset()
+
+    try:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            return frozenset(w for w in (normalize_headword(line) for line in f) if w)
+    except Exception as e:
+        logging.error(f"Error loading wordlist {path}: {e}")
+        return frozenset()
+
+class CoverageIndex:
+    """Chỉ mục độ phủ: so sánh danh sách từ Viet74K với các từ đã có trong database"""
+
+    def __init__(self, words):
+        self.words = frozenset(words)
+        self._prefix_counts = None
+
+    @classmethod
+    def from_wordlist(cls, path=VI_WORDLIST_PATH, download=True):
+        """Tạo chỉ mục từ file danh sách từ"""
+        return cls(load_wordlist(path, download=download))
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        return normalize_headword(word) in self.words
+
+    def diff(self, db, exact=False):
+        """
+        Trả về tập các từ trong danh sách mà bảng vietnamese_english chưa có. Mặc định dùng
+        bộ lọc Bloom của database thay vì đọc lại cả bảng; khoảng BLOOM_ERROR_RATE số từ
+        còn thiếu có thể bị coi là đã có. exact=True luôn duyệt toàn bộ bảng.
+        """
+        bloom = None if exact else db.headword_filter('vietnamese_english')
+        if bloom is not None:
+            words = list(self.words)
+            return frozenset(w for w, known in zip(words, bloom.contains_many(words)) if not known)
+
+        missing = set(self.words)
+        for word in db.iter_vietnamese_words():
+            missing.discard(normalize_headword(word))
+        return frozenset(missing)
+
+    def prefix_counts(self):
+        """Đếm số từ ghép trong danh sách bắt đầu bằng mỗi cụm âm tiết"""
+        if self._prefix_counts is None:
+            counts = Counter()
+            for word in self.words:
+                syllables = word.split(' ')
+                for i in range(1, len(syllables)):
+                    counts[' '.join(syllables[:i])] += 1
+            self._prefix_counts = counts
+        return self._prefix_counts
+
+    def prioritize(self, words, limit=None):
+        """
+        Sắp xếp các từ thiếu theo mức ưu tiên: từ là gốc của nhiều từ ghép trước,
+        rồi đến từ ít âm tiết hơn.
+        """
+        ranked = sorted(words, key=self.priority_key)
+        return ranked[:limit] if limit else ranked
+
+    def priority_key(self, word):
+        """Khóa sắp xếp của prioritize(); ổn định giữa các lần chạy nên dùng được làm checkpoint"""
+        return (-self.prefix_counts().get(word, 0), word.count(' '), word)
+
+    def missing_headwords(self, db, limit=None, after=None):
+        """
+        Danh sách các từ còn thiếu, đã sắp xếp theo mức ưu tiên; với after chỉ lấy
+        các từ đứng sau từ đó trong thứ tự ưu tiên (để chạy tiếp từ checkpoint)
+        """
+        missing = self.diff(db)
+        if after:
+            after_key = self.priority_key(normalize_headword(after))
+            missing = [w for w in missing if self.priority_key(w) > after_key]
+        return self.prioritize(missing, limit=limit)
+
+    def missing_by_letter(self, db, missing=None):
+        """Số từ còn thiếu theo từng chữ cái đầu, nhiều nhất trước"""
+        if missing is None:
+            missing = self.diff(db)
+        return dict(Counter(first_letter(w) for w in missing).most_common())
+
+    def report(self, db):
+        """Thống kê độ phủ của database so với danh sách từ"""
+        missing = self.diff(db, exact=True)
+        total = len(self.words)
+        covered = total - len(missing)
+        return {
+            'total': total,
+            'covered': covered,
+            'missing': len(missing),
+            'coverage': covered / total if total else 0.0,
+            'missing_by_letter': self.missing_by_letter(db, missing=missing)
+        }
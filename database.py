@@ -1,27 +1,190 @@
+import os
+import json
+import time
+import hashlib
 import sqlite3
 import logging
-from tqdm import tqdm
-from config import DB_PATH
+import pathlib
+import itertools
+from contextlib import contextmanager
+from config import (DB_PATH, DB_NORMALIZED, DB_BATCH_SIZE, DB_BATCH_MIN, DB_BATCH_MAX, DB_BATCH_MEMORY_BUDGET,
+                    NORMALIZE_ENTRIES, BLOOM_FILTERS, BLOOM_ERROR_RATE, BLOOM_MIN_CAPACITY,
+                    SPELLING_INDEX, SPELLING_MAX_DISTANCE, SPELLING_PREFIX_LENGTH)
+from metrics import metrics
+from batching import AdaptiveBatcher
+from bloom import BloomFilter
+from spelling import SpellingIndex
+from processors.normalize import TextNormalizer, clean_text
+
+# Phiên bản schema lưu trong PRAGMA user_version; database đã ở phiên bản này
+# thì không cần chạy lại script tạo bảng khi mở
+# 2: thêm bảng checkpoints
+SCHEMA_VERSION = 2
+
+# Bảng lưu vị trí đã xử lý của từng nguồn để chạy tiếp sau khi bị dừng giữa chừng
+CHECKPOINTS_SQL = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    source VARCHAR(255) PRIMARY KEY,
+    position TEXT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# Bảng gốc của các view khi dùng cách lưu chuẩn hóa
+NORMALIZED_TABLES = {
+    'english_vietnamese': 'en_vi_translations',
+    'vietnamese_english': 'vi_en_translations'
+}
+
+# Cột từ gốc của mỗi bảng dịch (dùng cho bộ lọc Bloom)
+HEADWORD_COLUMNS = {
+    'english_vietnamese': 'english_word',
+    'vietnamese_english': 'vietnamese_word'
+}
+
+# Bảng, cột từ gốc, cột nghĩa, cột phát âm và tên của mỗi chiều khi xuất StarDict/dictd
+OFFLINE_DIRECTIONS = {
+    'en_vi': ('english_vietnamese', 'english_word', 'vietnamese_meaning', 'pronunciation', "English-Vietnamese"),
+    'vi_en': ('vietnamese_english', 'vietnamese_word', 'english_meaning', "''", "Vietnamese-English")
+}
+
+# Bảng, cột khóa (từ, nghĩa) và các cột nội dung của mỗi bảng khi xuất delta
+DELTA_TABLES = {
+    'english_vietnamese': (('english_word', 'vietnamese_meaning'), ('word_type', 'pronunciation', 'example', 'frequency')),
+    'vietnamese_english': (('vietnamese_word', 'english_meaning'), ('word_type', 'example', 'frequency'))
+}
+
+def content_hash(*values):
+    """
+    Băm 64 bit (số nguyên có dấu để lưu được trong SQLite) của các cột nội dung một dòng;
+    NULL được đánh dấu riêng nên khác với chuỗi rỗng
+    """
+    data = '\x1f'.join('\x00' if value is None else str(value) for value in values).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little', signed=True)
+
+def _sql_literal(value):
+    if value is None:
+        return 'NULL'
+    if isinstance(value, int):
+        return str(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+def headword_key(word):
+    """Khóa của một từ gốc trong bộ lọc Bloom: NFC, gộp khoảng trắng, chữ thường"""
+    return clean_text(word).lower()
+
+class TermVocabulary:
+    """
+    Bộ intern chuỗi cho bảng terms: ánh xạ chuỗi -> id dùng chung trong quá trình
+    nạp dữ liệu. Bộ đệm có giới hạn; chuỗi chưa có trong bộ đệm được tra theo lô
+    bằng chỉ mục UNIQUE của bảng terms.
+    """
+    
+    def __init__(self, conn, cache_size=50000):
+        self.conn = conn
+        self.cache_size = cache_size
+        self._ids = {}
+    
+    def _lookup(self, texts, chunk_size=500):
+        # Khóa của bộ đệm là chính đối tượng chuỗi của lô đang nạp, không giữ thêm bản sao đọc từ database
+        texts = {text: text for text in texts}
+        keys = list(texts)
+        for i in range(0, len(keys), chunk_size):
+            chunk = keys[i:i + chunk_size]
+            placeholders = ', '.join('?' * len(chunk))
+            for term_id, text in self.conn.execute(f"SELECT id, text FROM terms WHERE text IN ({placeholders})", chunk):
+                self._ids[texts[text]] = term_id
+    
+    def ids(self, texts):
+        """Trả về dict chuỗi -> id chứa mọi chuỗi trong texts, thêm chuỗi mới vào bảng terms"""
+        if len(self._ids) > self.cache_size:
+            self._ids = {}
+        
+        missing = {text for text in texts if text not in self._ids}
+        if missing:
+            self._lookup(missing)
+            new_texts = [text for text in missing if text not in self._ids]
+            if new_texts:
+                self.conn.executemany("INSERT OR IGNORE INTO terms (text) VALUES (?)", ((text,) for text in new_texts))
+                self._lookup(new_texts)
+        return self._ids
 
 class DictionaryDatabase:
-    def __init__(self, db_path=DB_PATH):
+    def __init__(self, db_path=DB_PATH, normalized=DB_NORMALIZED, read_only=False, batch_size=DB_BATCH_SIZE):
         self.db_path = db_path
+        self.normalized = normalized
+        self.read_only = read_only
+        # Kích thước lô cố định cho batch_insert_* và export; None thì tự điều chỉnh
+        self.batch_size = batch_size
+        self.batcher = self._new_batcher('db.insert') if batch_size is None else None
+        # Mọi mục đều được chuẩn hóa (NFC, khoảng trắng) và lọc trước khi chèn
+        self.normalizer = TextNormalizer() if NORMALIZE_ENTRIES else None
         self.conn = None
         self.cursor = None
+        self.terms = None
+        # > 0 khi đang ở trong khối transaction(): các lần chèn không tự commit
+        self._transaction_depth = 0
+        # Bộ lọc Bloom đã nạp: bảng -> {'bloom', 'synced_id' (id lớn nhất đã có trong bộ lọc), 'dirty'}
+        self._headword_filters = {}
+        # Chỉ mục chính tả đã nạp: bảng -> {'index', 'synced_id', 'dirty'}
+        self._spelling_indexes = {}
+        # Số lần mỗi bảng được ghi qua kết nối này và các ánh xạ từ -> nghĩa đã nạp:
+        # bảng -> (phiên bản lúc nạp, ánh xạ)
+        self._table_versions = {}
+        self._translation_maps = {}
+        if not read_only and not os.path.exists(db_path):
+            # Bộ lọc và chỉ mục còn lại của một database cũ cùng đường dẫn không còn đúng
+            self._remove_headword_filters()
         self.connect()
-        self.setup_tables()
+        if read_only:
+            # Chỉ tra cứu: không tạo bảng, chỉ nhận biết cách lưu của database
+            self.normalized = self._existing_layout() == 'normalized'
+        else:
+            self.setup_tables()
     
     def connect(self):
         """Kết nối đến database"""
         try:
-            self.conn = sqlite3.connect(self.db_path)
+            if self.read_only:
+                # mode=ro: không tạo file mới và không cho ghi
+                uri = pathlib.Path(self.db_path).resolve().as_uri() + '?mode=ro'
+                self.conn = sqlite3.connect(uri, uri=True)
+            else:
+                self.conn = sqlite3.connect(self.db_path)
             self.cursor = self.conn.cursor()
         except Exception as e:
             logging.error(f"Error connecting to database: {e}")
             raise
     
+    def _existing_layout(self):
+        """'normalized' nếu english_vietnamese là view, 'flat' nếu là bảng, None nếu database mới"""
+        self.cursor.execute("SELECT type FROM sqlite_master WHERE name = 'english_vietnamese'")
+        row = self.cursor.fetchone()
+        if row is None:
+            return None
+        return 'normalized' if row[0] == 'view' else 'flat'
+    
+    def _schema_version(self):
+        self.cursor.execute("PRAGMA user_version")
+        return self.cursor.fetchone()[0]
+    
     def setup_tables(self):
         """Tạo bảng nếu chưa tồn tại"""
+        # Database đã có thì giữ nguyên cách lưu của nó
+        layout = self._existing_layout()
+        if layout is not None:
+            self.normalized = layout == 'normalized'
+        
+        if layout is not None and self._schema_version() >= SCHEMA_VERSION:
+            if self.normalized:
+                self.terms = TermVocabulary(self.conn)
+            self._restore_indexes()
+            return
+        
+        if self.normalized:
+            self.setup_normalized_tables()
+            return
+        
         schema_sql = """
         CREATE TABLE IF NOT EXISTS english_vietnamese (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -30,6 +193,7 @@ class DictionaryDatabase:
             word_type VARCHAR(50),
             pronunciation VARCHAR(255),
             example TEXT,
+            frequency INTEGER DEFAULT 1,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
         
@@ -39,6 +203,7 @@ class DictionaryDatabase:
             english_meaning TEXT NOT NULL,
             word_type VARCHAR(50),
             example TEXT,
+            frequency INTEGER DEFAULT 1,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
         
@@ -46,13 +211,229 @@ class DictionaryDatabase:
         CREATE INDEX IF NOT EXISTS idx_vietnamese_word ON vietnamese_english(vietnamese_word);
         """
         try:
-            self.cursor.executescript(schema_sql)
+            self.cursor.executescript(schema_sql + CHECKPOINTS_SQL)
+            self._add_missing_columns()
+            self.cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
             self.conn.commit()
         except Exception as e:
             logging.error(f"Error setting up tables: {e}")
             raise
     
-    def batch_insert_en_vi(self, entries, batch_size=1000):
+    def setup_normalized_tables(self):
+        """
+        Tạo bảng terms và các bảng dịch lưu cặp id. Hai view english_vietnamese và
+        vietnamese_english giữ nguyên các cột cũ; trigger INSTEAD OF chuyển các lệnh
+        INSERT/UPDATE/DELETE trên view xuống bảng gốc để mã hiện có vẫn chạy được.
+        created_at được lưu dạng số giây (view trả lại đúng định dạng của CURRENT_TIMESTAMP).
+        """
+        schema_sql = """
+        CREATE TABLE IF NOT EXISTS terms (
+            id INTEGER PRIMARY KEY,
+            text TEXT NOT NULL UNIQUE
+        );
+        
+        CREATE TABLE IF NOT EXISTS en_vi_translations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            english_id INTEGER NOT NULL REFERENCES terms(id),
+            meaning_id INTEGER NOT NULL REFERENCES terms(id),
+            word_type VARCHAR(50),
+            pronunciation VARCHAR(255),
+            example TEXT,
+            frequency INTEGER DEFAULT 1,
+            created_at INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+        );
+        
+        CREATE TABLE IF NOT EXISTS vi_en_translations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            vietnamese_id INTEGER NOT NULL REFERENCES terms(id),
+            meaning_id INTEGER NOT NULL REFERENCES terms(id),
+            word_type VARCHAR(50),
+            example TEXT,
+            frequency INTEGER DEFAULT 1,
+            created_at INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+        );
+        
+        CREATE INDEX IF NOT EXISTS idx_en_vi_english_id ON en_vi_translations(english_id);
+        CREATE INDEX IF NOT EXISTS idx_vi_en_vietnamese_id ON vi_en_translations(vietnamese_id);
+        
+        CREATE VIEW IF NOT EXISTS english_vietnamese AS
+        SELECT t.id, w.text AS english_word, m.text AS vietnamese_meaning, t.word_type,
+               t.pronunciation, t.example, t.frequency, datetime(t.created_at, 'unixepoch') AS created_at
+        FROM en_vi_translations t
+        JOIN terms w ON w.id = t.english_id
+        JOIN terms m ON m.id = t.meaning_id;
+        
+        CREATE VIEW IF NOT EXISTS vietnamese_english AS
+        SELECT t.id, w.text AS vietnamese_word, m.text AS english_meaning, t.word_type,
+               t.example, t.frequency, datetime(t.created_at, 'unixepoch') AS created_at
+        FROM vi_en_translations t
+        JOIN terms w ON w.id = t.vietnamese_id
+        JOIN terms m ON m.id = t.meaning_id;
+        
+        CREATE TRIGGER IF NOT EXISTS english_vietnamese_insert INSTEAD OF INSERT ON english_vietnamese
+        BEGIN
+            INSERT OR IGNORE INTO terms (text) VALUES (NEW.english_word), (NEW.vietnamese_meaning);
+            INSERT INTO en_vi_translations (id, english_id, meaning_id, word_type, pronunciation, example, frequency)
+            VALUES (NEW.id,
+                    (SELECT id FROM terms WHERE text = NEW.english_word),
+                    (SELECT id FROM terms WHERE text = NEW.vietnamese_meaning),
+                    NEW.word_type, NEW.pronunciation, NEW.example, COALESCE(NEW.frequency, 1));
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS english_vietnamese_update INSTEAD OF UPDATE ON english_vietnamese
+        BEGIN
+            INSERT OR IGNORE INTO terms (text) VALUES (NEW.english_word), (NEW.vietnamese_meaning);
+            UPDATE en_vi_translations SET
+                english_id = (SELECT id FROM terms WHERE text = NEW.english_word),
+                meaning_id = (SELECT id FROM terms WHERE text = NEW.vietnamese_meaning),
+                word_type = NEW.word_type, pronunciation = NEW.pronunciation,
+                example = NEW.example, frequency = NEW.frequency
+            WHERE id = OLD.id;
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS english_vietnamese_delete INSTEAD OF DELETE ON english_vietnamese
+        BEGIN
+            DELETE FROM en_vi_translations WHERE id = OLD.id;
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS vietnamese_english_insert INSTEAD OF INSERT ON vietnamese_english
+        BEGIN
+            INSERT OR IGNORE INTO terms (text) VALUES (NEW.vietnamese_word), (NEW.english_meaning);
+            INSERT INTO vi_en_translations (id, vietnamese_id, meaning_id, word_type, example, frequency)
+            VALUES (NEW.id,
+                    (SELECT id FROM terms WHERE text = NEW.vietnamese_word),
+                    (SELECT id FROM terms WHERE text = NEW.english_meaning),
+                    NEW.word_type, NEW.example, COALESCE(NEW.frequency, 1));
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS vietnamese_english_update INSTEAD OF UPDATE ON vietnamese_english
+        BEGIN
+            INSERT OR IGNORE INTO terms (text) VALUES (NEW.vietnamese_word), (NEW.english_meaning);
+            UPDATE vi_en_translations SET
+                vietnamese_id = (SELECT id FROM terms WHERE text = NEW.vietnamese_word),
+                meaning_id = (SELECT id FROM terms WHERE text = NEW.english_meaning),
+                word_type = NEW.word_type, example = NEW.example, frequency = NEW.frequency
+            WHERE id = OLD.id;
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS vietnamese_english_delete INSTEAD OF DELETE ON vietnamese_english
+        BEGIN
+            DELETE FROM vi_en_translations WHERE id = OLD.id;
+        END;
+        """
+        try:
+            self.cursor.executescript(schema_sql + CHECKPOINTS_SQL)
+            self.cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self.conn.commit()
+            self.terms = TermVocabulary(self.conn)
+        except Exception as e:
+            logging.error(f"Error setting up normalized tables: {e}")
+            raise
+    
+    def _term_id_values(self, values):
+        """Thay hai cột chuỗi đầu tiên của mỗi dòng bằng id trong bảng terms"""
+        ids = self.terms.ids([text for row in values for text in row[:2]])
+        return [(ids[row[0]], ids[row[1]]) + tuple(row[2:]) for row in values]
+    
+    def _add_missing_columns(self):
+        """Thêm cột frequency cho database được tạo trước khi có cột này"""
+        for table in ('english_vietnamese', 'vietnamese_english'):
+            self.cursor.execute(f"PRAGMA table_info({table})")
+            columns = {row[1] for row in self.cursor.fetchall()}
+            if 'frequency' not in columns:
+                self.cursor.execute(f"ALTER TABLE {table} ADD COLUMN frequency INTEGER DEFAULT 1")
+    
+    @staticmethod
+    def _new_batcher(name):
+        return AdaptiveBatcher(min_size=DB_BATCH_MIN, max_size=DB_BATCH_MAX,
+                               memory_budget=DB_BATCH_MEMORY_BUDGET, name=name)
+    
+    def _insert_batches(self, entries, batch_size=None):
+        """Chia entries thành các lô: kích thước cố định nếu có, nếu không thì do batcher chọn"""
+        batch_size = batch_size or self.batch_size
+        if batch_size:
+            for i in range(0, len(entries), batch_size):
+                yield entries[i:i + batch_size]
+        else:
+            yield from self.batcher.batches(entries)
+    
+    def _normalize_values(self, values, text_columns):
+        """Chuẩn hóa các cột chuỗi của lô, bỏ các dòng không hợp lệ và ghi số dòng bị loại theo lý do"""
+        if self.normalizer is None:
+            return values
+        values, rejected = self.normalizer.normalize_rows(values, text_columns)
+        for reason, count in rejected.items():
+            metrics.incr_source(f"rows_rejected.{reason}", count)
+        return values
+    
+    def _commit(self):
+        """Commit, trừ khi đang ở trong khối transaction() (khi đó commit ở cuối khối)"""
+        if not self._transaction_depth:
+            self.conn.commit()
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Gom các lần chèn, derive_* và set_checkpoint trong khối thành một giao dịch:
+        hoặc tất cả được ghi, hoặc không gì cả nếu có lỗi hay tiến trình bị dừng.
+        """
+        self._transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._transaction_depth -= 1
+            if not self._transaction_depth:
+                self.conn.rollback()
+                if self.terms is not None:
+                    # Bộ đệm có thể chứa id của các term vừa bị rollback
+                    self.terms = TermVocabulary(self.conn)
+                # Bộ lọc Bloom và chỉ mục chính tả có thể chứa từ vừa bị rollback; nạp lại từ file khi cần
+                self._headword_filters = {}
+                self._spelling_indexes = {}
+                self._translation_maps = {}
+            raise
+        self._transaction_depth -= 1
+        if not self._transaction_depth:
+            self.conn.commit()
+    
+    def get_checkpoint(self, source):
+        """Vị trí đã lưu của nguồn (chuỗi), None nếu nguồn chưa có checkpoint"""
+        self.cursor.execute("SELECT position FROM checkpoints WHERE source = ?", (source,))
+        row = self.cursor.fetchone()
+        return row[0] if row else None
+    
+    def set_checkpoint(self, source, position):
+        """Lưu vị trí của nguồn; trong khối transaction() nó được commit cùng lô dữ liệu"""
+        self.cursor.execute(
+            "INSERT OR REPLACE INTO checkpoints (source, position, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)",
+            (source, str(position))
+        )
+        self._commit()
+    
+    def clear_checkpoints(self, prefix=''):
+        """Xóa các checkpoint có tên bắt đầu bằng prefix (tất cả nếu prefix rỗng)"""
+        self.cursor.execute("DELETE FROM checkpoints WHERE substr(source, 1, ?) = ?", (len(prefix), prefix))
+        self.conn.commit()
+        return self.cursor.rowcount
+    
+    def checkpoints(self, prefix=''):
+        """{nguồn: vị trí} của các checkpoint có tên bắt đầu bằng prefix"""
+        self.cursor.execute("SELECT source, position FROM checkpoints WHERE substr(source, 1, ?) = ?",
+                            (len(prefix), prefix))
+        return dict(self.cursor.fetchall())
+    
+    def _execute_insert_batch(self, sql, values):
+        """Chèn một lô, commit và ghi nhận độ trễ cùng số dòng thực sự được chèn"""
+        changes_before = self.conn.total_changes
+        start = time.perf_counter()
+        with metrics.phase('db'):
+            self.cursor.executemany(sql, values)
+            self._commit()
+        metrics.observe('db.insert_batch_seconds', time.perf_counter() - start)
+        metrics.observe('db.insert_batch_rows', len(values))
+        metrics.incr_source('rows_inserted', self.conn.total_changes - changes_before)
+    
+    def batch_insert_en_vi(self, entries, batch_size=None):
         """Chèn các mục Anh-Việt theo lô"""
         if not entries:
             return 0
@@ -60,27 +441,39 @@ class DictionaryDatabase:
         count = 0
         try:
             # Xử lý theo lô để tránh vấn đề bộ nhớ
-            for i in range(0, len(entries), batch_size):
-                batch = entries[i:i+batch_size]
-                
+            for batch in self._insert_batches(entries, batch_size):
+            
                 # Chuẩn bị dữ liệu để chèn
                 values = [(
                     entry['english_word'], 
                     entry['vietnamese_meaning'], 
                     entry.get('word_type', ''), 
                     entry.get('pronunciation', ''), 
-                    entry.get('example', '')
+                    entry.get('example', ''),
+                    entry.get('frequency', 1)
                 ) for entry in batch]
+                values = self._normalize_values(values, 5)
+                if not values:
+                    continue
                 
-                # Sử dụng executemany với IGNORE để bỏ qua bản ghi trùng lặp
-                self.cursor.executemany(
-                    """INSERT OR IGNORE INTO english_vietnamese 
-                       (english_word, vietnamese_meaning, word_type, pronunciation, example) 
-                       VALUES (?, ?, ?, ?, ?)""",
-                    values
-                )
-                self.conn.commit()
-                count += len(batch)
+                if self.normalized:
+                    # Chuỗi được thay bằng id trong bảng terms
+                    self._execute_insert_batch(
+                        """INSERT INTO en_vi_translations 
+                           (english_id, meaning_id, word_type, pronunciation, example, frequency) 
+                           VALUES (?, ?, ?, ?, ?, ?)""",
+                        self._term_id_values(values)
+                    )
+                else:
+                    # Sử dụng executemany với IGNORE để bỏ qua bản ghi trùng lặp
+                    self._execute_insert_batch(
+                        """INSERT OR IGNORE INTO english_vietnamese 
+                           (english_word, vietnamese_meaning, word_type, pronunciation, example, frequency) 
+                           VALUES (?, ?, ?, ?, ?, ?)""",
+                        values
+                    )
+                self._add_headwords('english_vietnamese', values)
+                count += len(values)
         
         except Exception as e:
             logging.error(f"Error batch inserting into english_vietnamese: {e}")
@@ -88,7 +481,7 @@ class DictionaryDatabase:
         
         return count
     
-    def batch_insert_vi_en(self, entries, batch_size=1000):
+    def batch_insert_vi_en(self, entries, batch_size=None):
         """Chèn các mục Việt-Anh theo lô"""
         if not entries:
             return 0
@@ -96,26 +489,38 @@ class DictionaryDatabase:
         count = 0
         try:
             # Xử lý theo lô để tránh vấn đề bộ nhớ
-            for i in range(0, len(entries), batch_size):
-                batch = entries[i:i+batch_size]
-                
+            for batch in self._insert_batches(entries, batch_size):
+            
                 # Chuẩn bị dữ liệu để chèn
                 values = [(
                     entry['vietnamese_word'], 
                     entry['english_meaning'], 
                     entry.get('word_type', ''), 
-                    entry.get('example', '')
+                    entry.get('example', ''),
+                    entry.get('frequency', 1)
                 ) for entry in batch]
+                values = self._normalize_values(values, 4)
+                if not values:
+                    continue
                 
-                # Sử dụng executemany với IGNORE để bỏ qua bản ghi trùng lặp
-                self.cursor.executemany(
-                    """INSERT OR IGNORE INTO vietnamese_english 
-                       (vietnamese_word, english_meaning, word_type, example) 
-                       VALUES (?, ?, ?, ?)""",
-                    values
-                )
-                self.conn.commit()
-                count += len(batch)
+                if self.normalized:
+                    # Chuỗi được thay bằng id trong bảng terms
+                    self._execute_insert_batch(
+                        """INSERT INTO vi_en_translations 
+                           (vietnamese_id, meaning_id, word_type, example, frequency) 
+                           VALUES (?, ?, ?, ?, ?)""",
+                        self._term_id_values(values)
+                    )
+                else:
+                    # Sử dụng executemany với IGNORE để bỏ qua bản ghi trùng lặp
+                    self._execute_insert_batch(
+                        """INSERT OR IGNORE INTO vietnamese_english 
+                           (vietnamese_word, english_meaning, word_type, example, frequency) 
+                           VALUES (?, ?, ?, ?, ?)""",
+                        values
+                    )
+                self._add_headwords('vietnamese_english', values)
+                count += len(values)
         
         except Exception as e:
             logging.error(f"Error batch inserting into vietnamese_english: {e}")
@@ -127,50 +532,198 @@ class DictionaryDatabase:
         """Xóa các mục trùng lặp từ cơ sở dữ liệu"""
         print("Removing duplicate entries...")
         
+        # (bảng, cột khóa trùng lặp, các cột còn lại)
+        if self.normalized:
+            # Gộp trực tiếp trên bảng gốc theo cặp id, không đi qua trigger của view
+            tables = [
+                ('en_vi_translations', 'english_id, meaning_id', 'word_type, pronunciation, example'),
+                ('vi_en_translations', 'vietnamese_id, meaning_id', 'word_type, example')
+            ]
+        else:
+            tables = [
+                ('english_vietnamese', 'english_word, vietnamese_meaning', 'word_type, pronunciation, example'),
+                ('vietnamese_english', 'vietnamese_word, english_meaning', 'word_type, example')
+            ]
+        
         try:
-            # Xử lý trùng lặp Anh-Việt
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS english_vietnamese_temp AS
-                SELECT MIN(id) as id, english_word, vietnamese_meaning, word_type, pronunciation, example
-                FROM english_vietnamese
-                GROUP BY english_word, vietnamese_meaning
-            """)
-            
-            self.cursor.execute("DELETE FROM english_vietnamese")
-            
-            self.cursor.execute("""
-                INSERT INTO english_vietnamese (id, english_word, vietnamese_meaning, word_type, pronunciation, example)
-                SELECT id, english_word, vietnamese_meaning, word_type, pronunciation, example
-                FROM english_vietnamese_temp
-            """)
-            
-            self.cursor.execute("DROP TABLE english_vietnamese_temp")
-            
-            # Xử lý trùng lặp Việt-Anh
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS vietnamese_english_temp AS
-                SELECT MIN(id) as id, vietnamese_word, english_meaning, word_type, example
-                FROM vietnamese_english
-                GROUP BY vietnamese_word, english_meaning
-            """)
-            
-            self.cursor.execute("DELETE FROM vietnamese_english")
-            
-            self.cursor.execute("""
-                INSERT INTO vietnamese_english (id, vietnamese_word, english_meaning, word_type, example)
-                SELECT id, vietnamese_word, english_meaning, word_type, example
-                FROM vietnamese_english_temp
-            """)
-            
-            self.cursor.execute("DROP TABLE vietnamese_english_temp")
+            for table, key_columns, columns in tables:
+                # Tần suất của các bản trùng được cộng dồn; mỗi nguồn chỉ được chèn một lần
+                # (checkpoint của collector), nên chạy lại pipeline không làm tăng tần suất
+                self.cursor.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {table}_temp AS
+                    SELECT MIN(id) as id, {key_columns}, {columns},
+                           SUM(frequency) as frequency
+                    FROM {table}
+                    GROUP BY {key_columns}
+                """)
+                
+                self.cursor.execute(f"DELETE FROM {table}")
+                
+                self.cursor.execute(f"""
+                    INSERT INTO {table} (id, {key_columns}, {columns}, frequency)
+                    SELECT id, {key_columns}, {columns}, frequency
+                    FROM {table}_temp
+                """)
+                
+                self.cursor.execute(f"DROP TABLE {table}_temp")
             
             self.conn.commit()
+            for table in HEADWORD_COLUMNS:
+                self._table_changed(table)
             print("Duplicate entries removed")
-            
+        
         except Exception as e:
             logging.error(f"Error removing duplicates: {e}")
             print(f"Error removing duplicates: {e}")
     
+    def merge_shards(self, shard_paths):
+        """
+        Gộp các database shard (cách lưu thường, do từng process ghi riêng) vào database này.
+        Chỉ mục của hai bảng được xóa trước và chỉ tạo lại một lần ở cuối (câu lệnh tạo được
+        lưu trong checkpoint để lần mở sau tạo lại nếu tiến trình bị dừng hẳn). Mỗi shard được
+        ATTACH rồi chép bằng một câu INSERT ... SELECT cho mỗi bảng, cùng checkpoint của nó và
+        dấu "shard/<đường dẫn>" trong một giao dịch, nên chạy lại sau khi bị dừng sẽ bỏ qua
+        các shard đã gộp. Các mục trùng được gộp bằng remove_duplicates() trước khi tạo chỉ mục.
+        Trả về {bảng: số dòng đã chép}.
+        """
+        merged = {table: 0 for table in DELTA_TABLES}
+        targets = [NORMALIZED_TABLES[table] if self.normalized else table for table in DELTA_TABLES]
+        # Chỉ mục bị xóa bởi một lần gộp bị dừng giữa chừng
+        self._restore_indexes()
+        self.cursor.execute(f"""
+            SELECT name, sql FROM sqlite_master
+            WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({', '.join('?' * len(targets))})
+        """, targets)
+        indexes = self.cursor.fetchall()
+        
+        with metrics.phase('db'):
+            try:
+                # Câu lệnh tạo chỉ mục được lưu thành checkpoint "index/<tên>" trong cùng giao dịch
+                # với lệnh xóa, nên nếu tiến trình bị dừng hẳn thì lần mở hoặc lần gộp sau tạo lại
+                for name, sql in indexes:
+                    self.cursor.execute(
+                        "INSERT OR REPLACE INTO checkpoints (source, position, updated_at) "
+                        "VALUES (?, ?, CURRENT_TIMESTAMP)", (f"index/{name}", sql)
+                    )
+                    self.cursor.execute(f"DROP INDEX IF EXISTS {name}")
+                self.conn.commit()
+                
+                for path in shard_paths:
+                    marker = f"shard/{os.path.abspath(path)}"
+                    if self.get_checkpoint(marker) == 'done':
+                        continue
+                    self.cursor.execute("ATTACH DATABASE ? AS shard", (path,))
+                    try:
+                        for table, (keys, columns) in DELTA_TABLES.items():
+                            column_sql = ', '.join(keys + columns)
+                            self.cursor.execute(f"SELECT COUNT(*) FROM shard.{table}")
+                            count = self.cursor.fetchone()[0]
+                            # Với cách lưu chuẩn hóa, trigger của view chuyển chuỗi thành id trong terms
+                            self.cursor.execute(f"""
+                                INSERT INTO main.{table} ({column_sql})
+                                SELECT {column_sql} FROM shard.{table} ORDER BY id
+                            """)
+                            merged[table] += count
+                            metrics.incr('rows_merged', count)
+                        self.cursor.execute("""
+                            INSERT OR REPLACE INTO main.checkpoints (source, position, updated_at)
+                            SELECT source, position, updated_at FROM shard.checkpoints
+                        """)
+                        self.set_checkpoint(marker, 'done')
+                    except Exception:
+                        self.conn.rollback()
+                        raise
+                    finally:
+                        self.cursor.execute("DETACH DATABASE shard")
+                self.remove_duplicates()
+            finally:
+                self._restore_indexes()
+        
+        for table in DELTA_TABLES:
+            self._sync_headwords(table)
+        self.conn.commit()
+        return merged
+    
+    def _restore_indexes(self):
+        """Tạo lại các chỉ mục merge_shards() đã xóa (lưu trong checkpoint "index/<tên>") rồi xóa checkpoint"""
+        indexes = self.checkpoints('index/')
+        if not indexes:
+            return
+        for sql in indexes.values():
+            self.cursor.execute(sql.replace('CREATE INDEX', 'CREATE INDEX IF NOT EXISTS', 1))
+        self.clear_checkpoints('index/')
+    
+    def max_id(self, table):
+        """id lớn nhất hiện có của bảng (0 nếu bảng rỗng), dùng làm mốc cho derive_*"""
+        if self.normalized:
+            table = NORMALIZED_TABLES.get(table, table)
+        self.cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+        return self.cursor.fetchone()[0]
+    
+    def _derive(self, sql, since_id, table):
+        changes_before = self.conn.total_changes
+        with metrics.phase('db'):
+            self.cursor.execute(sql, (since_id,))
+            self._sync_headwords(table)
+            self._commit()
+        count = self.conn.total_changes - changes_before
+        metrics.incr_source('rows_derived', count)
+        return count
+    
+    def derive_vi_en(self, since_id=0):
+        """
+        Sinh các mục Việt-Anh từ các mục Anh-Việt có id > since_id bằng một câu
+        INSERT ... SELECT (giữ nguyên word_type, example và frequency)
+        """
+        try:
+            if self.normalized:
+                sql = """
+                    INSERT INTO vi_en_translations (vietnamese_id, meaning_id, word_type, example, frequency)
+                    SELECT meaning_id, english_id, word_type, example, frequency
+                    FROM en_vi_translations
+                    WHERE id > ?
+                    ORDER BY id
+                """
+            else:
+                sql = """
+                    INSERT INTO vietnamese_english (vietnamese_word, english_meaning, word_type, example, frequency)
+                    SELECT vietnamese_meaning, english_word, word_type, example, frequency
+                    FROM english_vietnamese
+                    WHERE id > ?
+                    ORDER BY id
+                """
+            return self._derive(sql, since_id, 'vietnamese_english')
+        except Exception as e:
+            logging.error(f"Error deriving vietnamese_english entries: {e}")
+            raise
+    
+    def derive_en_vi(self, since_id=0):
+        """
+        Sinh các mục Anh-Việt từ các mục Việt-Anh có id > since_id bằng một câu
+        INSERT ... SELECT (giữ nguyên word_type, example và frequency; không có phát âm)
+        """
+        try:
+            if self.normalized:
+                sql = """
+                    INSERT INTO en_vi_translations (english_id, meaning_id, word_type, pronunciation, example, frequency)
+                    SELECT meaning_id, vietnamese_id, word_type, '', example, frequency
+                    FROM vi_en_translations
+                    WHERE id > ?
+                    ORDER BY id
+                """
+            else:
+                sql = """
+                    INSERT INTO english_vietnamese (english_word, vietnamese_meaning, word_type, pronunciation, example, frequency)
+                    SELECT english_meaning, vietnamese_word, word_type, '', example, frequency
+                    FROM vietnamese_english
+                    WHERE id > ?
+                    ORDER BY id
+                """
+            return self._derive(sql, since_id, 'english_vietnamese')
+        except Exception as e:
+            logging.error(f"Error deriving english_vietnamese entries: {e}")
+            raise
+    
     def get_counts(self):
         """Lấy số lượng bản ghi cho mỗi bảng"""
         try:
@@ -189,25 +742,403 @@ class DictionaryDatabase:
             return {'en_vi': 0, 'vi_en': 0}
     
     def get_vietnamese_words(self, limit=5000):
-        """Lấy danh sách các từ tiếng Việt từ cơ sở dữ liệu"""
+        """Lấy tối đa limit từ tiếng Việt (không trùng) theo thứ tự từ"""
         try:
-            self.cursor.execute(f"SELECT DISTINCT vietnamese_word FROM vietnamese_english LIMIT {limit}")
-            return [row[0] for row in self.cursor.fetchall()]
+            return list(itertools.islice(self.iter_vietnamese_words(min(limit, 10000)), limit))
         except Exception as e:
             logging.error(f"Error getting Vietnamese words: {e}")
             return []
     
+    def iter_vietnamese_words(self, batch_size=10000, after=''):
+        """
+        Duyệt các từ tiếng Việt (không trùng, khác rỗng) đứng sau after theo thứ tự từ. Mỗi trang
+        batch_size từ là một truy vấn riêng tiếp tục từ từ cuối của trang trước (keyset) trên
+        chỉ mục idx_vietnamese_word, nên không giữ con trỏ đọc mở giữa các trang và người gọi
+        có thể ghi vào database trong lúc duyệt.
+        """
+        while True:
+            self.cursor.execute("""
+                SELECT DISTINCT vietnamese_word FROM vietnamese_english
+                WHERE vietnamese_word > ?
+                ORDER BY vietnamese_word
+                LIMIT ?
+            """, (after, batch_size))
+            words = [row[0] for row in self.cursor.fetchall()]
+            yield from words
+            if len(words) < batch_size:
+                return
+            after = words[-1]
+    
+    def _headword_filter_path(self, table):
+        return f"{self.db_path}.{table}.bloom"
+    
+    def _remove_headword_filters(self):
+        for table in HEADWORD_COLUMNS:
+            for path in (self._headword_filter_path(table), self._spelling_index_path(table)):
+                if os.path.exists(path):
+                    os.remove(path)
+    
+    def _add_headwords_since(self, table, bloom, since_id):
+        """Thêm vào bloom các từ gốc của các dòng có id > since_id"""
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(f"SELECT {HEADWORD_COLUMNS[table]} FROM {table} WHERE id > ?", (since_id,))
+            while True:
+                rows = cursor.fetchmany(10000)
+                if not rows:
+                    break
+                bloom.update(headword_key(row[0]) for row in rows)
+        finally:
+            cursor.close()
+    
+    def _build_headword_filter(self, table):
+        """Dựng bộ lọc từ toàn bộ bảng, sức chứa gấp đôi số từ gốc hiện có"""
+        column = HEADWORD_COLUMNS[table]
+        with metrics.phase('db'):
+            self.cursor.execute(f"SELECT COUNT(DISTINCT {column}) FROM {table}")
+            bloom = BloomFilter(max(BLOOM_MIN_CAPACITY, 2 * self.cursor.fetchone()[0]), BLOOM_ERROR_RATE)
+            synced_id = self.max_id(table)
+            self._add_headwords_since(table, bloom, 0)
+        metrics.incr(f"bloom.{table}.rebuilds")
+        return {'bloom': bloom, 'synced_id': synced_id, 'dirty': True}
+    
+    def _load_headword_filter(self, table):
+        """
+        Đọc bộ lọc đã lưu và bổ sung các dòng chèn sau lần lưu (id lớn hơn); dựng lại
+        nếu chưa có file, file hỏng, đổi BLOOM_ERROR_RATE hoặc bảng đã bị ghi lại (dedup)
+        """
+        path = self._headword_filter_path(table)
+        max_id = self.max_id(table)
+        loaded = None
+        if os.path.exists(path):
+            try:
+                loaded = BloomFilter.load(path)
+            except Exception as e:
+                logging.error(f"Error loading Bloom filter {path}: {e}")
+        
+        if loaded:
+            bloom, meta = loaded
+            if meta.get('table') == table and meta.get('max_id', max_id + 1) <= max_id \
+                    and bloom.error_rate == BLOOM_ERROR_RATE:
+                self._add_headwords_since(table, bloom, meta['max_id'])
+                if not bloom.is_full():
+                    return {'bloom': bloom, 'synced_id': max_id, 'dirty': max_id != meta['max_id']}
+        return self._build_headword_filter(table)
+    
+    def headword_filter(self, table='vietnamese_english'):
+        """Bộ lọc Bloom các từ gốc (đã qua headword_key) của bảng; None nếu BLOOM_FILTERS tắt"""
+        if not BLOOM_FILTERS:
+            return None
+        state = self._headword_filters.get(table)
+        if state is None:
+            state = self._headword_filters[table] = self._load_headword_filter(table)
+        return state['bloom']
+    
+    def _add_headwords(self, table, values):
+        """Cập nhật bộ lọc và chỉ mục chính tả đã nạp với các dòng vừa chèn (cột đầu là từ gốc)"""
+        self._table_changed(table)
+        self._sync_spelling(table)
+        state = self._headword_filters.get(table)
+        if state is None:
+            # Chưa nạp: các dòng mới được bổ sung theo id khi nạp từ file
+            return
+        state['bloom'].update(headword_key(row[0]) for row in values)
+        state['synced_id'] = self.max_id(table)
+        state['dirty'] = True
+        if state['bloom'].is_full():
+            self._headword_filters[table] = self._build_headword_filter(table)
+    
+    def _sync_headwords(self, table):
+        """Bổ sung vào bộ lọc và chỉ mục chính tả đã nạp các dòng được chèn bằng SQL (derive_*)"""
+        self._table_changed(table)
+        self._sync_spelling(table)
+        state = self._headword_filters.get(table)
+        if state is None:
+            return
+        self._add_headwords_since(table, state['bloom'], state['synced_id'])
+        state['synced_id'] = self.max_id(table)
+        state['dirty'] = True
+        if state['bloom'].is_full():
+            self._headword_filters[table] = self._build_headword_filter(table)
+    
+    def has_headword(self, word, table='vietnamese_english'):
+        """
+        Từ gốc có thể đã có trong bảng (so sánh theo headword_key, không phân biệt hoa thường):
+        False là chắc chắn chưa có, True sai với xác suất khoảng BLOOM_ERROR_RATE. Không truy
+        vấn SQLite sau khi bộ lọc đã nạp; khi BLOOM_FILTERS tắt thì kết quả là chính xác.
+        """
+        key = headword_key(word)
+        bloom = self.headword_filter(table)
+        if bloom is None:
+            # Cùng khóa với bộ lọc (lower() của SQLite chỉ đổi chữ ASCII): thử khớp đúng qua chỉ mục
+            # trước, chỉ quét cả bảng bằng hàm headword_key khi không có
+            column = HEADWORD_COLUMNS[table]
+            self.cursor.execute(f"SELECT 1 FROM {table} WHERE {column} IN (?, ?) LIMIT 1", (clean_text(word), key))
+            if self.cursor.fetchone() is not None:
+                return True
+            self.conn.create_function('headword_key', 1, headword_key, deterministic=True)
+            self.cursor.execute(f"SELECT 1 FROM {table} WHERE headword_key({column}) = ? LIMIT 1", (key,))
+            return self.cursor.fetchone() is not None
+        return key in bloom
+    
+    def save_headword_filters(self):
+        """Lưu các bộ lọc đã thay đổi cạnh database (không lưu khi đang trong transaction)"""
+        if self.read_only or self._transaction_depth:
+            return
+        for table, state in self._headword_filters.items():
+            if not state['dirty']:
+                continue
+            try:
+                state['bloom'].save(self._headword_filter_path(table), table=table, max_id=state['synced_id'])
+                state['dirty'] = False
+            except Exception as e:
+                logging.error(f"Error saving Bloom filter for {table}: {e}")
+    
+    def _spelling_index_path(self, table):
+        return f"{self.db_path}.{table}.spell"
+    
+    def _add_spelling_since(self, table, index, since_id):
+        """Thêm vào index các từ gốc (kèm tổng tần suất) của các dòng có id > since_id"""
+        column = HEADWORD_COLUMNS[table]
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(f"""
+                SELECT {column}, SUM(frequency) FROM {table}
+                WHERE id > ? AND {column} IS NOT NULL AND {column} != ''
+                GROUP BY {column}
+            """, (since_id,))
+            while True:
+                rows = cursor.fetchmany(10000)
+                if not rows:
+                    break
+                index.update((word, frequency or 1) for word, frequency in rows)
+        finally:
+            cursor.close()
+    
+    def _load_spelling_index(self, table):
+        """
+        Đọc chỉ mục đã lưu và bổ sung các dòng chèn sau lần lưu; dựng lại nếu chưa có file,
+        file hỏng, đổi SPELLING_MAX_DISTANCE/SPELLING_PREFIX_LENGTH hoặc bảng đã bị ghi lại
+        """
+        path = self._spelling_index_path(table)
+        max_id = self.max_id(table)
+        loaded = None
+        if os.path.exists(path):
+            try:
+                loaded = SpellingIndex.load(path)
+            except Exception as e:
+                logging.error(f"Error loading spelling index {path}: {e}")
+        
+        with metrics.phase('db'):
+            if loaded:
+                index, meta = loaded
+                if meta.get('table') == table and meta.get('max_id', max_id + 1) <= max_id \
+                        and index.max_distance == SPELLING_MAX_DISTANCE and index.prefix_length == SPELLING_PREFIX_LENGTH:
+                    self._add_spelling_since(table, index, meta['max_id'])
+                    return {'index': index, 'synced_id': max_id, 'dirty': max_id != meta['max_id']}
+            index = SpellingIndex(SPELLING_MAX_DISTANCE, SPELLING_PREFIX_LENGTH)
+            self._add_spelling_since(table, index, 0)
+            index.compact()
+        metrics.incr(f"spelling.{table}.rebuilds")
+        return {'index': index, 'synced_id': max_id, 'dirty': True}
+    
+    def spelling_index(self, table='english_vietnamese'):
+        """Chỉ mục gợi ý chính tả các từ gốc của bảng; None nếu SPELLING_INDEX tắt"""
+        if not SPELLING_INDEX:
+            return None
+        state = self._spelling_indexes.get(table)
+        if state is None:
+            state = self._spelling_indexes[table] = self._load_spelling_index(table)
+        return state['index']
+    
+    def _sync_spelling(self, table):
+        """Bổ sung vào chỉ mục đã nạp các dòng có id lớn hơn lần đồng bộ trước"""
+        state = self._spelling_indexes.get(table)
+        if state is None:
+            return
+        self._add_spelling_since(table, state['index'], state['synced_id'])
+        state['synced_id'] = self.max_id(table)
+        state['dirty'] = True
+    
+    def suggest(self, word, table='english_vietnamese', limit=5):
+        """
+        Gợi ý "có phải bạn muốn tìm": các từ gốc của bảng gần word nhất, bỏ qua lỗi dấu
+        tiếng Việt ('viet nam' -> 'việt nam'). Trả về [{'word', 'distance', 'frequency'}].
+        """
+        index = self.spelling_index(table)
+        if index is None:
+            return []
+        return index.suggest(clean_text(word), limit)
+    
+    def save_spelling_indexes(self):
+        """Lưu các chỉ mục chính tả đã thay đổi cạnh database (không lưu khi đang trong transaction)"""
+        if self.read_only or self._transaction_depth:
+            return
+        for table, state in self._spelling_indexes.items():
+            if not state['dirty']:
+                continue
+            try:
+                state['index'].save(self._spelling_index_path(table), table=table, max_id=state['synced_id'])
+                state['dirty'] = False
+            except Exception as e:
+                logging.error(f"Error saving spelling index for {table}: {e}")
+    
     def get_translations(self, limit=50000):
-        """Lấy các bản dịch hiện có từ cơ sở dữ liệu"""
+        """Tối đa limit từ tiếng Anh (chữ thường) đầu tiên của translation_map() cùng mọi nghĩa của chúng"""
+        return dict(itertools.islice(self.translation_map('english_vietnamese').items(), limit))
+    
+    def iter_translations(self, table='english_vietnamese', batch_size=10000, after_id=0):
+        """
+        Duyệt (id, từ, nghĩa, tần suất) của mọi dòng có id > after_id theo thứ tự id. Mỗi trang
+        là một truy vấn WHERE id > <id cuối của trang trước> trên khóa chính, nên trang sau
+        không chậm dần như OFFSET và các dòng chèn trong lúc duyệt vẫn được đọc tới.
+        """
+        word_column, meaning_column = DELTA_TABLES[table][0]
+        while True:
+            self.cursor.execute(f"""
+                SELECT id, {word_column}, {meaning_column}, frequency FROM {table}
+                WHERE id > ?
+                ORDER BY id
+                LIMIT ?
+            """, (after_id, batch_size))
+            rows = self.cursor.fetchall()
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            after_id = rows[-1][0]
+    
+    def _table_changed(self, table):
+        self._table_versions[table] = self._table_versions.get(table, 0) + 1
+    
+    def _table_version(self, table):
+        """
+        Phiên bản hiện tại của bảng: số lần ghi qua các hàm của lớp này, total_changes của
+        kết nối (mọi lệnh ghi qua kết nối này, kể cả lệnh SQL trực tiếp trên db.cursor) và
+        PRAGMA data_version (tăng khi một kết nối khác commit)
+        """
+        self.cursor.execute("PRAGMA data_version")
+        return self.cursor.fetchone()[0], self.conn.total_changes, self._table_versions.get(table, 0)
+    
+    def translation_map(self, table='english_vietnamese'):
+        """
+        Ánh xạ từ (chữ thường) -> danh sách mọi nghĩa, xếp theo tần suất giảm dần. Được nạp
+        một lần và dùng lại cho tới khi có lệnh ghi qua kết nối này (kể cả SQL trực tiếp),
+        rollback hoặc commit của kết nối khác. Người gọi không được sửa kết quả.
+        """
+        version = self._table_version(table)
+        cached = self._translation_maps.get(table)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        
+        grouped = {}
+        with metrics.phase('db'):
+            for row_id, word, meaning, frequency in self.iter_translations(table):
+                if word:
+                    grouped.setdefault(word.lower(), []).append((-(frequency or 1), row_id, meaning))
+        mapping = {}
+        for word, meanings in grouped.items():
+            if len(meanings) == 1:
+                mapping[word] = [meanings[0][2]]
+                continue
+            meanings.sort()
+            # Cùng một nghĩa có thể đến từ nhiều cách viết hoa của từ
+            mapping[word] = list(dict.fromkeys(meaning for _, _, meaning in meanings))
+        metrics.incr(f"translation_map.{table}.loads")
+        self._translation_maps[table] = (version, mapping)
+        return mapping
+    
+    def _ranked(self, rows):
+        # Điểm = tần suất của nghĩa / tổng tần suất các nghĩa của cùng một từ
+        total = sum(row['frequency'] for row in rows) or 1
+        for row in rows:
+            row['score'] = row['frequency'] / total
+        return rows
+    
+    def lookup_english(self, word, limit=None):
+        """Tra nghĩa tiếng Việt của một từ tiếng Anh, xếp theo điểm tần suất giảm dần"""
         try:
-            self.cursor.execute(f"SELECT DISTINCT english_word, vietnamese_meaning FROM english_vietnamese LIMIT {limit}")
-            return {row[0].lower(): row[1] for row in self.cursor.fetchall()}
+            self.cursor.execute("""
+                SELECT vietnamese_meaning, word_type, pronunciation, example, frequency
+                FROM english_vietnamese
+                WHERE english_word = ?
+                ORDER BY frequency DESC, id
+            """, (word,))
+            rows = [{
+                'vietnamese_meaning': meaning,
+                'word_type': word_type or '',
+                'pronunciation': pronunciation or '',
+                'example': example or '',
+                'frequency': frequency or 1
+            } for meaning, word_type, pronunciation, example, frequency in self.cursor.fetchall()]
+            return self._ranked(rows)[:limit]
         except Exception as e:
-            logging.error(f"Error getting translations: {e}")
+            logging.error(f"Error looking up English word {word}: {e}")
+            return []
+    
+    def lookup_vietnamese(self, word, limit=None):
+        """Tra nghĩa tiếng Anh của một từ tiếng Việt, xếp theo điểm tần suất giảm dần"""
+        try:
+            self.cursor.execute("""
+                SELECT english_meaning, word_type, example, frequency
+                FROM vietnamese_english
+                WHERE vietnamese_word = ?
+                ORDER BY frequency DESC, id
+            """, (word,))
+            rows = [{
+                'english_meaning': meaning,
+                'word_type': word_type or '',
+                'example': example or '',
+                'frequency': frequency or 1
+            } for meaning, word_type, example, frequency in self.cursor.fetchall()]
+            return self._ranked(rows)[:limit]
+        except Exception as e:
+            logging.error(f"Error looking up Vietnamese word {word}: {e}")
+            return []
+    
+    def lookup_vietnamese_many(self, words, limit=None, chunk_size=500):
+        """
+        Tra nhiều từ tiếng Việt cùng lúc: mỗi chunk_size từ một truy vấn IN (...) thay vì một
+        truy vấn cho mỗi từ. Trả về {từ: các nghĩa như lookup_vietnamese()}; từ không có nghĩa
+        không có trong kết quả.
+        """
+        words = list(dict.fromkeys(words))
+        grouped = {}
+        try:
+            for i in range(0, len(words), chunk_size):
+                chunk = words[i:i + chunk_size]
+                self.cursor.execute(f"""
+                    SELECT vietnamese_word, english_meaning, word_type, example, frequency
+                    FROM vietnamese_english
+                    WHERE vietnamese_word IN ({', '.join('?' * len(chunk))})
+                    ORDER BY vietnamese_word, frequency DESC, id
+                """, chunk)
+                for word, meaning, word_type, example, frequency in self.cursor.fetchall():
+                    grouped.setdefault(word, []).append({
+                        'english_meaning': meaning,
+                        'word_type': word_type or '',
+                        'example': example or '',
+                        'frequency': frequency or 1
+                    })
+        except Exception as e:
+            logging.error(f"Error looking up {len(words)} Vietnamese words: {e}")
             return {}
+        return {word: self._ranked(rows)[:limit] for word, rows in grouped.items()}
     
-    def export_to_sql_file(self, output_file='dictionary_data.sql', batch_size=1000):
-        """Xuất dữ liệu từ điển ra file SQL"""
+    def export_to_sql_file(self, output_file='dictionary_data.sql', batch_size=None):
+        """Xuất dữ liệu từ điển ra file SQL (batch_size=None: kích thước lô đọc tự điều chỉnh)"""
+        from tqdm import tqdm
+        
+        batch_size = batch_size or self.batch_size
+        batcher = None if batch_size else self._new_batcher('db.export')
+        
+        def fetch_batches(cursor, total, desc):
+            progress = tqdm(total=total, desc=desc, unit=' rows')
+            batches = batcher.fetch(cursor) if batcher else iter(lambda: cursor.fetchmany(batch_size), [])
+            for rows in batches:
+                yield rows
+                progress.update(len(rows))
+            progress.close()
+        
         try:
             counts = self.get_counts()
             en_vi_count = counts['en_vi']
@@ -225,6 +1156,7 @@ CREATE TABLE IF NOT EXISTS english_vietnamese (
     word_type VARCHAR(50),
     pronunciation VARCHAR(255),
     example TEXT,
+    frequency INTEGER DEFAULT 1,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -234,6 +1166,7 @@ CREATE TABLE IF NOT EXISTS vietnamese_english (
     english_meaning TEXT NOT NULL,
     word_type VARCHAR(50),
     example TEXT,
+    frequency INTEGER DEFAULT 1,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -242,48 +1175,48 @@ CREATE INDEX idx_vietnamese_word ON vietnamese_english(vietnamese_word);
                 """
                 f.write(schema_sql + "\n\n")
                 
-                # Ghi dữ liệu Anh-Việt theo lô
+                # Ghi dữ liệu Anh-Việt theo lô, các nghĩa của một từ xếp theo tần suất giảm dần
                 f.write("-- English-Vietnamese data\n")
                 
-                for offset in tqdm(range(0, en_vi_count, batch_size), desc="Exporting EN-VI"):
-                    self.cursor.execute(f"""
-                        SELECT english_word, vietnamese_meaning, word_type, pronunciation, example 
-                        FROM english_vietnamese
-                        LIMIT {batch_size} OFFSET {offset}
-                    """)
-                    rows = self.cursor.fetchall()
-                    
+                cursor = self.conn.cursor()
+                cursor.execute("""
+                    SELECT english_word, vietnamese_meaning, word_type, pronunciation, example, frequency 
+                    FROM english_vietnamese
+                    ORDER BY english_word, frequency DESC, id
+                """)
+                for rows in fetch_batches(cursor, en_vi_count, "Exporting EN-VI"):
                     for row in rows:
-                        english_word, vietnamese_meaning, word_type, pronunciation, example = row
+                        english_word, vietnamese_meaning, word_type, pronunciation, example, frequency = row
                         # Escape các ký tự đặc biệt
                         english_word = str(english_word).replace("'", "''")
                         vietnamese_meaning = str(vietnamese_meaning).replace("'", "''")
                         word_type = str(word_type or "").replace("'", "''")
                         pronunciation = str(pronunciation or "").replace("'", "''")
                         example = str(example or "").replace("'", "''")
+                        frequency = int(frequency or 1)
                         
-                        f.write(f"INSERT INTO english_vietnamese (english_word, vietnamese_meaning, word_type, pronunciation, example) VALUES ('{english_word}', '{vietnamese_meaning}', '{word_type}', '{pronunciation}', '{example}');\n")
+                        f.write(f"INSERT INTO english_vietnamese (english_word, vietnamese_meaning, word_type, pronunciation, example, frequency) VALUES ('{english_word}', '{vietnamese_meaning}', '{word_type}', '{pronunciation}', '{example}', {frequency});\n")
                 
                 # Ghi dữ liệu Việt-Anh theo lô
                 f.write("\n-- Vietnamese-English data\n")
                 
-                for offset in tqdm(range(0, vi_en_count, batch_size), desc="Exporting VI-EN"):
-                    self.cursor.execute(f"""
-                        SELECT vietnamese_word, english_meaning, word_type, example 
-                        FROM vietnamese_english
-                        LIMIT {batch_size} OFFSET {offset}
-                    """)
-                    rows = self.cursor.fetchall()
-                    
+                cursor.execute("""
+                    SELECT vietnamese_word, english_meaning, word_type, example, frequency 
+                    FROM vietnamese_english
+                    ORDER BY vietnamese_word, frequency DESC, id
+                """)
+                for rows in fetch_batches(cursor, vi_en_count, "Exporting VI-EN"):
                     for row in rows:
-                        vietnamese_word, english_meaning, word_type, example = row
+                        vietnamese_word, english_meaning, word_type, example, frequency = row
                         # Escape các ký tự đặc biệt
                         vietnamese_word = str(vietnamese_word).replace("'", "''")
                         english_meaning = str(english_meaning).replace("'", "''")
                         word_type = str(word_type or "").replace("'", "''")
                         example = str(example or "").replace("'", "''")
+                        frequency = int(frequency or 1)
                         
-                        f.write(f"INSERT INTO vietnamese_english (vietnamese_word, english_meaning, word_type, example) VALUES ('{vietnamese_word}', '{english_meaning}', '{word_type}', '{example}');\n")
+                        f.write(f"INSERT INTO vietnamese_english (vietnamese_word, english_meaning, word_type, example, frequency) VALUES ('{vietnamese_word}', '{english_meaning}', '{word_type}', '{example}', {frequency});\n")
+                cursor.close()
             
             print(f"Successfully exported data to {output_file}")
             return True
@@ -292,7 +1225,212 @@ CREATE INDEX idx_vietnamese_word ON vietnamese_english(vietnamese_word);
             print(f"Error exporting to SQL file: {e}")
             return False
     
+    def iter_headword_groups(self, direction, order_by, batch_size=None):
+        """
+        Duyệt (từ gốc, [các nghĩa]) của một chiều trong một lượt theo thứ tự order_by (biểu
+        thức SQL trên cột từ gốc {word}); mọi nghĩa của một từ gốc, xếp theo tần suất giảm
+        dần, được gom thành một nhóm. Chỉ giữ một lô dòng và một nhóm trong bộ nhớ.
+        """
+        table, word_column, meaning_column, pronunciation_column, _ = OFFLINE_DIRECTIONS[direction]
+        batch_size = batch_size or self.batch_size
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(f"""
+                SELECT {word_column}, {meaning_column}, word_type, {pronunciation_column}, example
+                FROM {table}
+                ORDER BY {order_by.format(word=word_column)}, frequency DESC, id
+            """)
+            batches = self._new_batcher('db.export').fetch(cursor) if not batch_size \
+                else iter(lambda: cursor.fetchmany(batch_size), [])
+            current = None
+            meanings = []
+            for rows in batches:
+                for word, meaning, word_type, pronunciation, example in rows:
+                    if word != current:
+                        if meanings:
+                            yield current, meanings
+                        current = word
+                        meanings = []
+                    meanings.append({
+                        'meaning': meaning or '',
+                        'word_type': word_type or '',
+                        'pronunciation': pronunciation or '',
+                        'example': example or ''
+                    })
+            if meanings:
+                yield current, meanings
+        finally:
+            cursor.close()
+    
+    def export_to_stardict(self, output_dir='exports/stardict'):
+        """
+        Xuất mỗi chiều thành một từ điển StarDict (output_dir/<chiều>/<chiều>.ifo, .idx,
+        .dict.dz). Dòng được đọc theo thứ tự của StarDict: lower() của SQLite chỉ đổi chữ
+        hoa ASCII, đúng như g_ascii_strcasecmp mà StarDict dùng để sắp .idx.
+        """
+        from offline_formats import write_stardict, format_definition
+        
+        try:
+            for direction, (_, _, _, _, title) in OFFLINE_DIRECTIONS.items():
+                groups = ((word, format_definition(meanings))
+                          for word, meanings in self.iter_headword_groups(direction, "lower({word}), {word}"))
+                count = write_stardict(groups, os.path.join(output_dir, direction), direction, f"{title} Dictionary")
+                print(f"Exported {count:,} {direction} headwords to StarDict in {output_dir}/{direction}")
+            return True
+        except Exception as e:
+            logging.error(f"Error exporting to StarDict: {e}")
+            print(f"Error exporting to StarDict: {e}")
+            return False
+    
+    def export_to_dictd(self, output_dir='exports/dictd'):
+        """Xuất mỗi chiều thành một từ điển dictd (output_dir/<chiều>.index, .dict.dz)"""
+        from offline_formats import write_dictd, format_definition, dictd_key
+        
+        try:
+            # Sắp bằng đúng hàm khóa của file .index; SQLite chỉ gọi hàm một lần cho mỗi dòng
+            self.conn.create_function('dictd_key', 1, dictd_key, deterministic=True)
+            for direction, (_, _, _, _, title) in OFFLINE_DIRECTIONS.items():
+                groups = ((word, format_definition(meanings))
+                          for word, meanings in self.iter_headword_groups(direction, "dictd_key({word}), {word}"))
+                count = write_dictd(groups, output_dir, direction, f"{title} Dictionary")
+                print(f"Exported {count:,} {direction} headwords to dictd in {output_dir}")
+            return True
+        except Exception as e:
+            logging.error(f"Error exporting to dictd: {e}")
+            print(f"Error exporting to dictd: {e}")
+            return False
+    
+    def export_delta(self, output_dir='exports/delta', snapshot_path=None):
+        """
+        Xuất các thay đổi so với lần xuất delta trước: dòng thêm, sửa và xóa theo khóa (từ,
+        nghĩa), ra delta_<build trước>_<build mới>.sql và .jsonl. Ảnh chụp của lần trước
+        (khóa và giá trị băm nội dung của mỗi dòng) nằm trong snapshot_path, được gắn vào bằng
+        ATTACH để so sánh hoàn toàn bằng SQL rồi thay bằng ảnh chụp mới. Dòng trùng khóa
+        được gộp như remove_duplicates(). Lần đầu mọi dòng đều là dòng thêm.
+        Trả về {'build': số build mới, 'insert': ..., 'update': ..., 'delete': ...} hoặc None nếu lỗi.
+        """
+        snapshot_path = snapshot_path or os.path.join(output_dir, 'snapshot.db')
+        os.makedirs(output_dir, exist_ok=True)
+        self.conn.create_function('content_hash', -1, content_hash, deterministic=True)
+        cursor = self.conn.cursor()
+        attached = False
+        try:
+            cursor.execute("ATTACH DATABASE ? AS snapshot", (snapshot_path,))
+            attached = True
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS snapshot.builds (
+                    build INTEGER PRIMARY KEY,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    inserts INTEGER, updates INTEGER, deletes INTEGER
+                )
+            """)
+            cursor.execute("SELECT COALESCE(MAX(build), 0) FROM snapshot.builds")
+            previous = cursor.fetchone()[0]
+            build = previous + 1
+            base = os.path.join(output_dir, f"delta_{previous}_{build}")
+            counts = {'build': build, 'insert': 0, 'update': 0, 'delete': 0}
+            
+            with open(f"{base}.sql.tmp", 'w', encoding='utf-8') as sql_f, \
+                 open(f"{base}.jsonl.tmp", 'w', encoding='utf-8') as json_f:
+                sql_f.write(f"-- Delta from build {previous} to build {build}\n")
+                for table, (keys, columns) in DELTA_TABLES.items():
+                    key_sql = ', '.join(keys)
+                    cursor.execute(f"""
+                        CREATE TABLE IF NOT EXISTS snapshot.{table} (
+                            {keys[0]} TEXT NOT NULL, {keys[1]} TEXT NOT NULL, hash INTEGER NOT NULL,
+                            PRIMARY KEY ({key_sql})
+                        ) WITHOUT ROWID
+                    """)
+                    # Dòng hiện tại đã gộp theo khóa: với một hàm MIN duy nhất, SQLite lấy các
+                    # cột không gộp từ dòng có id nhỏ nhất
+                    cursor.execute("DROP TABLE IF EXISTS temp.delta_current")
+                    cursor.execute(f"""
+                        CREATE TEMP TABLE delta_current AS
+                        SELECT {key_sql}, {', '.join(columns[:-1])}, SUM(frequency) AS frequency, MIN(id) AS id
+                        FROM {table}
+                        WHERE {' AND '.join(f'{key} IS NOT NULL' for key in keys)}
+                        GROUP BY {key_sql}
+                    """)
+                    cursor.execute(f"CREATE INDEX temp.idx_delta_current ON delta_current({key_sql})")
+                    match = ' AND '.join(f"s.{key} = c.{key}" for key in keys)
+                    changes = [
+                        ('insert', f"""
+                            SELECT c.{keys[0]}, c.{keys[1]}, {', '.join(f'c.{column}' for column in columns)}
+                            FROM delta_current c LEFT JOIN snapshot.{table} s ON {match}
+                            WHERE s.{keys[0]} IS NULL ORDER BY c.{keys[0]}, c.{keys[1]}
+                        """),
+                        ('update', f"""
+                            SELECT c.{keys[0]}, c.{keys[1]}, {', '.join(f'c.{column}' for column in columns)}
+                            FROM delta_current c JOIN snapshot.{table} s ON {match}
+                            WHERE s.hash != content_hash({', '.join(f'c.{column}' for column in columns)})
+                            ORDER BY c.{keys[0]}, c.{keys[1]}
+                        """),
+                        ('delete', f"""
+                            SELECT s.{keys[0]}, s.{keys[1]}
+                            FROM snapshot.{table} s LEFT JOIN delta_current c ON {match}
+                            WHERE c.{keys[0]} IS NULL ORDER BY s.{keys[0]}, s.{keys[1]}
+                        """)
+                    ]
+                    for operation, query in changes:
+                        sql_f.write(f"\n-- {table}: {operation}\n")
+                        cursor.execute(query)
+                        while True:
+                            rows = cursor.fetchmany(10000)
+                            if not rows:
+                                break
+                            counts[operation] += len(rows)
+                            for row in rows:
+                                self._write_delta_row(sql_f, json_f, table, operation, keys, columns, row)
+                    
+                    # Ảnh chụp mới của bảng
+                    cursor.execute(f"DELETE FROM snapshot.{table}")
+                    cursor.execute(f"""
+                        INSERT INTO snapshot.{table} ({key_sql}, hash)
+                        SELECT {key_sql}, content_hash({', '.join(columns)}) FROM delta_current
+                    """)
+                    cursor.execute("DROP TABLE temp.delta_current")
+            
+            cursor.execute("INSERT INTO snapshot.builds (build, inserts, updates, deletes) VALUES (?, ?, ?, ?)",
+                           (build, counts['insert'], counts['update'], counts['delete']))
+            # Ảnh chụp chỉ được thay khi cả hai file delta đã ghi xong
+            os.replace(f"{base}.sql.tmp", f"{base}.sql")
+            os.replace(f"{base}.jsonl.tmp", f"{base}.jsonl")
+            self.conn.commit()
+            print(f"Exported delta {previous} -> {build}: {counts['insert']:,} inserts, "
+                  f"{counts['update']:,} updates, {counts['delete']:,} deletes to {base}.sql/.jsonl")
+            return counts
+        except Exception as e:
+            self.conn.rollback()
+            logging.error(f"Error exporting delta: {e}")
+            print(f"Error exporting delta: {e}")
+            return None
+        finally:
+            cursor.close()
+            if attached:
+                self.conn.execute("DETACH DATABASE snapshot")
+    
+    @staticmethod
+    def _write_delta_row(sql_f, json_f, table, operation, keys, columns, row):
+        """Ghi một thay đổi ra file SQL và JSONL"""
+        where = ' AND '.join(f"{key} = {_sql_literal(value)}" for key, value in zip(keys, row))
+        if operation == 'insert':
+            names = ', '.join(keys + columns)
+            values = ', '.join(_sql_literal(value) for value in row)
+            sql_f.write(f"INSERT INTO {table} ({names}) VALUES ({values});\n")
+        elif operation == 'update':
+            assignments = ', '.join(f"{column} = {_sql_literal(value)}" for column, value in zip(columns, row[2:]))
+            sql_f.write(f"UPDATE {table} SET {assignments} WHERE {where};\n")
+        else:
+            sql_f.write(f"DELETE FROM {table} WHERE {where};\n")
+        
+        record = {'op': operation, 'table': table, 'key': dict(zip(keys, row[:2]))}
+        if operation != 'delete':
+            record['row'] = dict(zip(columns, row[2:]))
+        json_f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    
     def close(self):
-        """Đóng kết nối database"""
+        """Lưu các bộ lọc Bloom, chỉ mục chính tả và đóng kết nối database"""
         if self.conn:
+            self.save_headword_filters()
+            self.save_spelling_indexes()
             self.conn.close()
\ No newline at end of file
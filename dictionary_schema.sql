@@ -5,6 +5,7 @@ CREATE TABLE IF NOT EXISTS english_vietnamese (
     word_type VARCHAR(50),
     pronunciation VARCHAR(255),
     example TEXT,
+    frequency INTEGER DEFAULT 1,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -14,6 +15,7 @@ CREATE TABLE IF NOT EXISTS vietnamese_english (
     english_meaning TEXT NOT NULL,
     word_type VARCHAR(50),
     example TEXT,
+    frequency INTEGER DEFAULT 1,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -1,6 +1,7 @@
 import os
 import logging
 import time
+import argparse
 
 # Cấu hình logging
 logging.basicConfig(
@@ -10,79 +11,241 @@ logging.basicConfig(
 )
 
 from database import DictionaryDatabase
-from collectors.github import download_github_dictionaries
-from collectors.opus import download_opus_data
-from collectors.wordnet import download_wordnet_data
-from collectors.wiktionary import download_wiktionary_data
+from metrics import metrics
+from config import (DB_PATH, GITHUB_SOURCES, OPUS_SOURCES, METRICS_REPORT_PATH, PROFILE_MODE, PROFILE_DIR,
+                    ensure_directories)
 from enrichment import enrich_data
+from sharding import SHARD_STAGES, build_sharded
 from utils import timer, print_summary, create_directory, format_time
 
-# Đảm bảo các thư mục cần thiết tồn tại
-create_directory("cache")
-create_directory("exports")
+# Các giai đoạn theo thứ tự chạy; tracau và wordnet chỉ chạy khi được chọn
+STAGES = ['github', 'opus', 'wiktionary', 'wordnet', 'tracau', 'local', 'dedup', 'enrich', 'export', 'compile']
+DEFAULT_STAGES = ['github', 'opus', 'wiktionary', 'local', 'dedup', 'enrich', 'export', 'compile']
+
+# Định dạng xuất: file SQL, từ điển StarDict và dictd cho các trình đọc offline, và delta
+# (SQL + JSONL) chỉ gồm các thay đổi so với lần xuất delta trước
+EXPORT_FORMATS = ['sql', 'stardict', 'dictd', 'delta']
+
+# File CSV cục bộ và bảng tương ứng
+LOCAL_FILES = [
+    ('en_vi_additional.csv', 'english_vietnamese'),
+    ('vi_en_additional.csv', 'vietnamese_english')
+]
+
+def parse_args(argv=None):
+    """Đọc tham số dòng lệnh"""
+    parser = argparse.ArgumentParser(description="Build the English-Vietnamese / Vietnamese-English dictionary")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=DEFAULT_STAGES, metavar='STAGE',
+                        help=f"stages to run, always in pipeline order (choices: {', '.join(STAGES)})")
+    parser.add_argument('--sources', nargs='+', metavar='NAME',
+                        help="only these GitHub/OPUS sources (by name, case-insensitive)")
+    parser.add_argument('--workers', type=int, help="worker threads/processes for the collectors")
+    parser.add_argument('--shards', type=int, default=1,
+                        help="run the github/opus/wordnet/local stages in this many processes, each writing "
+                             "its own shard database, then merge the shards into --db (default: 1, no shards)")
+    parser.add_argument('--batch-size', type=int,
+                        help="fixed rows per database insert/export batch (default: adaptive)")
+    parser.add_argument('--db', default=DB_PATH, help="SQLite database path")
+    parser.add_argument('--wiktionary-limit', type=int, default=1000, help="max Wiktionary headwords to fetch")
+    parser.add_argument('--tracau-limit', type=int, default=10000, help="max TracauVN words to scrape")
+    parser.add_argument('--export-file', default='exports/dictionary_data.sql', help="SQL export path")
+    parser.add_argument('--formats', nargs='+', choices=EXPORT_FORMATS, default=['sql'], metavar='FORMAT',
+                        help=f"export formats, written next to the SQL export (choices: {', '.join(EXPORT_FORMATS)})")
+    parser.add_argument('--compiled-dir', default='exports',
+                        help="directory for the compiled memory-mapped lookup files (en_vi.dict, vi_en.dict)")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="estimate the rows each stage would produce without downloading or writing")
+    args = parser.parse_args(argv)
+    
+    if args.sources:
+        known = {source['name'].lower() for source in GITHUB_SOURCES + OPUS_SOURCES}
+        unknown = [name for name in args.sources if name.lower() not in known]
+        if unknown:
+            parser.error(f"unknown sources: {', '.join(unknown)}")
+    for name in ('workers', 'batch_size', 'shards'):
+        value = getattr(args, name)
+        if value is not None and value < 1:
+            parser.error(f"--{name.replace('_', '-')} must be at least 1")
+    
+    # Giữ thứ tự của pipeline bất kể thứ tự người dùng nhập
+    args.stages = [stage for stage in STAGES if stage in args.stages]
+    return args
+
+def _collector_kwargs(args, workers_name):
+    """Chỉ truyền các tham số người dùng đã chỉ định để collector giữ giá trị mặc định của nó"""
+    kwargs = {}
+    if args.workers:
+        kwargs[workers_name] = args.workers
+    return kwargs
+
+def run_stage(stage, db, args):
+    """Chạy một giai đoạn, trả về số mục đã thu thập (None với các giai đoạn xử lý)"""
+    # Collector (cùng pandas, requests, bs4) chỉ được import khi giai đoạn của nó chạy
+    if stage == 'github':
+        from collectors.github import download_github_dictionaries
+        return download_github_dictionaries(db, sources=args.sources, **_collector_kwargs(args, 'max_workers'))
+    
+    if stage == 'opus':
+        from collectors.opus import download_opus_data
+        kwargs = _collector_kwargs(args, 'workers')
+        if args.batch_size:
+            kwargs['batch_size'] = args.batch_size
+        return download_opus_data(db, sources=args.sources, **kwargs)
+    
+    if stage == 'wiktionary':
+        from collectors.wiktionary import download_wiktionary_data
+        return download_wiktionary_data(db, limit=args.wiktionary_limit)
+    
+    if stage == 'wordnet':
+        from collectors.wordnet import download_wordnet_data
+        return download_wordnet_data(db, batch_size=args.batch_size or 5000)
+    
+    if stage == 'tracau':
+        from collectors.scraper import scrape_tracau_dictionary, coverage_gap_letters
+        return scrape_tracau_dictionary(db, limit=args.tracau_limit, letters=coverage_gap_letters(db) or None,
+                                        **_collector_kwargs(args, 'max_workers'))
+    
+    if stage == 'local':
+        count = 0
+        for csv_path, table_name in LOCAL_FILES:
+            if os.path.exists(csv_path):
+                from collectors.local_files import import_from_csv
+                count += import_from_csv(db, csv_path, table_name)
+        return count
+    
+    with metrics.phase('db'):
+        if stage == 'dedup':
+            db.remove_duplicates()
+        elif stage == 'enrich':
+            enrich_data(db)
+        elif stage == 'export':
+            export_dir = os.path.dirname(args.export_file) or "."
+            if 'sql' in args.formats:
+                db.export_to_sql_file(output_file=args.export_file)
+            if 'stardict' in args.formats:
+                db.export_to_stardict(os.path.join(export_dir, 'stardict'))
+            if 'dictd' in args.formats:
+                db.export_to_dictd(os.path.join(export_dir, 'dictd'))
+            if 'delta' in args.formats:
+                db.export_delta(os.path.join(export_dir, 'delta'))
+        elif stage == 'compile':
+            from compiled_dictionary import compile_dictionary
+            compile_dictionary(db, args.compiled_dir)
+    return None
+
+STAGE_LABELS = {
+    'github': "GitHub Repositories",
+    'opus': "OPUS Parallel Corpus",
+    'wiktionary': "Wiktionary",
+    'wordnet': "WordNet",
+    'tracau': "TracauVN",
+    'local': "Local Files"
+}
+
+def _format_estimate(rows):
+    return "not cached, unknown" if rows is None else f"~{rows:,}"
+
+def estimate_stage(stage, db, args):
+    """Ước lượng số dòng một giai đoạn sẽ tạo ra mà không tải hay ghi gì; trả về danh sách (nhãn, số dòng|None)"""
+    from processors.frequency import count_lines
+    
+    if stage == 'github':
+        from collectors.github import estimate_github_rows
+        return estimate_github_rows(args.sources)
+    
+    if stage == 'opus':
+        from collectors.opus import estimate_opus_rows
+        return estimate_opus_rows(args.sources)
+    
+    if stage in ('wiktionary', 'tracau'):
+        from coverage_index import CoverageIndex
+        coverage = CoverageIndex.from_wordlist(download=False)
+        if not len(coverage):
+            return [("missing wordlist headwords", None)]
+        missing = len(coverage.diff(db)) if db else len(coverage)
+        limit = args.wiktionary_limit if stage == 'wiktionary' else args.tracau_limit
+        return [("missing wordlist headwords", missing), ("headwords fetched (limit)", min(missing, limit))]
+    
+    if stage == 'wordnet':
+        from config import CACHE_DIR
+        mapping = f"{CACHE_DIR}/vietnamese-wordnet.txt"
+        return [("vietnamese-wordnet synsets", count_lines(mapping) if os.path.exists(mapping) else None)]
+    
+    if stage == 'local':
+        return [(csv_path, max(count_lines(csv_path) - 1, 0)) for csv_path, _ in LOCAL_FILES
+                if os.path.exists(csv_path)]
+    
+    # dedup, enrich, export và compile xử lý những gì đang có trong database
+    counts = db.get_counts() if db else {'en_vi': 0, 'vi_en': 0}
+    return [("current EN-VI rows", counts['en_vi']), ("current VI-EN rows", counts['vi_en'])]
+
+def dry_run(args):
+    """In ước lượng của từng giai đoạn đã chọn; database chỉ được mở ở chế độ đọc"""
+    db = DictionaryDatabase(args.db, read_only=True) if os.path.exists(args.db) else None
+    
+    try:
+        print(f"\n=== DRY RUN ({args.db}{'' if db else ', not created yet'}) ===")
+        total = 0
+        for stage in args.stages:
+            print(f"\n[{stage}]")
+            estimates = estimate_stage(stage, db, args)
+            if not estimates:
+                print("  nothing to do")
+            for label, rows in estimates:
+                print(f"  {label}: {_format_estimate(rows)}")
+                if stage in STAGE_LABELS and rows and not label.startswith("missing"):
+                    total += rows
+        print(f"\nEstimated new rows (upper bound, before dedup): ~{total:,}")
+    finally:
+        if db:
+            db.close()
 
 @timer
-def main():
+def main(argv=None):
     """Hàm chính để thu thập dữ liệu từ điển"""
+    args = parse_args(argv)
+    if args.dry_run:
+        dry_run(args)
+        return
+    
     start_time = time.time()
     
-    db = DictionaryDatabase()
+    # Đảm bảo các thư mục cần thiết tồn tại
+    ensure_directories()
+    create_directory(os.path.dirname(args.export_file) or ".")
+    
+    db = DictionaryDatabase(args.db, batch_size=args.batch_size)
     
     try:
         print("\n=== ENGLISH-VIETNAMESE & VIETNAMESE-ENGLISH DICTIONARY BUILDER ===\n")
-        print("Starting dictionary collection process to gather 300,000+ words...\n")
+        print(f"Running stages: {', '.join(args.stages)}\n")
         
         results = {}
+        stages = args.stages
         
-        # Method 1: Download from GitHub repositories (fast and reliable)
-        print("\n[1/5] Downloading dictionaries from GitHub repositories...")
-        github_count = download_github_dictionaries(db)
-        results["GitHub Repositories"] = github_count
-        print(f"Downloaded {github_count:,} entries from GitHub repositories")
+        if args.shards > 1 and any(stage in SHARD_STAGES for stage in stages):
+            # Các giai đoạn thu thập chạy song song trên các shard, phần còn lại chạy sau khi gộp
+            print(f"\n[shards] {', '.join(stage for stage in stages if stage in SHARD_STAGES)}...")
+            with metrics.profile_stage('shards', mode=PROFILE_MODE, output_dir=PROFILE_DIR):
+                counts = build_sharded(db, args, run_stage)
+            for stage, count in counts.items():
+                results[STAGE_LABELS[stage]] = count
+                print(f"Collected {count:,} entries from {STAGE_LABELS[stage]}")
+            stages = [stage for stage in stages if stage not in SHARD_STAGES]
         
-        # Method 2: Download from OPUS parallel corpus (good for phrases)
-        print("\n[2/5] Downloading from OPUS parallel corpus...")
-        opus_count = download_opus_data(db)
-        results["OPUS Parallel Corpus"] = opus_count
-        print(f"Downloaded {opus_count:,} entries from OPUS parallel corpus")
-        
-        # Method 3: Download Wiktionary data
-        print("\n[3/5] Downloading Wiktionary data...")
-        wiktionary_count = download_wiktionary_data(db)
-        results["Wiktionary"] = wiktionary_count
-        print(f"Downloaded {wiktionary_count:,} entries from Wiktionary")
-        
-        # Method 4: Import from local CSV files if available
-        print("\n[4/5] Checking for local dictionary files...")
-        local_count = 0
-        
-        # Cập nhật để sử dụng module import_from_csv
-        if os.path.exists('en_vi_additional.csv'):
-            from collectors.local_files import import_from_csv
-            local_count += import_from_csv(db, 'en_vi_additional.csv', 'english_vietnamese')
-        
-        if os.path.exists('vi_en_additional.csv'):
-            from collectors.local_files import import_from_csv
-            local_count += import_from_csv(db, 'vi_en_additional.csv', 'vietnamese_english')
-        
-        results["Local Files"] = local_count
-        print(f"Imported {local_count:,} entries from local files")
-        
-        # Final step: Clean and export data
-        print("\n[5/5] Cleaning and enriching data...")
-        db.remove_duplicates()
-        enrich_data(db)
+        for step, stage in enumerate(stages, 1):
+            print(f"\n[{step}/{len(stages)}] {STAGE_LABELS.get(stage, stage.capitalize())}...")
+            with metrics.profile_stage(stage, mode=PROFILE_MODE, output_dir=PROFILE_DIR):
+                count = run_stage(stage, db, args)
+            if count is not None:
+                results[STAGE_LABELS[stage]] = count
+                print(f"Collected {count:,} entries from {STAGE_LABELS[stage]}")
         
         # Final counts
         counts = db.get_counts()
         final_en_vi_count = counts['en_vi']
         final_vi_en_count = counts['vi_en']
         
-        # Export to SQL file
-        print("\nExporting dictionary to SQL file...")
-        export_file = 'exports/dictionary_data.sql'
-        db.export_to_sql_file(output_file=export_file)
-        
         elapsed_time = time.time() - start_time
         
         # Print summary with formatted counts
@@ -92,10 +255,15 @@ def main():
             f"Total entries": final_en_vi_count + final_vi_en_count
         }, elapsed_time)
         
-        print(f"\nData saved to {export_file}")
-        
+        if 'export' in args.stages:
+            print(f"\nData saved to {args.export_file}" if 'sql' in args.formats
+                  else f"\nData exported to {os.path.dirname(args.export_file) or '.'}")
+        if 'compile' in args.stages:
+            print(f"Compiled lookup files saved to {args.compiled_dir}")
+    
     finally:
         db.close()
+        metrics.write_report(METRICS_REPORT_PATH)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
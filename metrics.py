@@ -0,0 +1,218 @@
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+# Các giai đoạn dùng để chia thời gian chạy
+PHASES = ('network', 'parse', 'db')
+
+class Histogram:
+    """Lưu các giá trị quan sát được để tính min/max/trung bình và phân vị"""
+    
+    def __init__(self):
+        self.values = []
+    
+    def observe(self, value):
+        self.values.append(value)
+    
+    def summary(self):
+        if not self.values:
+            return {'count': 0}
+        values = sorted(self.values)
+        count = len(values)
+        return {
+            'count': count,
+            'sum': sum(values),
+            'min': values[0],
+            'max': values[-1],
+            'mean': sum(values) / count,
+            'p50': values[int(0.50 * (count - 1))],
+            'p90': values[int(0.90 * (count - 1))],
+            'p99': values[int(0.99 * (count - 1))]
+        }
+
+class Metrics:
+    """
+    Bộ đếm, bộ đo thời gian và histogram cho một lần chạy thu thập dữ liệu.
+    Các bộ đếm theo nguồn dùng nguồn hiện tại của luồng (xem source()).
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+    
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+            self.sources = {}
+            self.timers = {}
+            self.histograms = {}
+            self.profiles = {}
+            self.started_at = time.time()
+    
+    @contextmanager
+    def source(self, name):
+        """Gắn tên nguồn cho các bộ đếm được ghi trong khối này (theo từng luồng)"""
+        previous = getattr(self._local, 'source', None)
+        self._local.source = name
+        try:
+            yield
+        finally:
+            self._local.source = previous
+    
+    def current_source(self):
+        return getattr(self._local, 'source', None) or 'unknown'
+    
+    def incr(self, name, value=1):
+        """Tăng bộ đếm tổng"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+    
+    def incr_source(self, name, value=1, source=None):
+        """Tăng bộ đếm của nguồn hiện tại và bộ đếm tổng"""
+        source = source or self.current_source()
+        with self._lock:
+            counters = self.sources.setdefault(source, {})
+            counters[name] = counters.get(name, 0) + value
+            self.counters[name] = self.counters.get(name, 0) + value
+    
+    def observe(self, name, value):
+        """Ghi một giá trị vào histogram"""
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(value)
+    
+    def add_time(self, name, seconds):
+        with self._lock:
+            timer = self.timers.setdefault(name, {'count': 0, 'seconds': 0.0})
+            timer['count'] += 1
+            timer['seconds'] += seconds
+    
+    @contextmanager
+    def timer(self, name):
+        """Đo thời gian thực thi của khối lệnh"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+    
+    def phase(self, name):
+        """Đo thời gian của một giai đoạn (network, parse, db)"""
+        return self.timer(f"phase.{name}")
+    
+    def add_bytes(self, count, source=None):
+        """Ghi nhận số byte đã tải về cho nguồn hiện tại"""
+        self.incr_source('bytes_downloaded', count, source=source)
+    
+    def snapshot(self):
+        """Số liệu thô (pickle được) để process con gửi về cho process chính gộp bằng merge()"""
+        with self._lock:
+            return {
+                'counters': dict(self.counters),
+                'sources': {name: dict(counters) for name, counters in self.sources.items()},
+                'timers': {name: dict(timer) for name, timer in self.timers.items()},
+                'histograms': {name: list(histogram.values) for name, histogram in self.histograms.items()}
+            }
+    
+    def merge(self, snapshot):
+        """Cộng số liệu của một snapshot() (thường từ process khác) vào số liệu hiện tại"""
+        with self._lock:
+            for name, value in snapshot['counters'].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            for source, counters in snapshot['sources'].items():
+                target = self.sources.setdefault(source, {})
+                for name, value in counters.items():
+                    target[name] = target.get(name, 0) + value
+            for name, timer in snapshot['timers'].items():
+                target = self.timers.setdefault(name, {'count': 0, 'seconds': 0.0})
+                target['count'] += timer['count']
+                target['seconds'] += timer['seconds']
+            for name, values in snapshot['histograms'].items():
+                histogram = self.histograms.get(name)
+                if histogram is None:
+                    histogram = self.histograms[name] = Histogram()
+                histogram.values.extend(values)
+    
+    def report(self):
+        """Tổng hợp số liệu thành dict có thể ghi ra JSON"""
+        with self._lock:
+            phases = {name: self.timers.get(f"phase.{name}", {}).get('seconds', 0.0) for name in PHASES}
+            return {
+                'started_at': self.started_at,
+                'wall_seconds': time.time() - self.started_at,
+                'phases': phases,
+                'counters': dict(self.counters),
+                'sources': {name: dict(counters) for name, counters in self.sources.items()},
+                'timers': {name: dict(timer) for name, timer in self.timers.items()},
+                'histograms': {name: histogram.summary() for name, histogram in self.histograms.items()},
+                'profiles': dict(self.profiles)
+            }
+    
+    def write_report(self, path):
+        """Ghi báo cáo JSON để so sánh giữa các lần build"""
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.report(), f, ensure_ascii=False, indent=2)
+            logging.info(f"Metrics report written to {path}")
+        except Exception as e:
+            logging.error(f"Error writing metrics report {path}: {e}")
+    
+    @contextmanager
+    def profile_stage(self, name, mode=None, output_dir='profiles', top=20):
+        """
+        Chạy khối lệnh dưới cProfile hoặc tracemalloc (mode = 'cprofile' / 'tracemalloc').
+        Luôn đo thời gian giai đoạn; kết quả profile được đưa vào báo cáo.
+        """
+        with self.timer(f"stage.{name}"):
+            if mode == 'cprofile':
+                import io
+                import pstats
+                import cProfile
+                
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    yield
+                finally:
+                    profiler.disable()
+                    os.makedirs(output_dir, exist_ok=True)
+                    profile_path = os.path.join(output_dir, f"{name}.prof")
+                    profiler.dump_stats(profile_path)
+                    stream = io.StringIO()
+                    pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(top)
+                    self.profiles[name] = {'mode': mode, 'path': profile_path, 'top': stream.getvalue()}
+            elif mode == 'tracemalloc':
+                import tracemalloc
+                
+                already_tracing = tracemalloc.is_tracing()
+                if not already_tracing:
+                    tracemalloc.start()
+                tracemalloc.reset_peak()
+                before = tracemalloc.take_snapshot()
+                try:
+                    yield
+                finally:
+                    current, peak = tracemalloc.get_traced_memory()
+                    stats = tracemalloc.take_snapshot().compare_to(before, 'lineno')[:top]
+                    if not already_tracing:
+                        tracemalloc.stop()
+                    self.profiles[name] = {
+                        'mode': mode,
+                        'current_bytes': current,
+                        'peak_bytes': peak,
+                        'top': [str(stat) for stat in stats]
+                    }
+            else:
+                yield
+
+# Bộ số liệu dùng chung cho toàn bộ quá trình
+metrics = Metrics()
@@ -0,0 +1,178 @@
+import os
+import time
+import zlib
+import heapq
+import struct
+import shutil
+import tempfile
+
+# dictzip: gzip có trường phụ 'RA' liệt kê kích thước nén của từng khối CHUNK_LENGTH byte;
+# mỗi khối kết thúc bằng Z_FULL_FLUSH nên đọc được độc lập (truy cập ngẫu nhiên).
+# 58315 byte là kích thước khối của dictzip gốc: khối nén luôn vừa 16 bit kể cả khi không nén được.
+CHUNK_LENGTH = 58315
+MAX_CHUNKS = (0xffff - 10) // 2
+
+# Bảng chữ số base64 của file .index của dictd (chữ số có nghĩa lớn nhất đứng trước)
+DICTD_B64 = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/'
+
+class DictzipWriter:
+    """
+    Ghi file .dz theo từng khối: dữ liệu được nén ngay khi đủ một khối vào file tạm,
+    header (cần danh sách kích thước khối) được ghi khi close(). Trả về offset và độ dài
+    (chưa nén) của mỗi lần write() để làm chỉ mục.
+    """
+    
+    def __init__(self, path, chunk_length=CHUNK_LENGTH):
+        self.path = path
+        self.chunk_length = chunk_length
+        self._compressed = tempfile.TemporaryFile(dir=os.path.dirname(path) or '.')
+        self._compressor = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+        self._buffer = bytearray()
+        self._sizes = []
+        self._crc = 0
+        self.length = 0
+    
+    def write(self, data):
+        """Thêm data; trả về (offset, độ dài) của nó trong dữ liệu chưa nén"""
+        offset = self.length
+        self._buffer += data
+        self._crc = zlib.crc32(data, self._crc)
+        self.length += len(data)
+        while len(self._buffer) >= self.chunk_length:
+            self._compress_chunk(bytes(self._buffer[:self.chunk_length]))
+            del self._buffer[:self.chunk_length]
+        return offset, len(data)
+    
+    def _compress_chunk(self, chunk):
+        compressed = self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_FULL_FLUSH)
+        self._sizes.append(len(compressed))
+        self._compressed.write(compressed)
+        if len(self._sizes) > MAX_CHUNKS:
+            raise ValueError(f"{self.path}: dictzip supports at most {MAX_CHUNKS} chunks")
+    
+    def close(self):
+        if self._buffer:
+            self._compress_chunk(bytes(self._buffer))
+            self._buffer = bytearray()
+        # Khối kết thúc của luồng deflate nằm sau khối cuối, không thuộc khối nào
+        tail = self._compressor.flush(zlib.Z_FINISH)
+        
+        field = struct.pack('<HHH', 1, self.chunk_length, len(self._sizes)) + \
+            struct.pack(f'<{len(self._sizes)}H', *self._sizes)
+        extra = b'RA' + struct.pack('<H', len(field)) + field
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'wb') as f:
+            # ID1 ID2 CM=deflate FLG=FEXTRA MTIME XFL=2 (nén tối đa) OS=3 (Unix)
+            f.write(struct.pack('<BBBBIBB', 0x1f, 0x8b, 8, 4, int(time.time()), 2, 3))
+            f.write(struct.pack('<H', len(extra)) + extra)
+            self._compressed.seek(0)
+            shutil.copyfileobj(self._compressed, f, 1 << 20)
+            f.write(tail)
+            f.write(struct.pack('<II', self._crc, self.length & 0xffffffff))
+        self._compressed.close()
+        os.replace(temp_path, self.path)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._compressed.close()
+
+def format_definition(rows):
+    """
+    Nội dung một mục: phát âm (nếu có) rồi các nghĩa đánh số kèm từ loại và ví dụ.
+    rows là các dict có khóa 'meaning', 'word_type', 'pronunciation', 'example', đã xếp
+    theo tần suất giảm dần.
+    """
+    lines = []
+    pronunciation = next((row['pronunciation'] for row in rows if row.get('pronunciation')), '')
+    if pronunciation:
+        lines.append(pronunciation)
+    for number, row in enumerate(rows, 1):
+        word_type = f"({row['word_type']}) " if row.get('word_type') else ''
+        lines.append(f"{number}. {word_type}{row['meaning']}")
+        if row.get('example'):
+            lines.append(f"   {row['example']}")
+    return '\n'.join(lines)
+
+def _single_line(text):
+    return ' '.join(str(text).split())
+
+def write_stardict(groups, output_dir, name, bookname, description=''):
+    """
+    Ghi từ điển StarDict (name.ifo, name.idx, name.dict.dz) từ groups: các cặp
+    (từ gốc, nội dung) đã xếp theo thứ tự của StarDict (so sánh không phân biệt hoa
+    thường ASCII, rồi so sánh byte). .idx và .dict.dz được ghi trong cùng một lượt.
+    Trả về số mục.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    base = os.path.join(output_dir, name)
+    count = 0
+    with DictzipWriter(f"{base}.dict.dz") as data, open(f"{base}.idx.tmp", 'wb') as index:
+        for headword, definition in groups:
+            offset, length = data.write(definition.encode('utf-8'))
+            if offset + length > 0xffffffff:
+                raise ValueError(f"{base}.dict exceeds the 4 GB limit of 32-bit StarDict offsets")
+            index.write(_single_line(headword).encode('utf-8') + b'\0' + struct.pack('>II', offset, length))
+            count += 1
+    os.replace(f"{base}.idx.tmp", f"{base}.idx")
+    
+    ifo = [
+        "StarDict's dict ifo file",
+        "version=2.4.2",
+        f"bookname={_single_line(bookname)}",
+        f"wordcount={count}",
+        f"idxfilesize={os.path.getsize(f'{base}.idx')}",
+        "sametypesequence=m",
+        f"date={time.strftime('%Y.%m.%d')}"
+    ]
+    if description:
+        ifo.append(f"description={_single_line(description)}")
+    with open(f"{base}.ifo", 'w', encoding='utf-8') as f:
+        f.write('\n'.join(ifo) + '\n')
+    return count
+
+def _dictd_number(value):
+    digits = ''
+    while True:
+        digits = DICTD_B64[value % 64] + digits
+        value //= 64
+        if not value:
+            return digits
+
+def dictd_key(headword):
+    """Thứ tự của file .index (dictd với 00-database-allchars và 00-database-utf8): không phân biệt hoa thường"""
+    return headword.lower()
+
+def write_dictd(groups, output_dir, name, short_name, url='', info=''):
+    """
+    Ghi từ điển dictd (name.index, name.dict.dz) từ groups đã xếp theo (dictd_key, từ gốc).
+    Các mục 00-database-* được chèn đúng chỗ trong thứ tự đó khi ghi. Trả về số mục
+    (không tính các mục 00-database-*).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    base = os.path.join(output_dir, name)
+    headers = sorted((
+        ('00-database-allchars', ''),
+        ('00-database-utf8', ''),
+        ('00-database-short', short_name),
+        ('00-database-url', url),
+        ('00-database-info', info)
+    ), key=lambda entry: (dictd_key(entry[0]), entry[0]))
+    
+    count = 0
+    with DictzipWriter(f"{base}.dict.dz") as data, open(f"{base}.index.tmp", 'w', encoding='utf-8') as index:
+        entries = heapq.merge(headers, groups, key=lambda entry: (dictd_key(entry[0]), entry[0]))
+        for headword, definition in entries:
+            headword = _single_line(headword)
+            is_header = headword.startswith('00-database-')
+            body = f"{headword}\n{definition}\n" if not is_header else (f"{definition}\n" if definition else "")
+            offset, length = data.write(body.encode('utf-8'))
+            index.write(f"{headword}\t{_dictd_number(offset)}\t{_dictd_number(length)}\n")
+            if not is_header:
+                count += 1
+    os.replace(f"{base}.index.tmp", f"{base}.index")
+    return count
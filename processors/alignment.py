@@ -0,0 +1,179 @@
+import re
+import logging
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from processors.frequency import shard_ranges, read_range
+
+# Từ gồm chữ cái (kể cả chữ có dấu), cho phép dấu nháy ở giữa như "don't"
+TOKEN_PATTERN = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)?")
+
+# Các độ đo liên kết được hỗ trợ
+ALIGNMENT_METHODS = ('dice', 'pmi')
+
+def tokenize(line):
+    """Tách câu thành các từ viết thường"""
+    return TOKEN_PATTERN.findall(line.lower())
+
+def target_terms(tokens, max_ngram=2):
+    """Các âm tiết và n-gram liền kề (từ ghép tiếng Việt thường gồm 2 âm tiết)"""
+    terms = list(tokens)
+    for n in range(2, max_ngram + 1):
+        terms.extend(' '.join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+    return terms
+
+def _iter_sentence_terms(source_file, target_file, src_range, tgt_range, max_tokens, max_ngram):
+    """Trả về tập từ nguồn và tập từ/n-gram đích của từng cặp câu trong một đoạn"""
+    with open(source_file, 'rb') as src_f, open(target_file, 'rb') as tgt_f:
+        for src_line, tgt_line in zip(read_range(src_f, *src_range), read_range(tgt_f, *tgt_range)):
+            src_tokens = tokenize(src_line)
+            tgt_tokens = tokenize(tgt_line)
+            if not src_tokens or not tgt_tokens:
+                continue
+            if len(src_tokens) > max_tokens or len(tgt_tokens) > max_tokens:
+                continue
+            yield set(src_tokens), set(target_terms(tgt_tokens, max_ngram))
+
+def _count_terms(source_file, target_file, src_range, tgt_range, max_tokens, max_ngram):
+    """Lượt 1: số câu chứa mỗi từ ở hai phía"""
+    src_counts = Counter()
+    tgt_counts = Counter()
+    sentences = 0
+    for src_terms, tgt_terms in _iter_sentence_terms(source_file, target_file, src_range, tgt_range,
+                                                      max_tokens, max_ngram):
+        src_counts.update(src_terms)
+        tgt_counts.update(tgt_terms)
+        sentences += 1
+    return src_counts, tgt_counts, sentences
+
+def _merge_counts(codes_list, counts_list):
+    """Gộp các mảng (mã cặp, số lần) thành mảng mã không trùng với tổng số lần"""
+    codes = np.concatenate(codes_list)
+    counts = np.concatenate(counts_list)
+    if not len(codes):
+        return codes, counts
+    unique, inverse = np.unique(codes, return_inverse=True)
+    return unique, np.bincount(inverse, weights=counts).astype(np.int64)
+
+def _count_cooccurrence(source_file, target_file, src_range, tgt_range, max_tokens, max_ngram,
+                        src_vocab, tgt_vocab, flush_size=2000000):
+    """
+    Lượt 2: đếm số câu mà mỗi cặp từ (thuộc từ vựng) cùng xuất hiện.
+    Mỗi cặp được mã hóa thành src_id * |tgt_vocab| + tgt_id và đếm thưa bằng
+    np.unique theo từng khối, nên bộ nhớ chỉ phụ thuộc số cặp khác nhau.
+    """
+    tgt_size = len(tgt_vocab)
+    codes = np.empty(0, dtype=np.int64)
+    counts = np.empty(0, dtype=np.int64)
+    buffer = []
+    buffered = 0
+    
+    for src_terms, tgt_terms in _iter_sentence_terms(source_file, target_file, src_range, tgt_range,
+                                                      max_tokens, max_ngram):
+        src_ids = [src_vocab[t] for t in src_terms if t in src_vocab]
+        tgt_ids = [tgt_vocab[t] for t in tgt_terms if t in tgt_vocab]
+        if not src_ids or not tgt_ids:
+            continue
+        pairs = np.array(src_ids, dtype=np.int64)[:, None] * tgt_size + np.array(tgt_ids, dtype=np.int64)
+        buffer.append(pairs.ravel())
+        buffered += pairs.size
+        
+        if buffered >= flush_size:
+            block = np.concatenate(buffer)
+            codes, counts = _merge_counts([codes, block], [counts, np.ones(len(block), dtype=np.int64)])
+            buffer = []
+            buffered = 0
+    
+    if buffer:
+        block = np.concatenate(buffer)
+        codes, counts = _merge_counts([codes, block], [counts, np.ones(len(block), dtype=np.int64)])
+    
+    return codes, counts
+
+def _run_shards(func, source_file, target_file, workers, *args):
+    """Chạy func trên từng đoạn của corpus (song song khi workers > 1)"""
+    ranges = shard_ranges(source_file, target_file, max(1, workers))
+    if workers <= 1:
+        return [func(source_file, target_file, src_range, tgt_range, *args) for src_range, tgt_range in ranges]
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(func, source_file, target_file, src_range, tgt_range, *args)
+            for src_range, tgt_range in ranges
+        ]
+        return [future.result() for future in futures]
+
+def _build_vocab(counts, vocab_size, min_count):
+    """Giữ vocab_size từ xuất hiện trong nhiều câu nhất; trả về (term -> id, danh sách term, tần suất)"""
+    terms = [term for term, count in counts.most_common(vocab_size) if count >= min_count]
+    vocab = {term: i for i, term in enumerate(terms)}
+    frequencies = np.array([counts[term] for term in terms], dtype=np.float64)
+    return vocab, terms, frequencies
+
+def _top_k(group_ids, scores, top_k):
+    """Chỉ số của top_k phần tử có điểm cao nhất trong mỗi nhóm"""
+    order = np.lexsort((-scores, group_ids))
+    grouped = group_ids[order]
+    positions = np.arange(len(order))
+    starts = np.r_[True, grouped[1:] != grouped[:-1]]
+    group_start = np.maximum.accumulate(np.where(starts, positions, 0))
+    return order[positions - group_start < top_k]
+
+def extract_alignment_candidates(source_file, target_file, workers=1, method='dice', top_k=3,
+                                 vocab_size=20000, min_count=3, min_score=0.1, max_tokens=40, max_ngram=2):
+    """
+    Trích các cặp dịch từ vựng từ toàn bộ câu của corpus song song bằng thống kê
+    đồng xuất hiện (Dice hoặc PMI), chỉ giữ top_k nghĩa cho mỗi từ nguồn.
+    Trả về danh sách (từ nguồn, từ đích, điểm, số câu đồng xuất hiện).
+    """
+    if method not in ALIGNMENT_METHODS:
+        raise ValueError(f"Unknown alignment method: {method}")
+    
+    try:
+        # Lượt 1: từ vựng có giới hạn ở hai phía
+        src_counts = Counter()
+        tgt_counts = Counter()
+        sentences = 0
+        for shard_src, shard_tgt, shard_sentences in _run_shards(_count_terms, source_file, target_file, workers,
+                                                                 max_tokens, max_ngram):
+            src_counts.update(shard_src)
+            tgt_counts.update(shard_tgt)
+            sentences += shard_sentences
+        
+        src_vocab, src_terms, src_freq = _build_vocab(src_counts, vocab_size, min_count)
+        tgt_vocab, tgt_terms, tgt_freq = _build_vocab(tgt_counts, vocab_size, min_count)
+        del src_counts, tgt_counts
+        if not src_vocab or not tgt_vocab:
+            return []
+        
+        # Lượt 2: đồng xuất hiện, gộp kết quả các đoạn
+        shards = _run_shards(_count_cooccurrence, source_file, target_file, workers,
+                             max_tokens, max_ngram, src_vocab, tgt_vocab)
+        codes, counts = _merge_counts([c for c, _ in shards], [n for _, n in shards])
+        del shards
+        
+        keep = counts >= min_count
+        codes, counts = codes[keep], counts[keep]
+        src_ids = codes // len(tgt_vocab)
+        tgt_ids = codes % len(tgt_vocab)
+        
+        if method == 'dice':
+            scores = 2.0 * counts / (src_freq[src_ids] + tgt_freq[tgt_ids])
+        else:
+            # PMI chuẩn hóa về [-1, 1] để min_score dùng chung thang đo với Dice
+            joint = counts / sentences
+            pmi = np.log(joint / ((src_freq[src_ids] / sentences) * (tgt_freq[tgt_ids] / sentences)))
+            scores = pmi / np.maximum(-np.log(joint), 1e-12)
+        
+        keep = scores >= min_score
+        src_ids, tgt_ids, scores, counts = src_ids[keep], tgt_ids[keep], scores[keep], counts[keep]
+        selected = _top_k(src_ids, scores, top_k)
+        
+        return [
+            (src_terms[src_ids[i]], tgt_terms[tgt_ids[i]], float(scores[i]), int(counts[i]))
+            for i in selected
+        ]
+    
+    except Exception as e:
+        logging.error(f"Error extracting alignment candidates: {e}")
+        return []
@@ -5,7 +5,7 @@ def process_en_vi_csv(file_path):
     """Process English-Vietnamese CSV dictionary"""
     entries = []
     try:
-        df = pd.read_csv(file_path, encoding='utf-8', errors='ignore')
+        df = pd.read_csv(file_path, encoding='utf-8', encoding_errors='ignore')
         
         # Determine column mapping
         en_col = next((col for col in df.columns if col.lower() in ['english', 'en', 'word', 'en_word', 'english_word']), df.columns[0])
@@ -45,7 +45,7 @@ def process_vi_en_csv(file_path):
     """Process Vietnamese-English CSV dictionary"""
     entries = []
     try:
-        df = pd.read_csv(file_path, encoding='utf-8', errors='ignore')
+        df = pd.read_csv(file_path, encoding='utf-8', encoding_errors='ignore')
         
         # Determine column mapping
         vi_col = next((col for col in df.columns if col.lower() in ['vietnamese', 'vi', 'word', 'vi_word', 'vietnamese_word']), df.columns[0])
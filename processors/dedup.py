@@ -0,0 +1,121 @@
+import os
+import heapq
+import hashlib
+import logging
+import tempfile
+import unicodedata
+from config import TEMP_DIR, DEDUP_MAX_ITEMS
+
+def normalize_pair_text(text):
+    """Chuẩn hóa chuỗi để so khớp trùng lặp (NFC, chữ thường, gộp khoảng trắng)"""
+    return ' '.join(unicodedata.normalize('NFC', text).lower().split())
+
+def pair_key(word, meaning):
+    """Băm 64-bit của cặp (từ, nghĩa) đã chuẩn hóa, dạng hex để sắp xếp được"""
+    data = f"{normalize_pair_text(word)}\t{normalize_pair_text(meaning)}".encode('utf-8')
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+def _clean_field(text):
+    # File run lưu mỗi cặp trên một dòng, phân cách bằng tab
+    return text.replace('\t', ' ').replace('\n', ' ').replace('\r', ' ')
+
+class ExternalDeduplicator:
+    """
+    Khử trùng lặp dạng luồng cho các cặp (từ, nghĩa) trước khi ghi vào database.
+    Giữ tối đa max_items cặp trong bộ nhớ; khi vượt quá sẽ ghi các run đã sắp xếp
+    ra đĩa và trộn k-đường khi đọc kết quả. Đếm số lần xuất hiện của mỗi cặp.
+    """
+    
+    def __init__(self, max_items=DEDUP_MAX_ITEMS, temp_dir=TEMP_DIR):
+        self.max_items = max_items
+        self.temp_dir = temp_dir
+        self.seen = 0
+        self.unique = 0
+        self._pairs = {}
+        self._runs = []
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def add(self, word, meaning, count=1):
+        """Thêm một cặp; cặp trùng chỉ tăng bộ đếm"""
+        self.seen += count
+        key = pair_key(word, meaning)
+        item = self._pairs.get(key)
+        if item is None:
+            self._pairs[key] = [count, word, meaning]
+            if len(self._pairs) >= self.max_items:
+                self._spill()
+        else:
+            item[0] += count
+    
+    def add_many(self, pairs):
+        for word, meaning in pairs:
+            self.add(word, meaning)
+    
+    @property
+    def spilled_runs(self):
+        return len(self._runs)
+    
+    def _spill(self):
+        """Ghi các cặp trong bộ nhớ ra một run đã sắp xếp theo khóa băm"""
+        os.makedirs(self.temp_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix='dedup-run-', suffix='.tsv', dir=self.temp_dir)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            for key in sorted(self._pairs):
+                count, word, meaning = self._pairs[key]
+                f.write(f"{key}\t{count}\t{_clean_field(word)}\t{_clean_field(meaning)}\n")
+        self._runs.append(path)
+        self._pairs = {}
+        logging.info(f"Spilled dedup run {len(self._runs)} to {path}")
+    
+    @staticmethod
+    def _read_run(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                key, count, word, meaning = line.rstrip('\n').split('\t', 3)
+                yield key, int(count), word, meaning
+    
+    def items(self):
+        """
+        Trả về (từ, nghĩa, số lần xuất hiện) cho mỗi cặp không trùng.
+        Giữ cách viết của lần xuất hiện đầu tiên.
+        """
+        self.unique = 0
+        for word, meaning, count in self._merged_items():
+            self.unique += 1
+            yield word, meaning, count
+    
+    def _merged_items(self):
+        if not self._runs:
+            for count, word, meaning in self._pairs.values():
+                yield word, meaning, count
+            return
+        
+        if self._pairs:
+            self._spill()
+        
+        # heapq.merge ổn định nên run cũ hơn (xuất hiện trước) luôn đứng trước khi trùng khóa
+        current = None
+        for key, count, word, meaning in heapq.merge(*(self._read_run(p) for p in self._runs), key=lambda r: r[0]):
+            if current is not None and current[0] == key:
+                current[1] += count
+                continue
+            if current is not None:
+                yield current[2], current[3], current[1]
+            current = [key, count, word, meaning]
+        if current is not None:
+            yield current[2], current[3], current[1]
+    
+    def close(self):
+        """Xóa các file run tạm"""
+        for path in self._runs:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._runs = []
+        self._pairs = {}
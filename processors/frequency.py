@@ -0,0 +1,155 @@
+import sys
+from collections import Counter
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+
+def is_short_pair(src_line, tgt_line, max_words=3):
+    """Chỉ giữ các dòng 1-3 từ ở cả hai phía (có khả năng là một mục từ)"""
+    src_word_count = len(src_line.split())
+    tgt_word_count = len(tgt_line.split())
+    return 1 <= src_word_count <= max_words and 1 <= tgt_word_count <= max_words
+
+def count_lines(path):
+    """Đếm số dòng của file bằng cách đọc theo khối nhị phân (tính cả dòng cuối không có ký tự xuống dòng)"""
+    count = 0
+    last = b'\n'
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            count += block.count(b'\n')
+            last = block[-1:]
+    return count + (last != b'\n')
+
+def _line_offsets(path, line_numbers):
+    """Vị trí byte bắt đầu của các dòng được yêu cầu (line_numbers đã sắp xếp)"""
+    offsets = []
+    wanted = iter(line_numbers)
+    target = next(wanted, None)
+    line = 0
+    position = 0
+    with open(path, 'rb') as f:
+        while target is not None:
+            if line == target:
+                offsets.append(position)
+                target = next(wanted, None)
+                continue
+            data = f.readline()
+            if not data:
+                # Các dòng vượt quá cuối file đều trỏ tới cuối file
+                offsets.append(position)
+                target = next(wanted, None)
+                continue
+            position += len(data)
+            line += 1
+    return offsets
+
+def shard_ranges(source_file, target_file, shards):
+    """Chia hai file song song thành các đoạn có cùng số dòng, trả về các khoảng byte"""
+    total = min(count_lines(source_file), count_lines(target_file))
+    bounds = [total * i // shards for i in range(shards + 1)]
+    src_offsets = _line_offsets(source_file, bounds)
+    tgt_offsets = _line_offsets(target_file, bounds)
+    return [
+        ((src_offsets[i], src_offsets[i + 1]), (tgt_offsets[i], tgt_offsets[i + 1]))
+        for i in range(shards)
+    ]
+
+def read_range(f, start, end):
+    """Đọc các dòng (đã bỏ khoảng trắng hai đầu) trong khoảng byte [start, end)"""
+    f.seek(start)
+    position = start
+    while position < end:
+        data = f.readline()
+        if not data:
+            break
+        position += len(data)
+        yield data.decode('utf-8', errors='ignore').strip()
+
+def iter_filtered_pairs(pairs, quality=None, max_words=3, rejected=None, chunk_size=10000):
+    """
+    Lọc luồng cặp dòng theo từng khối chunk_size dòng bằng QualityFilter (hoặc chỉ kiểm
+    tra số từ nếu quality là None); số cặp bị loại theo quy tắc được cộng vào rejected
+    """
+    if rejected is None:
+        rejected = Counter()
+    if quality is None:
+        for src_line, tgt_line in pairs:
+            if is_short_pair(src_line, tgt_line, max_words):
+                yield src_line, tgt_line
+            else:
+                rejected['word_count'] += 1
+        return
+    
+    pairs = iter(pairs)
+    while True:
+        chunk = list(islice(pairs, chunk_size))
+        if not chunk:
+            return
+        kept, chunk_rejected = quality.filter_chunk([src for src, _ in chunk], [tgt for _, tgt in chunk])
+        rejected.update(chunk_rejected)
+        yield from kept
+
+def count_shard(source_file, target_file, src_range, tgt_range, max_words=3, quality=None):
+    """
+    Đếm các cặp ngắn qua bộ lọc chất lượng trong một đoạn của corpus; chuỗi được intern
+    để tiết kiệm bộ nhớ. Trả về (Counter các cặp, Counter số cặp bị loại theo quy tắc).
+    """
+    counts = Counter()
+    rejected = Counter()
+    with open(source_file, 'rb') as src_f, open(target_file, 'rb') as tgt_f:
+        pairs = zip(read_range(src_f, *src_range), read_range(tgt_f, *tgt_range))
+        for src_line, tgt_line in iter_filtered_pairs(pairs, quality, max_words, rejected):
+            counts[(sys.intern(src_line), sys.intern(tgt_line))] += 1
+    return counts, rejected
+
+def iter_line_ranges(source_file, target_file, lines, start=(0, 0)):
+    """
+    Chia hai file song song thành các khoảng liên tiếp mỗi khoảng `lines` dòng, bắt đầu
+    từ cặp vị trí byte start; trả về ((src_start, src_end), (tgt_start, tgt_end))
+    """
+    src_position, tgt_position = start
+    with open(source_file, 'rb') as src_f, open(target_file, 'rb') as tgt_f:
+        src_f.seek(src_position)
+        tgt_f.seek(tgt_position)
+        while True:
+            src_start, tgt_start = src_position, tgt_position
+            count = 0
+            while count < lines:
+                src_data = src_f.readline()
+                tgt_data = tgt_f.readline()
+                if not src_data or not tgt_data:
+                    break
+                src_position += len(src_data)
+                tgt_position += len(tgt_data)
+                count += 1
+            if count:
+                yield (src_start, src_position), (tgt_start, tgt_position)
+            if count < lines:
+                return
+
+def iter_window_counts(source_file, target_file, workers, window_lines, start=(0, 0), max_words=3, quality=None):
+    """
+    Đếm cặp theo từng cửa sổ window_lines dòng bắt đầu từ vị trí byte start. Mỗi cửa sổ
+    được chia cho các process; trả về (vị trí byte cuối cửa sổ, danh sách Counter) theo
+    thứ tự, để người gọi lưu checkpoint sau khi đã ghi xong cửa sổ. Mỗi phần tử của
+    danh sách là (Counter các cặp, Counter số cặp bị loại) của một đoạn.
+    """
+    shard_lines = max(1, -(-window_lines // workers))
+    ranges = iter_line_ranges(source_file, target_file, shard_lines, start)
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        while True:
+            window = [shard for _, shard in zip(range(workers), ranges)]
+            if not window:
+                return
+            if executor is None:
+                counts = [count_shard(source_file, target_file, *shard, max_words, quality) for shard in window]
+            else:
+                futures = [executor.submit(count_shard, source_file, target_file, *shard, max_words, quality)
+                           for shard in window]
+                # Một đoạn lỗi thì không lưu checkpoint cho cửa sổ này
+                counts = [future.result() for future in futures]
+            end = (window[-1][0][1], window[-1][1][1])
+            yield end, counts
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
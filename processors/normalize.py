@@ -0,0 +1,80 @@
+import re
+import unicodedata
+from config import MAX_WORD_LENGTH, MAX_MEANING_LENGTH
+
+def clean_text(text):
+    """Chuẩn hóa một chuỗi: NFC và gộp mọi khoảng trắng thành một dấu cách"""
+    if text.__class__ is not str:
+        text = '' if text is None else str(text)
+    if not text.isascii() and not unicodedata.is_normalized('NFC', text):
+        text = unicodedata.normalize('NFC', text)
+    return ' '.join(text.split())
+
+# Một chữ cái hoặc chữ số Unicode bất kỳ (\w trừ dấu gạch dưới)
+ALNUM_RE = re.compile(r'[^\W_]')
+
+def has_alnum(text):
+    """Chuỗi có ít nhất một chữ cái hoặc chữ số"""
+    # Nhanh cho trường hợp thường gặp: chỉ gồm chữ/số và dấu cách
+    return text.replace(' ', '').isalnum() or ALNUM_RE.search(text) is not None
+
+def reject_reason(text, max_length):
+    """Lý do loại một từ/nghĩa đã chuẩn hóa (None nếu hợp lệ)"""
+    if not text:
+        return 'empty'
+    if len(text) > max_length:
+        return 'too_long'
+    # Chỉ gồm dấu câu/ký hiệu, ví dụ "!" hay "! ?"
+    if not has_alnum(text):
+        return 'punctuation'
+    return None
+
+class TextNormalizer:
+    """
+    Chuẩn hóa theo lô các dòng trước khi chèn vào database. Từ và nghĩa thường lặp
+    lại (một từ nhiều nghĩa, từ của OPUS) nên chuỗi đã chuẩn hóa và kết quả kiểm tra
+    của chúng được lưu trong bộ đệm có giới hạn; các cột còn lại chỉ được chuẩn hóa.
+    """
+    
+    def __init__(self, cache_size=200000, max_word_length=MAX_WORD_LENGTH, max_meaning_length=MAX_MEANING_LENGTH):
+        self.cache_size = cache_size
+        self.max_word_length = max_word_length
+        self.max_meaning_length = max_meaning_length
+        self._words = {}
+        self._meanings = {}
+    
+    def normalize_rows(self, rows, text_columns):
+        """
+        Chuẩn hóa text_columns cột đầu của mỗi tuple (cột 0 là từ, cột 1 là nghĩa) và
+        bỏ các dòng có từ hoặc nghĩa không hợp lệ. Trả về (các dòng giữ lại, số dòng
+        bị loại theo lý do).
+        """
+        if len(self._words) + len(self._meanings) > self.cache_size:
+            self._words = {}
+            self._meanings = {}
+        # Bộ đệm: chuỗi gốc -> (chuỗi đã chuẩn hóa, lý do loại hoặc None)
+        words = self._words
+        meanings = self._meanings
+        max_word_length = self.max_word_length
+        max_meaning_length = self.max_meaning_length
+        
+        kept = []
+        rejected = {}
+        for row in rows:
+            word = words.get(row[0])
+            if word is None:
+                clean = clean_text(row[0])
+                word = words[row[0]] = (clean, reject_reason(clean, max_word_length))
+            meaning = meanings.get(row[1])
+            if meaning is None:
+                clean = clean_text(row[1])
+                meaning = meanings[row[1]] = (clean, reject_reason(clean, max_meaning_length))
+            
+            reason = word[1] or meaning[1]
+            if reason:
+                rejected[reason] = rejected.get(reason, 0) + 1
+                continue
+            
+            kept.append((word[0], meaning[0]) + tuple([clean_text(text) for text in row[2:text_columns]])
+                        + row[text_columns:])
+        return kept, rejected
@@ -0,0 +1,100 @@
+import re
+from bisect import bisect_right
+from collections import Counter
+
+# Mỗi quy tắc là một regex MULTILINE chạy một lần trên cả khối dòng đã nối bằng '\n';
+# dòng nào có kết quả khớp thì bị loại. Quy tắc 'any' áp dụng cho cả hai phía,
+# 'en' / 'vi' chỉ áp dụng cho phía tiếng Anh / tiếng Việt.
+LINE_RULES = [
+    # Chỉ có số, dấu câu hoặc ký hiệu ("12", "1:23", "...")
+    ('numeric', 'any', re.compile(r'^(?:[^\w\n]|[\d_])*$', re.MULTILINE)),
+    # Lời thoại bắt đầu bằng gạch đầu dòng ("- Yes.") hoặc nhãn người nói ("JOHN:", "[MAN]", "(laughs)")
+    ('speaker_tag', 'any', re.compile(r'^[ \t]*(?:[-–—]|[A-Z][A-Z .]{1,20}:|[\[(][^\])\n]*[\])])', re.MULTILINE)),
+    # Ký hiệu nhạc của phụ đề
+    ('music', 'any', re.compile(r'[♪♫♬#*]')),
+    # Thẻ định dạng và đường dẫn còn sót lại ("<i>", "{\an8}", "www.")
+    ('markup', 'any', re.compile(r'<[^>\n]*>|\{\\[^}\n]*\}|https?://|www\.')),
+    # Phía tiếng Anh có chữ cái riêng của tiếng Việt hoặc chữ ngoài bảng chữ Latin
+    ('script', 'en', re.compile(r'[ăđơưĂĐƠƯ\u1ea0-\u1ef9]|[^\x00-\u024f\u2000-\u206f\n]')),
+    # Phía tiếng Việt có chữ ngoài bảng chữ Latin (CJK, Cyrillic, ...)
+    ('script', 'vi', re.compile(r'[^\x00-\u024f\u0300-\u036f\u1e00-\u1eff\u2000-\u206f\n]')),
+]
+
+def _matched_lines(pattern, text, line_starts):
+    """Chỉ số các dòng có kết quả khớp của pattern trong khối text"""
+    lines = set()
+    for match in pattern.finditer(text):
+        lines.add(bisect_right(line_starts, match.start()) - 1)
+    return lines
+
+def _line_starts(lines):
+    starts = []
+    position = 0
+    for line in lines:
+        starts.append(position)
+        position += len(line) + 1
+    return starts
+
+class QualityFilter:
+    """
+    Bộ lọc chất lượng theo quy tắc cho các cặp câu OPUS (phụ đề): loại dòng chỉ có số,
+    lời thoại có gạch đầu dòng/nhãn người nói, ký hiệu nhạc, thẻ định dạng, sai bảng chữ
+    cho từng ngôn ngữ, hai phía giống hệt nhau và tỉ lệ độ dài quá chênh lệch. Chạy theo
+    khối dòng và đếm số cặp bị loại theo từng quy tắc (mỗi cặp tính cho quy tắc đầu tiên).
+    """
+    
+    def __init__(self, source_lang='en', max_words=3, max_length_ratio=4.0, ratio_min_chars=8):
+        self.source_lang = source_lang
+        self.max_words = max_words
+        self.max_length_ratio = max_length_ratio
+        self.ratio_min_chars = ratio_min_chars
+    
+    def _rule_rejections(self, src_lines, tgt_lines):
+        """dict chỉ số dòng -> quy tắc đầu tiên loại dòng đó, tính trên cả khối"""
+        target_lang = 'vi' if self.source_lang == 'en' else 'en'
+        sides = [
+            (self.source_lang, '\n'.join(src_lines), _line_starts(src_lines)),
+            (target_lang, '\n'.join(tgt_lines), _line_starts(tgt_lines))
+        ]
+        rejections = {}
+        for rule, lang, pattern in LINE_RULES:
+            for side_lang, text, starts in sides:
+                if lang != 'any' and lang != side_lang:
+                    continue
+                for index in _matched_lines(pattern, text, starts):
+                    rejections.setdefault(index, rule)
+        return rejections
+    
+    def filter_chunk(self, src_lines, tgt_lines):
+        """
+        Lọc một khối dòng song song (đã bỏ khoảng trắng hai đầu). Trả về (danh sách cặp
+        giữ lại, Counter số cặp bị loại theo quy tắc).
+        """
+        rejected = Counter()
+        candidates = []
+        max_words = self.max_words
+        for src, tgt in zip(src_lines, tgt_lines):
+            # Chỉ giữ các dòng 1-max_words từ (có khả năng là một mục từ), kiểm tra trước vì rẻ nhất
+            if not (1 <= len(src.split()) <= max_words and 1 <= len(tgt.split()) <= max_words):
+                rejected['word_count'] += 1
+            elif src.casefold() == tgt.casefold():
+                rejected['identical'] += 1
+            else:
+                shorter, longer = sorted((len(src), len(tgt)))
+                if longer >= self.ratio_min_chars and longer > shorter * self.max_length_ratio:
+                    rejected['length_ratio'] += 1
+                else:
+                    candidates.append((src, tgt))
+        
+        if not candidates:
+            return [], rejected
+        
+        rejections = self._rule_rejections([src for src, _ in candidates], [tgt for _, tgt in candidates])
+        kept = []
+        for index, pair in enumerate(candidates):
+            rule = rejections.get(index)
+            if rule:
+                rejected[rule] += 1
+            else:
+                kept.append(pair)
+        return kept, rejected
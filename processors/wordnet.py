@@ -0,0 +1,151 @@
+import os
+import re
+import logging
+from array import array
+from bisect import bisect_left
+
+# Mã hóa loại từ trong khóa synset (tính từ vệ tinh 's' dùng chung với 'a')
+POS_CODES = {'n': 0, 'v': 1, 'a': 2, 's': 2, 'r': 3}
+POS_NAMES = {'n': 'noun', 'v': 'verb', 'a': 'adjective', 's': 'adjective', 'r': 'adverb'}
+
+DATA_FILES = ['data.noun', 'data.verb', 'data.adj', 'data.adv']
+INDEX_FILES = ['index.noun', 'index.verb', 'index.adj', 'index.adv']
+
+# Chấp nhận "n00001740", "n-00001740", "00001740-n", "00001740n"
+SYNSET_ID_RE = re.compile(r'^\s*([nvasr])?-?(\d{8})-?([nvasr])?\s*$')
+
+# Bỏ đánh dấu vị trí tính từ như "good(a)", "galore(ip)"
+ADJ_MARKER_RE = re.compile(r'\([a-z]+\)$')
+
+def synset_key(pos, offset):
+    """Tạo khóa số nguyên cho synset từ loại từ và offset"""
+    return int(offset) * 4 + POS_CODES[pos]
+
+def parse_synset_id(synset_id):
+    """Tách mã synset thành (pos, offset), trả về None nếu không hợp lệ"""
+    match = SYNSET_ID_RE.match(synset_id)
+    if not match:
+        return None
+    pos = match.group(1) or match.group(3)
+    if not pos:
+        return None
+    return pos, match.group(2)
+
+def _clean_lemma(lemma):
+    return ADJ_MARKER_RE.sub('', lemma).replace('_', ' ')
+
+class SynsetIndex:
+    """
+    Ánh xạ synset -> lemma tiếng Anh được lưu gọn trong các mảng:
+    khóa synset đã sắp xếp, bảng offset và mảng id lemma.
+    """
+    
+    def __init__(self, keys, offsets, lemma_ids, lemmas):
+        self.keys = keys
+        self.offsets = offsets
+        self.lemma_ids = lemma_ids
+        self.lemmas = lemmas
+    
+    @classmethod
+    def from_pairs(cls, pairs):
+        """Tạo chỉ mục từ các cặp (khóa synset, lemma)"""
+        lemma_table = {}
+        lemmas = []
+        encoded = []
+        for key, lemma in pairs:
+            lemma_id = lemma_table.get(lemma)
+            if lemma_id is None:
+                lemma_id = lemma_table[lemma] = len(lemmas)
+                lemmas.append(lemma)
+            encoded.append((key, lemma_id))
+        
+        # Sắp xếp ổn định theo khóa để giữ thứ tự lemma trong synset
+        encoded.sort(key=lambda item: item[0])
+        
+        keys = array('I')
+        offsets = array('I')
+        lemma_ids = array('I')
+        seen = set()
+        for key, lemma_id in encoded:
+            if not keys or keys[-1] != key:
+                keys.append(key)
+                offsets.append(len(lemma_ids))
+                seen.clear()
+            if lemma_id not in seen:
+                seen.add(lemma_id)
+                lemma_ids.append(lemma_id)
+        offsets.append(len(lemma_ids))
+        
+        return cls(keys, offsets, lemma_ids, lemmas)
+    
+    @classmethod
+    def from_directory(cls, wordnet_dir):
+        """Đọc các file data.* (ưu tiên) hoặc index.* của WordNet trong thư mục"""
+        data_paths = [os.path.join(wordnet_dir, name) for name in DATA_FILES]
+        if any(os.path.exists(path) for path in data_paths):
+            return cls.from_pairs(_iter_data_pairs(p for p in data_paths if os.path.exists(p)))
+        
+        index_paths = [os.path.join(wordnet_dir, name) for name in INDEX_FILES]
+        return cls.from_pairs(_iter_index_pairs(p for p in index_paths if os.path.exists(p)))
+    
+    def __len__(self):
+        return len(self.keys)
+    
+    def lookup(self, pos, offset):
+        """Trả về danh sách lemma của synset, rỗng nếu không tìm thấy"""
+        key = synset_key(pos, offset)
+        i = bisect_left(self.keys, key)
+        if i == len(self.keys) or self.keys[i] != key:
+            return []
+        return [self.lemmas[j] for j in self.lemma_ids[self.offsets[i]:self.offsets[i + 1]]]
+    
+    def resolve(self, synset_id):
+        """Tra lemma theo mã synset dạng chuỗi"""
+        parsed = parse_synset_id(synset_id)
+        if not parsed:
+            return []
+        return self.lookup(*parsed)
+
+def _iter_data_pairs(paths):
+    """Đọc các dòng synset trong file data.*: offset lex_filenum ss_type w_cnt word lex_id ..."""
+    for path in paths:
+        try:
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                for line in f:
+                    # Bỏ qua phần giấy phép ở đầu file
+                    if line.startswith('  '):
+                        continue
+                    fields = line.split(' ', 4)
+                    try:
+                        key = synset_key(fields[2], fields[0])
+                        word_count = int(fields[3], 16)
+                        words = fields[4].split(' ', 2 * word_count)
+                    except (IndexError, KeyError, ValueError):
+                        continue
+                    for lemma in words[:2 * word_count:2]:
+                        yield key, _clean_lemma(lemma)
+        except Exception as e:
+            logging.error(f"Error reading WordNet data file {path}: {e}")
+
+def _iter_index_pairs(paths):
+    """Đọc file index.*: lemma pos synset_cnt p_cnt [ptr...] sense_cnt tagsense_cnt offset..."""
+    for path in paths:
+        try:
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                for line in f:
+                    if line.startswith('  '):
+                        continue
+                    fields = line.split()
+                    try:
+                        lemma, pos = fields[0], fields[1]
+                        synset_count = int(fields[2])
+                        pointer_count = int(fields[3])
+                    except (IndexError, ValueError):
+                        continue
+                    start = 4 + pointer_count + 2
+                    lemma = _clean_lemma(lemma)
+                    for offset in fields[start:start + synset_count]:
+                        if pos in POS_CODES and offset.isdigit():
+                            yield synset_key(pos, offset), lemma
+        except Exception as e:
+            logging.error(f"Error reading WordNet index file {path}: {e}")
@@ -0,0 +1,156 @@
+import re
+import unicodedata
+from config import VI_WORDLIST_PATH
+from coverage_index import load_wordlist, normalize_headword
+
+# Âm tiết (chữ/số, có thể nối bằng - hoặc ') hoặc một ký tự dấu câu; dấu câu luôn ngắt từ
+TOKEN_PATTERN = re.compile(r"\w(?:[\w'-]*\w)?|[^\w\s]")
+
+# Khóa đánh dấu nút kết thúc một từ trong trie (giá trị là danh sách các dạng từ dùng để tra
+# nghĩa, ví dụ cả "Anh" và "anh" khi database có cả hai)
+END = None
+
+class SyllableTrie:
+    """
+    Trie theo âm tiết: mỗi nút là một dict âm tiết (chữ thường, NFC) -> nút con, nút kết thúc
+    một từ có khóa END. Tìm từ dài nhất bắt đầu tại một vị trí chỉ duyệt đúng các âm tiết
+    của câu, không phụ thuộc số từ trong từ điển.
+    """
+    
+    def __init__(self):
+        self.root = {}
+        self.count = 0
+        # Số âm tiết của từ dài nhất
+        self.max_syllables = 0
+    
+    def __len__(self):
+        return self.count
+    
+    def __contains__(self, word):
+        node = self.root
+        for syllable in normalize_headword(word).split(' '):
+            node = node.get(syllable)
+            if node is None:
+                return False
+        return END in node
+    
+    def add(self, word, headword=None):
+        """
+        Thêm word; headword là dạng dùng để tra nghĩa (mặc định là word). Các dạng khác nhau
+        của cùng một từ (khác chữ hoa/thường) đều được giữ. Trả về True nếu là từ mới.
+        """
+        syllables = normalize_headword(word).split(' ')
+        if not syllables[0]:
+            return False
+        node = self.root
+        for syllable in syllables:
+            node = node.setdefault(syllable, {})
+        headword = headword or word
+        headwords = node.get(END)
+        if headwords is not None:
+            if headword not in headwords:
+                headwords.append(headword)
+            return False
+        node[END] = [headword]
+        self.count += 1
+        self.max_syllables = max(self.max_syllables, len(syllables))
+        return True
+    
+    def longest_match(self, syllables, start):
+        """(vị trí kết thúc, các headword) của từ dài nhất bắt đầu tại syllables[start], hoặc (start, None)"""
+        node = self.root
+        end, headwords = start, None
+        for i in range(start, min(len(syllables), start + self.max_syllables)):
+            node = node.get(syllables[i])
+            if node is None:
+                break
+            if END in node:
+                end, headwords = i + 1, node[END]
+        return end, headwords
+
+class Segmenter:
+    """
+    Tách từ tiếng Việt theo từ dài nhất (forward maximum matching) trên trie âm tiết dựng từ
+    cột vietnamese_word và danh sách Viet74K, rồi tra nghĩa mọi đoạn trong một lần tra theo lô.
+    """
+    
+    def __init__(self, trie=None):
+        self.trie = trie or SyllableTrie()
+    
+    @classmethod
+    def from_database(cls, db, wordlist_path=VI_WORDLIST_PATH, download=False):
+        """Trie gồm các từ tiếng Việt trong database (giữ nguyên dạng để tra) và danh sách từ"""
+        trie = SyllableTrie()
+        for word in db.iter_vietnamese_words():
+            if word:
+                trie.add(word)
+        for word in load_wordlist(wordlist_path, download=download):
+            # Danh sách từ chỉ bổ sung từ mới: dạng của nó không có nghĩa nào để tra
+            if word not in trie:
+                trie.add(word)
+        return cls(trie)
+    
+    @staticmethod
+    def _ranked(segment, headwords):
+        """Các dạng của từ theo thứ tự ưu tiên: đúng như trong text, rồi dạng chữ thường, rồi các dạng còn lại"""
+        return sorted(headwords, key=lambda headword: (headword != segment, headword != headword.lower()))
+    
+    def segment_variants(self, text):
+        """
+        Tách text thành [(đoạn, các headword)]: đoạn giữ nguyên chữ hoa/thường của text, các
+        headword là mọi dạng của từ trong từ điển theo thứ tự ưu tiên, hoặc None nếu đoạn không
+        có trong từ điển (âm tiết lạ, dấu câu)
+        """
+        tokens = TOKEN_PATTERN.findall(unicodedata.normalize('NFC', text))
+        syllables = [token.lower() for token in tokens]
+        segments = []
+        start = 0
+        while start < len(tokens):
+            end, headwords = self.trie.longest_match(syllables, start)
+            if headwords is None:
+                end = start + 1
+            segment = ' '.join(tokens[start:end])
+            segments.append((segment, self._ranked(segment, headwords) if headwords else None))
+            start = end
+        return segments
+    
+    def segment(self, text):
+        """
+        Tách text thành [(đoạn, headword)]: headword là dạng ưu tiên nhất để tra nghĩa hoặc
+        None nếu đoạn không có trong từ điển
+        """
+        return [(segment, headwords[0] if headwords else None) for segment, headwords in self.segment_variants(text)]
+    
+    def translate_many(self, texts, source, limit=3):
+        """
+        Tách từng câu trong texts rồi tra nghĩa mọi dạng headword khác nhau của cả lô cùng lúc
+        qua source (DictionaryDatabase hoặc CompiledDictionary vi_en). Mỗi đoạn nhận nghĩa của
+        dạng đầu tiên có nghĩa theo thứ tự ưu tiên. Trả về mỗi câu một danh sách
+        {'segment', 'headword', 'translations'}.
+        """
+        segmented = [self.segment_variants(text) for text in texts]
+        headwords = {headword for segments in segmented for _, variants in segments if variants
+                     for headword in variants}
+        if hasattr(source, 'lookup_vietnamese_many'):
+            translations = source.lookup_vietnamese_many(headwords, limit)
+        else:
+            translations = source.lookup_many(headwords, limit)
+        
+        results = []
+        for segments in segmented:
+            rows = []
+            for segment, variants in segments:
+                headword = None
+                if variants:
+                    headword = next((variant for variant in variants if variant in translations), variants[0])
+                rows.append({
+                    'segment': segment,
+                    'headword': headword,
+                    'translations': translations.get(headword, []) if headword else []
+                })
+            results.append(rows)
+        return results
+    
+    def translate(self, text, source, limit=3):
+        """translate_many() cho một câu"""
+        return self.translate_many([text], source, limit)[0]
@@ -0,0 +1,165 @@
+import os
+import uuid
+import shutil
+import logging
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from config import OPUS_SOURCES
+from metrics import metrics
+from utils import select_sources
+
+# Các giai đoạn chỉ đọc nguồn của chính nó nên chạy song song được, mỗi process ghi một shard;
+# wiktionary và tracau cần biết database đã có từ nào nên chạy sau khi gộp
+SHARD_STAGES = ['github', 'opus', 'wordnet', 'local']
+
+# Đường dẫn shard và kích thước lô của process hiện tại (mỗi process của pool ghi một shard riêng)
+_shard = None
+
+def shard_dir(db_path):
+    return f"{db_path}.shards"
+
+def shard_path(directory, run, index):
+    """
+    File shard thứ index của lần chạy run. Tên không bao giờ được dùng lại, nên dấu
+    "shard/<đường dẫn>" còn sót của một lần chạy cũ không thể trùng với shard mới.
+    """
+    return os.path.join(directory, f"shard-{run}-{index:03d}.db")
+
+def existing_shards(directory):
+    """Các file shard còn lại trong thư mục (theo thứ tự tên)"""
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+            if name.startswith('shard') and name.endswith('.db')]
+
+def plan_units(stages, sources=None):
+    """
+    Chia các giai đoạn thành các đơn vị việc (giai đoạn, tên nguồn hoặc None): mỗi nguồn
+    GitHub/OPUS là một đơn vị. Đơn vị lớn được xếp trước để pool chia tải đều hơn.
+    """
+    units = []
+    if 'opus' in stages:
+        units += [('opus', source['name']) for source in select_sources(OPUS_SOURCES, sources)]
+    if 'wordnet' in stages:
+        units.append(('wordnet', None))
+    if 'github' in stages:
+        from collectors.github import estimate_github_rows
+        estimates = estimate_github_rows(sources)
+        units += [('github', name) for name, _ in sorted(estimates, key=lambda estimate: -(estimate[1] or 0))]
+    if 'local' in stages:
+        units.append(('local', None))
+    return units
+
+def _checkpoint_prefix(unit):
+    stage, name = unit
+    return f"{stage}/{name}" if name else f"{stage}/"
+
+def _init_worker(directory, run, counter, batch_size):
+    """Khởi tạo một process của pool: nhận số thứ tự shard của riêng nó"""
+    global _shard
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    _shard = (shard_path(directory, run, index), batch_size)
+    # Process con (fork) mang theo số liệu của process chính; chỉ gửi về phần của chính nó
+    metrics.reset()
+
+def _run_unit(unit, run_stage, args, checkpoints):
+    """
+    Chạy một đơn vị việc trên shard của process hiện tại. Shard được mở cho từng đơn vị và
+    đóng khi xong (lưu bộ lọc Bloom, chỉ mục chính tả và ghi hết dữ liệu vào file trước khi
+    gộp). Trả về (số mục đã thu thập, metrics.snapshot() của đơn vị).
+    """
+    from database import DictionaryDatabase
+    stage, name = unit
+    path, batch_size = _shard
+    # Shard luôn dùng cách lưu thường để gộp bằng INSERT ... SELECT
+    db = DictionaryDatabase(path, normalized=False, batch_size=batch_size)
+    try:
+        # Chỉ shard chạy nguồn này nhận checkpoint của nó, nên khi gộp không có bản cũ ghi đè bản mới
+        for source, position in checkpoints.items():
+            if db.get_checkpoint(source) is None:
+                db.set_checkpoint(source, position)
+        unit_args = argparse.Namespace(**vars(args))
+        unit_args.sources = [name] if name else args.sources
+        # Song song hóa đã nằm ở mức shard
+        unit_args.workers = 1
+        count = run_stage(stage, db, unit_args)
+        db.conn.commit()
+    finally:
+        db.close()
+    snapshot = metrics.snapshot()
+    metrics.reset()
+    return count or 0, snapshot
+
+def build_shards(directory, units, run_stage, args, checkpoints=None, workers=None):
+    """
+    Chạy các đơn vị việc trên một pool process, mỗi process ghi vào shard riêng trong
+    directory nên không tranh khóa ghi của SQLite; đơn vị được phát dần cho process rảnh.
+    run_stage(stage, db, args) là hàm chạy một giai đoạn (phải pickle được). checkpoints
+    là {nguồn: vị trí} của database chính, mỗi đơn vị chỉ nhận các checkpoint của nó.
+    Trả về ({giai đoạn: số mục}, danh sách file shard).
+    """
+    os.makedirs(directory, exist_ok=True)
+    checkpoints = checkpoints or {}
+    workers = max(1, min(workers or os.cpu_count() or 1, len(units)))
+    counter = multiprocessing.Value('i', 0)
+    run = uuid.uuid4().hex[:12]
+    counts = {}
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(directory, run, counter, getattr(args, 'batch_size', None))) as executor:
+        futures = {}
+        for unit in units:
+            prefix = _checkpoint_prefix(unit)
+            unit_checkpoints = {source: position for source, position in checkpoints.items()
+                                if source.startswith(prefix)}
+            futures[executor.submit(_run_unit, unit, run_stage, args, unit_checkpoints)] = unit
+        
+        for future in as_completed(futures):
+            stage, name = futures[future]
+            label = f"{stage} {name}" if name else stage
+            try:
+                count, snapshot = future.result()
+                metrics.merge(snapshot)
+            except Exception as e:
+                logging.error(f"Error building shard for {label}: {e}")
+                print(f"Error building shard for {label}: {e}")
+                count = 0
+            counts[stage] = counts.get(stage, 0) + count
+            print(f"Shard finished {label}: {count:,} entries")
+    return counts, existing_shards(directory)
+
+def merge_and_remove(db, directory):
+    """Gộp mọi shard trong directory vào db rồi xóa thư mục shard; trả về {bảng: số dòng đã chép}"""
+    paths = existing_shards(directory)
+    if not paths:
+        # Dấu của các shard đã bị xóa khỏi đĩa (dừng giữa rmtree và clear_checkpoints) không còn dùng
+        db.clear_checkpoints('shard/')
+        return {}
+    merged = db.merge_shards(paths)
+    shutil.rmtree(directory, ignore_errors=True)
+    db.clear_checkpoints('shard/')
+    return merged
+
+def build_sharded(db, args, run_stage):
+    """
+    Chạy các giai đoạn thu thập trong args.stages thuộc SHARD_STAGES trên args.shards process
+    rồi gộp các shard vào db. Shard còn lại của một lần chạy bị dừng được gộp trước, nên
+    checkpoint của chúng có trong db khi chia việc. Trả về {giai đoạn: số mục}.
+    """
+    directory = shard_dir(db.db_path)
+    leftover = merge_and_remove(db, directory)
+    if leftover:
+        print(f"Merged shards left by a previous run: {sum(leftover.values()):,} rows")
+    
+    units = plan_units(args.stages, args.sources)
+    if not units:
+        return {}
+    print(f"Building {len(units)} sources in {min(args.shards, len(units))} shard databases...")
+    counts, paths = build_shards(directory, units, run_stage, args, db.checkpoints(), args.shards)
+    
+    merged = merge_and_remove(db, directory)
+    print(f"Merged {len(paths)} shards: {sum(merged.values()):,} rows")
+    return counts
@@ -0,0 +1,267 @@
+import os
+import json
+import zlib
+import struct
+import bisect
+import unicodedata
+from array import array
+
+# File chỉ mục: MAGIC, độ dài metadata (uint64), metadata JSON, mảng tần suất (uint32, mỗi từ
+# một phần tử), mảng xóa (uint64 đã sắp xếp: crc32 của chuỗi xóa << 32 | id từ) rồi các từ
+# (UTF-8, mỗi dòng "từ gốc\tdạng đã bỏ dấu")
+MAGIC = b'DICTSPL1'
+HEADER = struct.Struct('<8sQ')
+ID_MASK = 0xffffffff
+
+# đ/Đ không tách được dấu bằng NFD
+_FOLD_TABLE = str.maketrans({'đ': 'd', 'Đ': 'd'})
+
+def _numpy():
+    """numpy nếu đã cài (sắp xếp mảng xóa nhanh hơn nhiều), nếu không thì None"""
+    try:
+        import numpy
+        return numpy
+    except ImportError:
+        return None
+
+def fold_tones(text):
+    """Chữ thường, bỏ dấu thanh và dấu phụ tiếng Việt: 'Việt Nam' -> 'viet nam'"""
+    decomposed = unicodedata.normalize('NFD', text.lower().translate(_FOLD_TABLE))
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+def edit_distance(a, b, max_distance):
+    """
+    Khoảng cách Damerau-Levenshtein (đổi chỗ hai ký tự liền nhau tính là 1 lỗi) giữa a và b,
+    hoặc max_distance + 1 nếu lớn hơn max_distance. Phần đầu và phần cuối chung được bỏ qua,
+    chỉ tính dải ô cách đường chéo không quá max_distance và dừng sớm khi cả hàng đã vượt quá.
+    """
+    if a == b:
+        return 0
+    limit = max_distance + 1
+    if abs(len(a) - len(b)) > max_distance:
+        return limit
+    start = 0
+    shortest = min(len(a), len(b))
+    while start < shortest and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < shortest - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a = a[start:len(a) - end]
+    b = b[start:len(b) - end]
+    n, m = len(a), len(b)
+    if not n or not m:
+        return min(n + m, limit)
+    
+    previous2 = None
+    previous = [j if j < limit else limit for j in range(m + 1)]
+    for i in range(1, n + 1):
+        current = [limit] * (m + 1)
+        current[0] = i if i < limit else limit
+        row_min = current[0]
+        char = a[i - 1]
+        for j in range(max(1, i - max_distance), min(m, i + max_distance) + 1):
+            other = b[j - 1]
+            value = previous[j - 1] if char == other else previous[j - 1] + 1
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if previous2 is not None and j > 1 and char == b[j - 2] and a[i - 2] == other \
+                    and previous2[j - 2] + 1 < value:
+                value = previous2[j - 2] + 1
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min >= limit:
+            return limit
+        previous2, previous = previous, current
+    return min(previous[m], limit)
+
+def _deletes(key, max_distance):
+    """Các chuỗi thu được khi xóa 0, 1, ..., max_distance ký tự của key, mỗi mức một danh sách"""
+    seen = {key}
+    levels = [[key]]
+    for _ in range(max_distance):
+        level = []
+        for word in levels[-1]:
+            if len(word) <= 1:
+                continue
+            for i in range(len(word)):
+                deleted = word[:i] + word[i + 1:]
+                if deleted not in seen:
+                    seen.add(deleted)
+                    level.append(deleted)
+        levels.append(level)
+    return levels
+
+def _hash(text):
+    return zlib.crc32(text.encode('utf-8'))
+
+class SpellingIndex:
+    """
+    Chỉ mục gợi ý chính tả kiểu SymSpell: mọi chuỗi thu được khi xóa tối đa max_distance
+    ký tự của prefix_length ký tự đầu mỗi từ (đã bỏ dấu) được tính trước, nên một truy vấn
+    chỉ cần sinh các chuỗi xóa của chính nó và kiểm tra khoảng cách với vài ứng viên thay vì
+    so với mọi từ. Các chuỗi xóa chỉ lưu dạng crc32 trong một mảng đã sắp xếp (tìm nhị phân);
+    trùng crc32 chỉ sinh thêm ứng viên bị loại khi kiểm tra khoảng cách.
+    Từ thêm sau khi dựng nằm trong một dict nhỏ và được gộp vào mảng khi save().
+    """
+    
+    def __init__(self, max_distance=2, prefix_length=7):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.words = []
+        self.folded = []
+        self.frequencies = array('I')
+        self._ids = {}
+        self._deletes = array('Q')
+        # crc32 -> [id từ] của các từ thêm sau lần gộp gần nhất
+        self._pending = {}
+    
+    def __len__(self):
+        return len(self.words)
+    
+    def __contains__(self, word):
+        return word in self._ids
+    
+    def _delete_hashes(self, key):
+        return {_hash(deleted) for level in _deletes(key[:self.prefix_length], self.max_distance) for deleted in level}
+    
+    def add(self, word, frequency=1):
+        """Thêm word (hoặc cộng thêm tần suất nếu đã có); trả về True nếu là từ mới"""
+        word_id = self._ids.get(word)
+        if word_id is not None:
+            self.frequencies[word_id] = min(ID_MASK, self.frequencies[word_id] + frequency)
+            return False
+        word_id = len(self.words)
+        if word_id > ID_MASK:
+            raise ValueError(f"spelling index supports at most {ID_MASK + 1} words")
+        key = fold_tones(word)
+        self._ids[word] = word_id
+        self.words.append(word)
+        self.folded.append(key)
+        self.frequencies.append(min(ID_MASK, frequency))
+        for delete_hash in self._delete_hashes(key):
+            self._pending.setdefault(delete_hash, []).append(word_id)
+        return True
+    
+    def update(self, words):
+        """Thêm nhiều (từ, tần suất)"""
+        for word, frequency in words:
+            self.add(word, frequency)
+    
+    def compact(self):
+        """Gộp các từ mới thêm vào mảng chuỗi xóa đã sắp xếp"""
+        if not self._pending:
+            return
+        entries = [delete_hash << 32 | word_id
+                   for delete_hash, word_ids in self._pending.items() for word_id in word_ids]
+        np = _numpy()
+        if np is not None:
+            merged = np.concatenate((np.frombuffer(self._deletes, dtype=np.uint64),
+                                     np.array(entries, dtype=np.uint64)))
+            merged.sort()
+            self._deletes = array('Q', merged.tobytes())
+        else:
+            entries.extend(self._deletes)
+            entries.sort()
+            self._deletes = array('Q', entries)
+        self._pending = {}
+    
+    def _candidates(self, delete_hash):
+        deletes = self._deletes
+        start = bisect.bisect_left(deletes, delete_hash << 32)
+        end = bisect.bisect_left(deletes, (delete_hash + 1) << 32, start)
+        for i in range(start, end):
+            yield deletes[i] & ID_MASK
+        yield from self._pending.get(delete_hash, ())
+    
+    def suggest(self, word, limit=5, max_distance=None):
+        """
+        Các từ gần word nhất: [{'word', 'distance', 'frequency'}], xếp theo khoảng cách
+        (tính trên dạng đã bỏ dấu, nên gõ thiếu hay sai dấu có khoảng cách 0), rồi theo số
+        lỗi khi tính cả dấu, rồi tần suất giảm dần
+        """
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        key = fold_tones(word)
+        lowered = word.lower()
+        seen = set()
+        found = []
+        # Một từ cách key d lỗi luôn có chung một chuỗi xóa ở mức <= d, nên từ tìm thấy lần đầu
+        # ở mức xóa level cách key ít nhất level lỗi: khi đã có đủ limit từ không xa hơn level,
+        # các mức sau không thể cho kết quả tốt hơn
+        for level, deletes in enumerate(_deletes(key[:self.prefix_length], max_distance)):
+            if len(found) >= limit:
+                found.sort()
+                cutoff = found[limit - 1][0]
+                if cutoff < level:
+                    break
+                max_distance = cutoff
+            for deleted in deletes:
+                for word_id in self._candidates(_hash(deleted)):
+                    if word_id in seen:
+                        continue
+                    seen.add(word_id)
+                    distance = edit_distance(key, self.folded[word_id], max_distance)
+                    if distance <= max_distance:
+                        found.append((distance, word_id))
+        if not found:
+            return []
+        
+        # Số lỗi tính cả dấu chỉ dùng để xếp hạng giữa các từ cùng khoảng cách, nên chỉ tính
+        # cho các từ không xa hơn từ thứ limit
+        found.sort()
+        cutoff = found[min(limit, len(found)) - 1][0]
+        ranked = []
+        for distance, word_id in found:
+            if distance > cutoff:
+                break
+            candidate = self.words[word_id]
+            accent_distance = edit_distance(lowered, candidate.lower(), max_distance + 2)
+            ranked.append((distance, accent_distance, -self.frequencies[word_id], candidate))
+        ranked.sort()
+        return [{'word': candidate, 'distance': distance, 'frequency': -frequency}
+                for distance, _, frequency, candidate in ranked[:limit]]
+    
+    def save(self, path, **meta):
+        """Gộp các từ mới rồi ghi chỉ mục cùng metadata của người gọi ra path (thay thế nguyên tử)"""
+        self.compact()
+        header = json.dumps(dict(meta, max_distance=self.max_distance, prefix_length=self.prefix_length,
+                                 word_count=len(self.words), delete_count=len(self._deletes))).encode('utf-8')
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(header)))
+            f.write(header)
+            f.write(self.frequencies.tobytes())
+            f.write(self._deletes.tobytes())
+            f.write('\n'.join(f"{word}\t{key}" for word, key in zip(self.words, self.folded)).encode('utf-8'))
+        os.replace(temp_path, path)
+    
+    @classmethod
+    def load(cls, path):
+        """Đọc chỉ mục đã lưu; trả về (chỉ mục, metadata) hoặc None nếu file không hợp lệ"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < HEADER.size:
+            return None
+        magic, header_length = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            return None
+        meta = json.loads(data[HEADER.size:HEADER.size + header_length])
+        index = cls(meta['max_distance'], meta['prefix_length'])
+        position = HEADER.size + header_length
+        index.frequencies.frombytes(data[position:position + 4 * meta['word_count']])
+        position += 4 * meta['word_count']
+        index._deletes.frombytes(data[position:position + 8 * meta['delete_count']])
+        position += 8 * meta['delete_count']
+        if meta['word_count']:
+            for line in data[position:].decode('utf-8').split('\n'):
+                word, key = line.split('\t')
+                index.words.append(word)
+                index.folded.append(key)
+        if len(index.words) != meta['word_count'] or len(index.frequencies) != meta['word_count'] \
+                or len(index._deletes) != meta['delete_count']:
+            return None
+        index._ids = {word: word_id for word_id, word in enumerate(index.words)}
+        return index, meta
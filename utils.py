@@ -2,9 +2,7 @@ import os
 import time
 import random
 import logging
-import urllib.request
-import requests
-from tqdm import tqdm
+from metrics import metrics
 
 # Danh sách User-Agent để tránh bị phát hiện khi crawl
 USER_AGENTS = [
@@ -26,6 +24,13 @@ def create_directory(directory_path):
         logging.info(f"Created directory: {directory_path}")
     return directory_path
 
+def select_sources(sources, names=None):
+    """Lọc danh sách nguồn theo tên (không phân biệt hoa thường); names rỗng thì giữ tất cả"""
+    if not names:
+        return list(sources)
+    wanted = {name.lower() for name in names}
+    return [source for source in sources if source['name'].lower() in wanted]
+
 def download_file(url, save_path, use_cache=True):
     """
     Tải tệp từ URL và lưu vào đường dẫn được chỉ định.
@@ -36,6 +41,10 @@ def download_file(url, save_path, use_cache=True):
         logging.info(f"Using cached file: {save_path}")
         return True
     
+    # Chỉ nạp requests/tqdm khi thực sự cần tải
+    import requests
+    from tqdm import tqdm
+    
     try:
         # Đảm bảo thư mục tồn tại
         os.makedirs(os.path.dirname(save_path), exist_ok=True)
@@ -44,7 +53,7 @@ def download_file(url, save_path, use_cache=True):
         headers = {'User-Agent': get_random_user_agent()}
         logging.info(f"Downloading file from {url} to {save_path}")
         
-        with requests.get(url, headers=headers, stream=True) as response:
+        with metrics.phase('network'), requests.get(url, headers=headers, stream=True) as response:
             response.raise_for_status()
             
             # Lấy kích thước tệp nếu có
@@ -61,6 +70,7 @@ def download_file(url, save_path, use_cache=True):
                 for chunk in response.iter_content(chunk_size=8192):
                     size = file.write(chunk)
                     bar.update(size)
+                    metrics.add_bytes(size)
         
         logging.info(f"Successfully downloaded file to {save_path}")
         return True
@@ -80,9 +90,13 @@ def download_file_simple(url, save_path, use_cache=True):
         logging.info(f"Using cached file: {save_path}")
         return True
     
+    import urllib.request
+    
     try:
         os.makedirs(os.path.dirname(save_path), exist_ok=True)
-        urllib.request.urlretrieve(url, save_path)
+        with metrics.phase('network'):
+            urllib.request.urlretrieve(url, save_path)
+        metrics.add_bytes(os.path.getsize(save_path))
         logging.info(f"Successfully downloaded file to {save_path}")
         return True
     except Exception as e:
@@ -90,17 +104,12 @@ def download_file_simple(url, save_path, use_cache=True):
         return False
 
 def clean_text(text):
-    """Làm sạch văn bản, loại bỏ ký tự đặc biệt"""
+    """Làm sạch văn bản: chuẩn hóa NFC và gộp khoảng trắng (xem processors/normalize.py)"""
     if not text:
         return ""
     
-    # Loại bỏ khoảng trắng thừa
-    text = text.strip()
-    
-    # Thay thế nhiều khoảng trắng bằng một khoảng trắng
-    text = ' '.join(text.split())
-    
-    return text
+    from processors.normalize import clean_text as normalize_text
+    return normalize_text(text)
 
 def escape_sql(text):
     """Escape các ký tự đặc biệt cho SQL"""
@@ -113,10 +122,8 @@ def normalize_word(word):
     if not word:
         return ""
     
-    # Chuyển về chữ thường và loại bỏ khoảng trắng thừa
-    word = word.lower().strip()
-    
-    return word
+    # Chuyển về chữ thường, chuẩn hóa NFC và loại bỏ khoảng trắng thừa
+    return clean_text(word).lower()
 
 def format_time(seconds):
     """Định dạng thời gian từ giây thành hh:mm:ss"""
@@ -136,6 +143,7 @@ def timer(func):
         start_time = time.time()
         result = func(*args, **kwargs)
         elapsed_time = time.time() - start_time
+        metrics.add_time(f"stage.{func.__name__}", elapsed_time)
         logging.info(f"{func.__name__} completed in {format_time(elapsed_time)}")
         return result
     return wrapper
@@ -167,7 +175,7 @@ def batch_process(items, process_func, batch_size=1000, desc="Processing"):
         batch = items[i:i+batch_size]
         batch_results = process_func(batch)
         results.extend(batch_results)
-        
+    
     return results
 
 def print_summary(title, items_count, elapsed_time):